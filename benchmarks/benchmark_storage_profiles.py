@@ -0,0 +1,105 @@
+"""
+Compare write speed, read speed and archive size of storage profiles.
+
+Usage:
+    python benchmarks/benchmark_storage_profiles.py [ESO_PATH ...]
+
+When no path is given, a wide file is generated by replicating
+columns of 'leap_year.eso' test file 'WIDEN_FACTOR' times (a year
+of timestep and hourly results with ~1000 variables per table).
+'esofile_reader' package needs to be installed (or on PYTHONPATH).
+
+"""
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from esofile_reader import EsoFile
+from esofile_reader.df.df_tables import DFTables
+from esofile_reader.generic_file import GenericFile
+from esofile_reader.pqt.parquet_storage import ParquetStorage
+from esofile_reader.pqt.storage_profile import PROFILES, StorageProfile
+from esofile_reader.search_tree import Tree
+
+ROOT = Path(__file__).parents[1]
+SOURCE_PATH = Path(ROOT, "tests", "test_files", "eplus", "leap_year.eso")
+WIDEN_FACTOR = 100
+
+BENCHMARK_PROFILES = {
+    **PROFILES,
+    "uncompressed": StorageProfile(compression="none", use_dictionary=False),
+    "zstd-1": StorageProfile(compression="zstd", compression_level=1),
+    "gzip": StorageProfile(compression="gzip"),
+}
+
+
+def widen_table(df, factor):
+    special = df.loc[:, df.columns.get_level_values("id") == "special"]
+    numeric = df.loc[:, df.columns.get_level_values("id") != "special"]
+    max_id = max(numeric.columns.get_level_values("id"), default=0) + 1
+    frames = [special]
+    for i in range(factor):
+        copy = numeric * (1 + i / factor)
+        columns = [
+            (id_ + i * max_id, table, f"{key} #{i}", type_, units)
+            for id_, table, key, type_, units in numeric.columns
+        ]
+        copy.columns = pd.MultiIndex.from_tuples(columns, names=numeric.columns.names)
+        frames.append(copy)
+    return pd.concat(frames, axis=1)
+
+
+def generate_wide_file(path, factor):
+    eso_file = EsoFile.from_path(path)
+    tables = DFTables()
+    for table in eso_file.table_names:
+        tables[table] = widen_table(eso_file.tables[table], factor)
+    tree = Tree.from_header_dict(tables.get_all_variables_dct())
+    return GenericFile(
+        path, f"{eso_file.file_name}-x{factor}", eso_file.file_created, tables, tree, "eso"
+    )
+
+
+def benchmark_profile(results_files, profile, tempdir):
+    storage = ParquetStorage(Path(tempdir, "workdir"), profile=profile)
+    try:
+        start = time.perf_counter()
+        for results_file in results_files:
+            storage.store_file(results_file)
+        write_time = time.perf_counter() - start
+
+        path = storage.save_as(tempdir, "benchmark")
+        size = path.stat().st_size
+
+        start = time.perf_counter()
+        for file in storage.files.values():
+            for table in file.table_names:
+                file.tables.get_table(table)
+        read_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(storage.workdir)
+    return write_time, read_time, size
+
+
+def main(paths):
+    if paths:
+        results_files = [EsoFile.from_path(path) for path in paths]
+    else:
+        results_files = [generate_wide_file(SOURCE_PATH, WIDEN_FACTOR)]
+    for results_file in results_files:
+        tables = results_file.tables
+        shapes = ", ".join(f"{t} {tables[t].shape}" for t in results_file.table_names)
+        print(f"{results_file.file_name}: {shapes}")
+    print(f"{'profile':<15}{'write [s]':>12}{'read [s]':>12}{'size [kB]':>12}")
+    for name, profile in BENCHMARK_PROFILES.items():
+        with tempfile.TemporaryDirectory() as tempdir:
+            write_time, read_time, size = benchmark_profile(results_files, profile, tempdir)
+        print(f"{name:<15}{write_time:>12.4f}{read_time:>12.4f}{size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main([Path(p) for p in sys.argv[1:]])
@@ -11,7 +11,10 @@ import pandas as pd
 from esofile_reader.df.df_tables import DFTables
 from esofile_reader.df.level_names import ID_LEVEL, TABLE_LEVEL
 from esofile_reader.results_processing.aggregate_results import aggregate_variables
-from esofile_reader.results_processing.process_results import get_processed_results
+from esofile_reader.results_processing.process_results import (
+    get_processed_results,
+    get_batch_processed_results,
+)
 from esofile_reader.search_tree import Tree
 from esofile_reader.typehints import Variable, SimpleVariable, VariableType, PathLike
 
@@ -195,7 +198,7 @@ class BaseFile:
         return var_cls(*var_args)
 
     def _create_header_variable(
-        self, table: str, key: str, units: str, type_: str = None
+        self, table: str, key: str, units: str, type_: str = None, pending_tree: Tree = None
     ) -> VariableType:
         """ Create unique header variable. """
 
@@ -203,12 +206,17 @@ class BaseFile:
             new_key = f"{key} ({i})"
             return self._validate_variable_type(table, new_key, units, type_)
 
+        def exists():
+            if pending_tree is not None and pending_tree.variable_exists(variable):
+                return True
+            return self.search_tree.variable_exists(variable)
+
         # check if adding appropriate variable type
         variable = self._validate_variable_type(table, key, units, type_)
 
         # avoid duplicate variable name
         i = 0
-        while self.search_tree.variable_exists(variable):
+        while exists():
             i += 1
             variable = add_num()
 
@@ -273,9 +281,40 @@ class BaseFile:
             self.search_tree.add_variable(id_, new_variable)
             return id_, new_variable
 
+    def insert_variables(
+        self, variables: List[VariableType], array: Sequence[Sequence[float]]
+    ) -> Optional[List[Tuple[int, VariableType]]]:
+        """
+        Add multiple output variables into a single table at once.
+
+        Invalid input is handled as in 'insert_variable', a warning is
+        logged and None returned when variables belong to multiple
+        tables or array shape does not match, unknown table raises
+        KeyError.
+
+        """
+        # variables need to be unique also within the inserted batch
+        pending_tree = Tree()
+        new_variables = []
+        for i, variable in enumerate(variables):
+            type_ = variable.type if isinstance(variable, Variable) else None
+            new_variable = self._create_header_variable(
+                variable.table, variable.key, variable.units, type_, pending_tree
+            )
+            pending_tree.add_variable(i, new_variable)
+            new_variables.append(new_variable)
+        ids = self.tables.insert_columns(new_variables, array)
+        if ids:
+            for id_, new_variable in zip(ids, new_variables):
+                self.search_tree.add_variable(id_, new_variable)
+            return list(zip(ids, new_variables))
+
     def get_results(self, *args, **kwargs):
         return get_processed_results(self, *args, **kwargs)
 
+    def get_batch_results(self, *args, **kwargs):
+        return get_batch_processed_results(self, *args, **kwargs)
+
     def aggregate_variables(self, *args, **kwargs):
         return aggregate_variables(self, *args, **kwargs)
 
@@ -91,7 +91,21 @@ class BaseTables(ABC):
 
     @abstractmethod
     def insert_column(self, variable: Variable, array: Sequence) -> Optional[int]:
-        """ Add a new output into specific result table. """
+        """ Add a new output into specific result table, returns None for invalid array. """
+        pass
+
+    @abstractmethod
+    def insert_columns(
+        self, variables: Sequence[Variable], array: Sequence[Sequence]
+    ) -> Optional[List[int]]:
+        """
+        Add multiple new outputs into specific result table at once.
+
+        As for 'insert_column', nothing is added and None is returned
+        when array shape does not match table length and number of
+        variables or when variables belong to multiple tables.
+
+        """
         pass
 
     @abstractmethod
@@ -164,10 +164,12 @@ _SI_IP = {
 
 
 def c_to_fahrenheit(val):
+    """ Convert Celsius to Fahrenheit, works element-wise on arrays. """
     return val * 1.8 + 32
 
 
 def j_kg_to_btu_lb(val):
+    """ Convert J/kg to Btu/lb, works element-wise on arrays. """
     return val * 0.00042986 + 7.686
 
 
@@ -21,23 +21,67 @@ from esofile_reader.df.level_names import (
 from esofile_reader.typehints import ResultsFileType
 
 
+def upcast_single_precision(df: pd.DataFrame) -> pd.DataFrame:
+    """ Cast 'float32' columns to 'float64' to avoid losing precision. """
+    float32_arr = (df.dtypes == np.float32).to_numpy()
+    if float32_arr.any():
+        df = df.astype({c: np.float64 for c in df.columns[float32_arr]})
+    return df
+
+
+def group_columns_by_units(
+    columns: pd.MultiIndex, units: List[str]
+) -> Dict[str, np.ndarray]:
+    """ Get value column positions for each of given units. """
+    codes, uniques = pd.factorize(columns.get_level_values(UNITS_LEVEL))
+    if DATA_LEVEL in columns.names:
+        codes = np.where(columns.get_level_values(DATA_LEVEL) == VALUE_LEVEL, codes, -1)
+    groups = {}
+    for code, units_ in enumerate(uniques):
+        if units_ in units:
+            positions = np.flatnonzero(codes == code)
+            if positions.size > 0:
+                groups[units_] = positions
+    return groups
+
+
+def convert_array(
+    arr: np.ndarray, factor: Union[Callable, float, int, pd.Series, np.ndarray, list]
+) -> np.ndarray:
+    """ Apply conversion factor on 2D array, row wise factors are broadcasted. """
+    if isinstance(factor, (float, int)):
+        return arr * factor
+    elif callable(factor):
+        try:
+            return factor(arr)
+        except (TypeError, ValueError):
+            return np.vectorize(factor)(arr)
+    else:
+        return arr * np.asarray(factor).reshape(-1, 1)
+
+
 def apply_conversion(
     df: pd.DataFrame, conversion_dict: Dict[str, Tuple[str, Union[Callable, float, int]]],
 ) -> pd.DataFrame:
     """ Convert values for columns using specified units. """
-    for old, (new, factor) in conversion_dict.items():
-        convert_arr = df.columns.get_level_values(UNITS_LEVEL) == old
-        if DATA_LEVEL in df.columns.names:
-            convert_arr = convert_arr & (df.columns.get_level_values(DATA_LEVEL) == VALUE_LEVEL)
-
-        if isinstance(factor, (float, int)):
-            df.loc[:, convert_arr] = df.loc[:, convert_arr] * factor
-        elif callable(factor):
-            df.loc[:, convert_arr] = df.loc[:, convert_arr].applymap(factor)
-        elif isinstance(factor, pd.Series):
-            df.loc[:, convert_arr] = df.loc[:, convert_arr].mul(factor.values, axis=0)
+    df = upcast_single_precision(df)
+    groups = group_columns_by_units(df.columns, list(conversion_dict.keys()))
+    if groups:
+        homogeneous = df.dtypes.nunique() == 1
+        values = df.to_numpy() if homogeneous else None
+        converted = {}
+        for units, positions in groups.items():
+            arr = values[:, positions] if homogeneous else df.iloc[:, positions].to_numpy()
+            converted[units] = convert_array(arr, conversion_dict[units][1])
+        if homogeneous and all(arr.dtype == values.dtype for arr in converted.values()):
+            # whole table is written back as a single array
+            values = values.copy()
+            for units, positions in groups.items():
+                values[:, positions] = converted[units]
+            df = pd.DataFrame(values, index=df.index, columns=df.columns)
         else:
-            df.loc[:, convert_arr] = df.loc[:, convert_arr].mul(factor, axis=0)
+            for units, positions in groups.items():
+                df.iloc[:, positions] = converted[units]
 
     units_lookup = {k: v[0] for k, v in conversion_dict.items()}
     df.columns = update_units_level(df.columns, units_lookup)
@@ -86,18 +130,13 @@ def convert_units(
 
 def update_units_level(mi: pd.MultiIndex, units_dict: Dict[str, str],) -> pd.MultiIndex:
     """ Replace given units with converted ones. """
-
-    def replace(val):
-        try:
-            updated = units_dict[val]
-        except KeyError:
-            updated = val
-        return updated
-
-    all_levels = [mi.get_level_values(i) for i in range(mi.nlevels)]
     units_level_index = mi.names.index(UNITS_LEVEL)
-    updated_units_level = [replace(units) for units in all_levels[units_level_index]]
-    all_levels[units_level_index] = updated_units_level
+    level = mi.levels[units_level_index]
+    updated_level = level.map(lambda x: units_dict.get(x, x))
+    if updated_level.is_unique:
+        return mi.set_levels(updated_level, level=units_level_index)
+    all_levels = [mi.get_level_values(i) for i in range(mi.nlevels)]
+    all_levels[units_level_index] = updated_level.take(mi.codes[units_level_index])
     return pd.MultiIndex.from_arrays(all_levels, names=mi.names)
 
 
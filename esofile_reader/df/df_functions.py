@@ -1,8 +1,10 @@
 import logging
 from datetime import datetime
-from typing import Sequence, Optional, List
+from typing import Sequence, Optional, List, Union
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_float_dtype
 
 from esofile_reader.df.level_names import TIMESTAMP_COLUMN, DATA_LEVEL, VALUE_LEVEL, ID_LEVEL
 from esofile_reader.processing.eplus import D, M, A, RP
@@ -35,6 +37,45 @@ def merge_peak_outputs(timestamp_df: pd.DataFrame, values_df: pd.DataFrame) -> p
     return df
 
 
+def create_global_peak_outputs(df: pd.DataFrame, max_: bool = True) -> pd.DataFrame:
+    """ Find peak value and timestamp of the first occurrence for each column. """
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    nan_arr = np.isnan(values)
+    filled = np.where(nan_arr, -np.inf if max_ else np.inf, values)
+    ixs = filled.argmax(axis=0) if max_ else filled.argmin(axis=0)
+    peaks = values[ixs, np.arange(values.shape[1])]
+    timestamps = df.index.take(ixs)
+    empty_arr = nan_arr.all(axis=0)
+    if empty_arr.any():
+        # columns without any valid value do not have timestamp
+        timestamps = timestamps.where(~empty_arr)
+
+    n = len(df.columns)
+    frames = [
+        pd.DataFrame(peaks.reshape(1, n)),
+        pd.DataFrame(timestamps.to_numpy().reshape(1, n)),
+    ]
+    peak_df = pd.concat(frames, axis=1, ignore_index=True)
+
+    # group 'value' and 'timestamp' columns to be adjacent for each column
+    order = np.arange(2 * n).reshape(2, n).T.ravel()
+    peak_df = peak_df.iloc[:, order]
+    levels = [np.repeat(df.columns.get_level_values(i), 2) for i in range(df.columns.nlevels)]
+    levels.append(np.tile([VALUE_LEVEL, TIMESTAMP_COLUMN], n))
+    peak_df.columns = pd.MultiIndex.from_arrays(levels, names=[*df.columns.names, DATA_LEVEL])
+    return peak_df
+
+
+def cast_numeric_columns(df: pd.DataFrame, dtype: Union[str, type]) -> pd.DataFrame:
+    """ Cast floating point columns to given dtype, other columns are kept. """
+    float_arr = [is_float_dtype(dt) for dt in df.dtypes]
+    if all(float_arr):
+        df = df.astype(dtype, copy=False)
+    elif any(float_arr):
+        df = df.astype({c: dtype for c, is_float in zip(df.columns, float_arr) if is_float})
+    return df
+
+
 def _local_peaks(
     df: pd.DataFrame,
     val_ix: int = None,
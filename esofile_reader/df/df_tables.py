@@ -3,11 +3,13 @@ from copy import copy
 from datetime import datetime
 from typing import Sequence, List, Dict, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from esofile_reader.abstractions.base_tables import BaseTables
 from esofile_reader.df.df_functions import (
-    merge_peak_outputs,
+    cast_numeric_columns,
+    create_global_peak_outputs,
     slice_df,
     slice_series_by_datetime_index,
 )
@@ -150,6 +152,11 @@ class DFTables(BaseTables):
         for k, v in tables.items():
             self[k] = v
 
+    def set_value_dtype(self, dtype: Union[str, type]) -> None:
+        """ Cast numeric values of all tables to given dtype (i.e. 'float32'). """
+        for table, df in self.tables.items():
+            self.tables[table] = cast_numeric_columns(df, dtype)
+
     def is_simple(self, table: str) -> bool:
         return len(self.get_levels(table)) == 4
 
@@ -243,6 +250,40 @@ class DFTables(BaseTables):
                 self.tables[table][id_, table, key, units] = array
             return id_
 
+    def _append_columns(self, table: str, df: pd.DataFrame) -> None:
+        """ Append given columns to the end of table. """
+        self.tables[table] = pd.concat([self.tables[table], df], axis=1, sort=False)
+
+    def insert_columns(
+        self, variables: Sequence[VariableType], array: Union[np.ndarray, Sequence[Sequence]]
+    ) -> Optional[List[int]]:
+        tables = {variable.table for variable in variables}
+        if len(tables) != 1:
+            logging.warning(
+                f"New variables must belong to a single table! "
+                f"Variables '{variables}' cannot be added."
+            )
+            return None
+        table = tables.pop()
+        array = np.asarray(array)
+        if array.ndim != 2 or array.shape[1] != len(variables):
+            logging.warning(
+                f"New variables require array of shape (n, {len(variables)}), "
+                f"given shape is {array.shape}! Variables '{variables}' cannot be added."
+            )
+            return None
+        if self._validate(table, variables, array):
+            all_ids = set(self.get_all_variable_ids())
+            id_gen = incremental_id_gen(checklist=all_ids, start=100)
+            ids = [next(id_gen) for _ in variables]
+            mi = pd.MultiIndex.from_tuples(
+                [(id_, *variable) for id_, variable in zip(ids, variables)],
+                names=self.get_levels(table),
+            )
+            df = pd.DataFrame(array, index=self.tables[table].index, columns=mi)
+            self._append_columns(table, df)
+            return ids
+
     def insert_special_column(self, table: str, key: str, array: Sequence) -> None:
         if self.is_simple(table):
             v = (SPECIAL, table, key, "")
@@ -344,15 +385,8 @@ class DFTables(BaseTables):
         max_: bool = True,
     ) -> pd.DataFrame:
         """ Return maximum or minimum value and datetime of occurrence. """
-        df = self.get_results_df(table, ids, start_date, end_date)
-
-        vals = pd.DataFrame(df.max() if max_ else df.min()).T
-        ixs = pd.DataFrame(df.idxmax() if max_ else df.idxmin()).T
-
-        df = merge_peak_outputs(ixs, vals)
-        df = df.iloc[[0]]  # report only first occurrence
-
-        return df
+        df = slice_df(self.tables[table], ids, start_date=start_date, end_date=end_date)
+        return create_global_peak_outputs(df, max_=max_)
 
     def get_global_max_results_df(
         self,
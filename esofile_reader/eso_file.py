@@ -1,7 +1,7 @@
 from copy import copy
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 from esofile_reader.abstractions.base_file import BaseFile, get_file_information
 from esofile_reader.df.df_tables import DFTables
@@ -63,7 +63,12 @@ class EsoFile(BaseFile):
 
     @classmethod
     def _process_env(
-        cls, raw_data: RawData, parser: Parser, logger: BaseLogger, year: int
+        cls,
+        raw_data: RawData,
+        parser: Parser,
+        logger: BaseLogger,
+        year: int,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> Tuple[Tree, DFTables, Optional[Dict[str, DFTables]]]:
         """ Process an environment raw data into final classes. """
         logger.log_section("sanitizing data")
@@ -81,7 +86,12 @@ class EsoFile(BaseFile):
 
         logger.log_section("generating tables")
         tables = parser.cast_to_df(
-            raw_data.outputs, raw_data.header, dates, special_columns, logger
+            raw_data.outputs,
+            raw_data.header,
+            dates,
+            special_columns,
+            logger,
+            value_dtype=value_dtype if value_dtype else float,
         )
 
         if raw_data.peak_outputs:
@@ -101,8 +111,9 @@ class EsoFile(BaseFile):
         logger: BaseLogger = None,
         ignore_peaks: bool = True,
         year: Optional[int] = None,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> "EsoFile":
-        eso_files = cls.from_multienv_path(file_path, logger, ignore_peaks, year)
+        eso_files = cls.from_multienv_path(file_path, logger, ignore_peaks, year, value_dtype)
         if len(eso_files) == 1:
             return eso_files[0]
         else:
@@ -120,6 +131,7 @@ class EsoFile(BaseFile):
         logger: BaseLogger = None,
         ignore_peaks: bool = True,
         year: Optional[int] = None,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> List["EsoFile"]:
         file_path, file_name, file_created = get_file_information(file_path)
         if logger is None:
@@ -130,7 +142,9 @@ class EsoFile(BaseFile):
         eso_files = []
         for i, raw_data in enumerate(reversed(all_raw_data)):
             with logger.log_task(f"Process environment: '{raw_data.environment_name}'."):
-                tree, tables, peak_tables = cls._process_env(raw_data, parser, logger, year)
+                tree, tables, peak_tables = cls._process_env(
+                    raw_data, parser, logger, year, value_dtype
+                )
                 name = f"{file_name} - {raw_data.environment_name}" if i > 0 else file_name
                 ef = cls(
                     file_path=file_path,
@@ -95,3 +95,9 @@ class CorruptedData(Exception):
     """ Exception raised when loading parquet tables with missing data. """
 
     pass
+
+
+class TaskCancelled(Exception):
+    """ Exception raised when a running task has been cancelled. """
+
+    pass
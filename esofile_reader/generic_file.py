@@ -1,6 +1,6 @@
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from esofile_reader.abstractions.base_file import BaseFile, get_file_information
 from esofile_reader.df.df_tables import DFTables
@@ -65,7 +65,10 @@ class GenericFile(BaseFile):
         file_type: str,
         file_created: datetime,
         logger: BaseLogger,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> "GenericFile":
+        if value_dtype:
+            tables.set_value_dtype(value_dtype)
         logger.log_section("generating search tree")
         tree = Tree.from_header_dict(tables.get_all_variables_dct())
         logger.increment_progress()
@@ -79,6 +82,7 @@ class GenericFile(BaseFile):
         force_index: bool = False,
         logger: BaseLogger = None,
         header_limit=10,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> "GenericFile":
         """ Generate 'GenericFile' from excel spreadsheet. """
         file_path, file_name, file_created = get_file_information(file_path)
@@ -101,6 +105,7 @@ class GenericFile(BaseFile):
                 file_created=file_created,
                 file_type=BaseFile.XLSX,
                 logger=logger,
+                value_dtype=value_dtype,
             )
 
     @classmethod
@@ -110,6 +115,7 @@ class GenericFile(BaseFile):
         force_index: bool = False,
         logger: BaseLogger = None,
         header_limit=10,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> "GenericFile":
         """ Generate 'GenericFile' from csv file. """
         file_path, file_name, file_created = get_file_information(file_path)
@@ -130,14 +136,21 @@ class GenericFile(BaseFile):
                 file_created=file_created,
                 file_type=BaseFile.CSV,
                 logger=logger,
+                value_dtype=value_dtype,
             )
 
     @classmethod
     def from_eplus_file(
-        cls, file_path: PathLike, logger: BaseLogger = None, year: Optional[int] = None,
+        cls,
+        file_path: PathLike,
+        logger: BaseLogger = None,
+        year: Optional[int] = None,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> "GenericFile":
         """ Generate 'ResultsFile' from EnergyPlus .eso or .sql file. """
-        eso_file = EsoFile.from_path(file_path, logger, ignore_peaks=True, year=year)
+        eso_file = EsoFile.from_path(
+            file_path, logger, ignore_peaks=True, year=year, value_dtype=value_dtype
+        )
         return GenericFile(
             eso_file.file_path,
             eso_file.file_name,
@@ -149,11 +162,17 @@ class GenericFile(BaseFile):
 
     @classmethod
     def from_eplus_multienv_file(
-        cls, file_path: PathLike, logger: BaseLogger = None, year: Optional[int] = None,
+        cls,
+        file_path: PathLike,
+        logger: BaseLogger = None,
+        year: Optional[int] = None,
+        value_dtype: Optional[Union[str, type]] = None,
     ) -> List["GenericFile"]:
         """ Generate 'ResultsFile' from EnergyPlus .eso file. """
         # peaks are only allowed on explicit EsoFile
-        eso_files = EsoFile.from_multienv_path(file_path, logger, ignore_peaks=True, year=year)
+        eso_files = EsoFile.from_multienv_path(
+            file_path, logger, ignore_peaks=True, year=year, value_dtype=value_dtype
+        )
         return [
             GenericFile(
                 ef.file_path,
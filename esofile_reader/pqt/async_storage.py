@@ -0,0 +1,274 @@
+import asyncio
+import contextlib
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional, List, Union, Dict, Any
+
+import pandas as pd
+import pyarrow as pa
+
+from esofile_reader.pqt.parquet_storage import ParquetStorage
+from esofile_reader.processing.progress_logger import AsyncLogger, get_running_loop
+from esofile_reader.typehints import ResultsFileType, PathLike, VariableType
+
+
+class _ReadWriteLock:
+    """ Asyncio lock which allows either multiple readers or a single writer. """
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire_read(self) -> None:
+        async with self._condition:
+            # waiting writers take precedence so these are not starved
+            await self._condition.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+
+    async def release_read(self) -> None:
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self) -> None:
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writer and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+                self._condition.notify_all()
+            self._writer = True
+
+    async def release_write(self) -> None:
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+async def run_in_executor(
+    executor: Optional[Executor], func: Callable[[], Any], logger: AsyncLogger = None
+) -> Any:
+    """
+    Run blocking function in executor without blocking the event loop.
+
+    When the awaiting task is cancelled, the function is asked to
+    stop using the logger and the task waits until the function
+    actually finishes (storage is not consistent until then).
+
+    """
+    loop = get_running_loop()
+    if logger:
+        logger.bind()
+
+    def call():
+        if logger:
+            logger.check_cancelled()
+        return func()
+
+    future = loop.run_in_executor(executor, call)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if logger:
+            logger.cancel()
+        with contextlib.suppress(Exception):
+            await future
+        raise
+    finally:
+        if logger:
+            logger.close()
+
+
+class AsyncParquetStorage:
+    """
+    An asyncio facade of 'ParquetStorage'.
+
+    Blocking parquet and zip I/O runs in a bounded thread pool.
+    Operations which modify the storage (delete, merge, save and
+    committing stored files) are exclusive while results can be
+    read by many concurrent requests.
+
+    Progress of long running operations is published by an
+    'AsyncLogger' which can be consumed as an async stream.
+    Cancelling a task stops the blocking operation on its next
+    progress report.
+
+    Parameters
+    ----------
+    storage : ParquetStorage, default None
+        A wrapped storage, new storage is created when not given.
+    executor : Executor, default None
+        An executor to run blocking calls, thread pool with
+        'max_workers' threads is created (and shut down on
+        'close') when not given.
+    max_workers : int, default None
+        Size of created thread pool, 'MAX_WORKERS' is used when
+        not specified.
+
+    """
+
+    MAX_WORKERS = 4
+
+    def __init__(
+        self,
+        storage: ParquetStorage = None,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.storage = storage if storage else ParquetStorage()
+        self._owns_executor = executor is None
+        self._executor = (
+            executor if executor else ThreadPoolExecutor(max_workers or self.MAX_WORKERS)
+        )
+        self._lock = None
+
+    async def __aenter__(self) -> "AsyncParquetStorage":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    @property
+    def files(self) -> Dict[int, Any]:
+        return self.storage.files
+
+    def _get_lock(self) -> _ReadWriteLock:
+        # asyncio primitives need to be created within running loop
+        if self._lock is None:
+            self._lock = _ReadWriteLock()
+        return self._lock
+
+    def _create_logger(self, logger: Optional[AsyncLogger]) -> AsyncLogger:
+        return logger if logger else AsyncLogger(self.storage.workdir.name)
+
+    async def _read(self, func: Callable[[], Any]) -> Any:
+        lock = self._get_lock()
+        await lock.acquire_read()
+        try:
+            return await run_in_executor(self._executor, func)
+        finally:
+            await lock.release_read()
+
+    async def _write(self, func: Callable[[], Any], logger: Optional[AsyncLogger]) -> Any:
+        lock = self._get_lock()
+        await lock.acquire_write()
+        try:
+            return await run_in_executor(self._executor, func, logger)
+        finally:
+            await lock.release_write()
+
+    @classmethod
+    async def load_storage(
+        cls,
+        path: PathLike,
+        logger: AsyncLogger = None,
+        lazy: bool = False,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+    ) -> "AsyncParquetStorage":
+        """ Load storage from filesystem, see 'ParquetStorage.load_storage'. """
+        logger = logger if logger else AsyncLogger(Path(path).name)
+        owns_executor = executor is None
+        executor = executor if executor else ThreadPoolExecutor(max_workers or cls.MAX_WORKERS)
+        func = partial(ParquetStorage.load_storage, path, logger=logger, lazy=lazy)
+        try:
+            storage = await run_in_executor(executor, func, logger)
+        except BaseException as e:
+            if owns_executor:
+                executor.shutdown(wait=False)
+            raise e
+        async_storage = cls(storage, executor=executor)
+        async_storage._owns_executor = owns_executor
+        return async_storage
+
+    def get_all_file_names(self) -> List[str]:
+        return self.storage.get_all_file_names()
+
+    async def store_file(
+        self, results_file: ResultsFileType, logger: AsyncLogger = None, **kwargs
+    ) -> int:
+        """
+        Store results file, see 'ParquetStorage.store_file' for keyword arguments.
+
+        Parquets are staged concurrently with other operations, only
+        adding the staged file into storage is exclusive.
+
+        """
+        logger = self._create_logger(logger)
+        func = partial(self.storage.stage_file, results_file, logger=logger, **kwargs)
+        path = await run_in_executor(self._executor, func, logger)
+        ids = []
+
+        def commit():
+            ids.extend(self.storage.commit(path))
+
+        try:
+            await self._write(commit, None)
+        except BaseException as e:
+            # commit runs to completion even when awaiting task is cancelled,
+            # stored file must be kept as it's already visible to other tasks
+            if ids:
+                logging.warning(f"File has been stored with id '{ids[0]}' before {e!r}.")
+            else:
+                self.storage.discard(path)
+            raise e
+        return ids[0]
+
+    async def delete_file(self, id_: int, logger: AsyncLogger = None) -> None:
+        logger = self._create_logger(logger)
+        await self._write(partial(self.storage.delete_file, id_, logger=logger), logger)
+
+    async def merge_with(
+        self, storage_paths: Union[PathLike, List[PathLike]], logger: AsyncLogger = None
+    ) -> None:
+        logger = self._create_logger(logger)
+        func = partial(self.storage.merge_with, storage_paths, logger=logger)
+        await self._write(func, logger)
+
+    async def save_as(self, dir_: PathLike, name: str, logger: AsyncLogger = None) -> Path:
+        logger = self._create_logger(logger)
+        return await self._write(partial(self.storage.save_as, dir_, name, logger), logger)
+
+    async def save(self, logger: AsyncLogger = None) -> Path:
+        logger = self._create_logger(logger)
+        return await self._write(partial(self.storage.save, logger), logger)
+
+    async def get_results(self, id_: int, *args, **kwargs) -> pd.DataFrame:
+        """ Get processed results of given file, see 'BaseFile.get_results'. """
+        return await self._read(partial(self.storage.files[id_].get_results, *args, **kwargs))
+
+    async def get_results_tables(
+        self,
+        id_: int,
+        variables: Union[VariableType, List[VariableType], List[int]],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        part_match: bool = False,
+    ) -> Dict[str, pa.Table]:
+        """ Get raw results as arrow tables, see 'ParquetFile.get_results_tables'. """
+        func = partial(
+            self.storage.files[id_].get_results_tables,
+            variables,
+            start_date=start_date,
+            end_date=end_date,
+            part_match=part_match,
+        )
+        return await self._read(func)
+
+    async def close(self) -> None:
+        """ Wait for running operations and shut down owned executor. """
+        lock = self._get_lock()
+        await lock.acquire_write()
+        try:
+            if self._owns_executor:
+                self._executor.shutdown(wait=False)
+        finally:
+            await lock.release_write()
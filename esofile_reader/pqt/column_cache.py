@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Iterable
+
+import pyarrow as pa
+
+CacheKey = Tuple[str, str, str]
+
+
+class ColumnCache:
+    """
+    Least recently used cache of decoded arrow columns.
+
+    Columns are identified by a (frame workdir, parquet name,
+    parquet column id) key. Parquets are never modified once
+    written so entries only need to be removed when the parquet
+    itself is removed.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum size of cached arrays in bytes.
+
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key: CacheKey):
+        return key in self._items
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+            "max_size": self.max_size,
+            "n_items": len(self._items),
+        }
+
+    def get(self, key: CacheKey) -> Optional[pa.ChunkedArray]:
+        """ Get cached column, None is returned when column is not cached. """
+        with self._lock:
+            array = self._items.get(key)
+            if array is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return array
+
+    def put(self, key: CacheKey, array: pa.ChunkedArray) -> None:
+        """ Store column, least recently used columns are evicted when cache is full. """
+        size = array.nbytes
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key).nbytes
+            self._items[key] = array
+            self.size += size
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+
+    def resize(self, max_size: int) -> None:
+        """ Change cache size, evicting columns when necessary. """
+        with self._lock:
+            self.max_size = max_size
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, workdir: str, pqt_names: Optional[Iterable[str]] = None) -> None:
+        """ Remove columns of given parquets, all frame columns are removed if not given. """
+        pqt_names = set(pqt_names) if pqt_names is not None else None
+        with self._lock:
+            keys = [
+                k
+                for k in self._items
+                if k[0] == workdir and (pqt_names is None or k[1] in pqt_names)
+            ]
+            for key in keys:
+                self.size -= self._items.pop(key).nbytes
+
+    def clear(self) -> None:
+        """ Remove all columns and reset statistics. """
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -0,0 +1,73 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from esofile_reader.pqt.parquet_tables import ParquetFrame, ParquetTables, unlink_file
+
+
+class FeatherFrame(ParquetFrame):
+    """
+    A parquet frame which stores data in Arrow IPC (Feather) files.
+
+    Data files are written uncompressed so these can be memory
+    mapped and columns are accessed without decompression and
+    decoding, reads are zero-copy both from workdir and from
+    uncompressed archive members. Files are considerably larger
+    than parquets so this is meant for local, latency sensitive
+    use.
+
+    Data files are split into record batches of 'ROW_GROUP_SIZE'
+    (or profile 'row_group_size') rows. Index and reference
+    parquets, layouts, delta files and column cache work the
+    same way as in 'ParquetFrame', profile compression options
+    apply only to index and reference parquets.
+
+    """
+
+    DATA_FILE_EXT = ".arrow"
+
+    def _write_data_file(self, df: pd.DataFrame, path: Path) -> None:
+        """ Write DataFrame with parquet id columns as uncompressed IPC file. """
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        unlink_file(path)
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(
+                    table, max_chunksize=self.profile.row_group_size or self.ROW_GROUP_SIZE
+                )
+
+    def _read_n_columns(self, pqt_name: str) -> int:
+        """ Read number of columns stored in given IPC file. """
+        source = self._get_source(pqt_name)
+        if isinstance(source, Path):
+            source = pa.memory_map(str(source), "r")
+        with source:
+            return len(pa.ipc.open_file(source).schema)
+
+    def _read_table_from_parquet(
+        self,
+        pqt_name: str,
+        columns: List[int] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> pa.Table:
+        """ Read arrow table from memory mapped IPC file, no data is copied. """
+        source = self._get_source(pqt_name)
+        if isinstance(source, Path):
+            source = pa.memory_map(str(source), "r")
+        with source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns:
+            table = table.select(list(map(str, columns)))
+        if row_range is not None:
+            start, stop = row_range
+            table = table.slice(start, stop - start)
+        return table
+
+
+class FeatherTables(ParquetTables):
+    """ Parquet tables which store data in memory mapped Arrow IPC files. """
+
+    BACKEND = "feather"
+    FRAME_CLASS = FeatherFrame
@@ -0,0 +1,281 @@
+import json
+import struct
+import threading
+from collections import deque
+from concurrent.futures import Future, wait
+from pathlib import Path
+from typing import List, Callable, Optional, Union
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
+
+import pyarrow as pa
+
+from esofile_reader.pqt.thread_pools import get_thread_pool
+from esofile_reader.processing.progress_logger import BaseLogger
+from esofile_reader.typehints import PathLike
+
+LOCAL_HEADER_SIZE = 30
+COPY_CHUNK_SIZE = 1 << 20
+ZIP64_LIMIT = (1 << 31) - 1
+MANIFEST_JSON = "manifest.json"
+
+
+class ParquetArchive:
+    """
+    Read only access to members of .cff and .cfs zip archives.
+
+    Parquets are stored uncompressed (ZIP_STORED) so archive
+    members can be served as zero-copy slices of memory mapped
+    archive without being extracted. Compressed members are
+    decompressed into memory.
+
+    Archives can be updated by appending members, in such case
+    'manifest.json' lists valid members and remaining ones are
+    considered as garbage.
+
+    Mapped file cannot be replaced or truncated on Windows, call
+    'close' before the archive file is modified, members are read
+    from the file without mapping afterwards.
+
+    Parameters
+    ----------
+    path : PathLike
+        A path of the zip archive.
+
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path).absolute()
+        self._infos = {}
+        self._dirs = None
+        self._garbage_size = 0
+        self._buffer = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """ Read archive central directory, this is required when archive changes. """
+        with ZipFile(self.path, "r") as zf:
+            all_infos = zf.infolist()
+            # latest member wins when an archive contains duplicate names
+            infos = {info.filename: info for info in all_infos}
+            manifest = infos.pop(MANIFEST_JSON, None)
+            if manifest is not None:
+                names = json.loads(zf.read(manifest))
+                infos = {name: infos[name] for name in names}
+        live = set(map(id, [*infos.values(), manifest]))
+        garbage_size = sum(
+            info.compress_size for info in all_infos if id(info) not in live
+        )
+        with self._lock:
+            self._infos = infos
+            self._dirs = None
+            self._garbage_size = garbage_size
+            self._buffer = None
+            self._closed = False
+
+    def close(self) -> None:
+        """ Release memory mapped archive, mapping is released with the last member buffer. """
+        with self._lock:
+            self._buffer = None
+            self._closed = True
+
+    @property
+    def garbage_size(self) -> int:
+        """ Size of members which are not valid anymore. """
+        return self._garbage_size
+
+    def infolist(self) -> List[ZipInfo]:
+        return list(self._infos.values())
+
+    def namelist(self) -> List[str]:
+        return list(self._infos.keys())
+
+    def contains(self, name: str) -> bool:
+        return name in self._infos
+
+    def get_info(self, name: str) -> ZipInfo:
+        return self._infos[name]
+
+    def list_dirs(self, prefix: str = "") -> List[str]:
+        """ Get directories stored directly under given prefix ('dir/' or ''). """
+        with self._lock:
+            if self._dirs is None:
+                dirs = {}
+                for name in self._infos:
+                    parts = name.split("/")[:-1]
+                    for i, dir_ in enumerate(parts):
+                        children = dirs.setdefault("".join(f"{p}/" for p in parts[:i]), {})
+                        children[dir_] = None
+                self._dirs = {k: list(v) for k, v in dirs.items()}
+            return list(self._dirs.get(prefix, []))
+
+    def _get_buffer(self) -> Optional[pa.Buffer]:
+        """ Memory map whole archive, None is returned when archive is closed. """
+        with self._lock:
+            if self._buffer is None and not self._closed:
+                with pa.memory_map(str(self.path), "r") as mm:
+                    self._buffer = mm.read_buffer()
+            return self._buffer
+
+    @staticmethod
+    def _get_data_offset(header: bytes, info: ZipInfo) -> int:
+        """ Find start of member data, local header can differ from the central one. """
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        return info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+    def _read_stored(self, info: ZipInfo) -> pa.Buffer:
+        """ Read uncompressed member directly from closed archive. """
+        # central directory can be overwritten when archive is being appended
+        with open(self.path, "rb") as f:
+            f.seek(info.header_offset)
+            f.seek(self._get_data_offset(f.read(LOCAL_HEADER_SIZE), info))
+            return pa.py_buffer(f.read(info.file_size))
+
+    def read_buffer(self, name: str) -> pa.Buffer:
+        """ Get member content, uncompressed members are not copied. """
+        info = self._infos[name]
+        if info.compress_type == ZIP_STORED:
+            buffer = self._get_buffer()
+            if buffer is None:
+                return self._read_stored(info)
+            header = buffer.slice(info.header_offset, LOCAL_HEADER_SIZE).to_pybytes()
+            return buffer.slice(self._get_data_offset(header, info), info.file_size)
+        with ZipFile(self.path, "r") as zf:
+            return pa.py_buffer(zf.read(info))
+
+    def read_bytes(self, name: str) -> bytes:
+        """ Get member content as bytes. """
+        return self.read_buffer(name).to_pybytes()
+
+    def open(self, name: str) -> pa.BufferReader:
+        """ Get a file like object to read given member. """
+        return pa.BufferReader(self.read_buffer(name))
+
+    def extract(self, name: str, path: PathLike) -> Path:
+        """ Write member content into given path. """
+        path = Path(path)
+        with open(path, "wb") as f:
+            self._write_buffer(self.read_buffer(name), f)
+        return path
+
+    def copy_member(self, name: str, zf: ZipFile, arcname: str) -> None:
+        """ Copy member into another zip archive without decompressing it into memory. """
+        info = ZipInfo(arcname, date_time=self._infos[name].date_time)
+        info.compress_type = ZIP_STORED
+        buffer = self.read_buffer(name)
+        with zf.open(info, "w", force_zip64=buffer.size > ZIP64_LIMIT) as f:
+            self._write_buffer(buffer, f)
+
+    @staticmethod
+    def _write_buffer(buffer: pa.Buffer, f) -> None:
+        """ Write buffer content in chunks. """
+        view = memoryview(buffer)
+        for start in range(0, len(view), COPY_CHUNK_SIZE):
+            f.write(view[start : start + COPY_CHUNK_SIZE])
+
+
+def find_archive_dirs(archive: ParquetArchive, prefix: str = "") -> List[str]:
+    """ Find directories stored directly under given prefix. """
+    return archive.list_dirs(prefix)
+
+
+def get_archive_dir(path: Path, relative_to: Path) -> str:
+    """ Get archive prefix of given directory. """
+    return f"{path.relative_to(relative_to).as_posix()}/"
+
+
+class ArchiveWriter:
+    """
+    Write members into zip archive using a shared thread pool.
+
+    Member content (reading files, serializing parquets) is
+    prepared concurrently while writes into the archive are
+    serialized on the calling thread, members are written in
+    the order of submission. Number of prepared members held
+    in memory is limited by 'MAX_PENDING' and files larger
+    than 'MAX_BUFFERED_SIZE' are streamed directly.
+
+    Parquets are already compressed so the archive members
+    are stored uncompressed (see 'ParquetArchive').
+
+    Parameters
+    ----------
+    zf : ZipFile
+        An archive opened for writing.
+    logger : BaseLogger, default None
+        A logger to report progress.
+    max_workers : int, default None
+        Size of shared thread pool, 'MAX_WORKERS' is used when
+        not specified.
+
+    """
+
+    MAX_WORKERS = 8
+    MAX_PENDING = 32
+    MAX_BUFFERED_SIZE = 64 << 20
+
+    def __init__(self, zf: ZipFile, logger: BaseLogger = None, max_workers: int = None):
+        self.zf = zf
+        self.logger = logger
+        self._executor = get_thread_pool(max_workers or self.MAX_WORKERS)
+        self._pending = deque()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            futures = [future for _, future, _ in self._pending if future]
+            for future in futures:
+                future.cancel()
+            # thread pool is shared, only wait for members already being prepared
+            wait(futures)
+
+    def _add(
+        self,
+        write: Callable[[Optional[bytes]], None],
+        future: Optional[Future] = None,
+        progress: bool = True,
+    ) -> None:
+        self._pending.append((write, future, progress))
+        while len(self._pending) > self.MAX_PENDING:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        write, future, progress = self._pending.popleft()
+        write(future.result() if future else None)
+        if progress and self.logger:
+            self.logger.increment_progress()
+
+    def _write_bytes(self, arcname: str, data: Union[bytes, pa.Buffer]) -> None:
+        self.zf.writestr(arcname, memoryview(data))
+
+    def write_file(self, arcname: str, path: Path, progress: bool = True) -> None:
+        """ Add a file from filesystem. """
+        if path.stat().st_size > self.MAX_BUFFERED_SIZE:
+            self._add(lambda _: self.zf.write(path, arcname=arcname), progress=progress)
+        else:
+            future = self._executor.submit(path.read_bytes)
+            self._add(lambda data: self._write_bytes(arcname, data), future, progress)
+
+    def write_buffer(
+        self, arcname: str, func: Callable[[], Union[bytes, pa.Buffer]], progress: bool = True
+    ) -> None:
+        """ Add a member which content is created by given function. """
+        future = self._executor.submit(func)
+        self._add(lambda data: self._write_bytes(arcname, data), future, progress)
+
+    def copy_member(
+        self, archive: ParquetArchive, name: str, arcname: str, progress: bool = True
+    ) -> None:
+        """ Add a member of another archive. """
+        self._add(lambda _: archive.copy_member(name, self.zf, arcname), progress=progress)
+
+    def flush(self) -> None:
+        """ Write all pending members. """
+        while self._pending:
+            self._write_next()
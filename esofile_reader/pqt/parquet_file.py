@@ -1,19 +1,51 @@
 import contextlib
 import io
 import json
+import os
 import shutil
 import tempfile
 from copy import copy
 from datetime import datetime
 from pathlib import Path
-from typing import Union, Tuple, Dict, Any
+from typing import Union, Tuple, Dict, Any, Optional, List, Set
 from zipfile import ZipFile
 
+import pyarrow as pa
+
 from esofile_reader.abstractions.base_file import BaseFile
-from esofile_reader.pqt.parquet_tables import ParquetFrame, ParquetTables, get_unique_workdir
+from esofile_reader.pqt.feather_tables import FeatherTables
+from esofile_reader.pqt.parquet_archive import ParquetArchive, ArchiveWriter
+from esofile_reader.pqt.parquet_tables import (
+    ParquetFrame,
+    ParquetTables,
+    get_unique_workdir,
+    CHUNKED_LAYOUT,
+)
+from esofile_reader.pqt.storage_profile import StorageProfile
 from esofile_reader.processing.progress_logger import BaseLogger
 from esofile_reader.search_tree import Tree
-from esofile_reader.typehints import ResultsFileType, PathLike
+from esofile_reader.typehints import (
+    ResultsFileType,
+    PathLike,
+    VariableType,
+    Variable,
+    SimpleVariable,
+)
+
+BACKENDS = {
+    ParquetTables.BACKEND: ParquetTables,
+    FeatherTables.BACKEND: FeatherTables,
+}
+
+
+def get_tables_class(backend: Optional[str]) -> type:
+    """ Get tables class of given storage backend, 'parquet' is used when None. """
+    if backend is None:
+        return ParquetTables
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Invalid backend '{backend}', allowed values are: {list(BACKENDS)}.")
 
 
 class ParquetFile(BaseFile):
@@ -22,7 +54,8 @@ class ParquetFile(BaseFile):
 
     Attributes need to be populated from processed 'ResultsFileType'.
 
-    Tables are stored in filesystem as pyarrow parquets.
+    Tables are stored in filesystem as pyarrow parquets or
+    as Arrow IPC files (see 'BACKENDS').
 
     Attributes
     ----------
@@ -45,6 +78,11 @@ class ParquetFile(BaseFile):
     -----
     Reference file must be complete!
 
+    Header catalogue is stored in info json. Files loaded from
+    info with the catalogue build the search tree from it on
+    first access and table reference parquets are also read on
+    demand, so the file is opened without reading its tables.
+
     Workdir needs to be cleaned up. This can be done
     either by calling 'clean_up()' or working with file
     with context manager:
@@ -56,6 +94,7 @@ class ParquetFile(BaseFile):
 
     EXT = ".cff"
     INFO_JSON = "info.json"
+    HEADER_KEY = "header"
 
     def __init__(
         self,
@@ -66,13 +105,27 @@ class ParquetFile(BaseFile):
         file_created: datetime,
         file_type: str,
         workdir: Path,
-        search_tree: Tree,
+        search_tree: Optional[Tree],
+        header: Optional[Dict[str, List[list]]] = None,
     ):
         self.id_ = id_
         self.workdir = workdir.absolute()
         self.tables = tables
+        self._saved_info = None
+        self._header = header
         super().__init__(file_path, file_name, file_created, tables, search_tree, file_type)
 
+    @property
+    def search_tree(self) -> Optional[Tree]:
+        header = self._header
+        if self._search_tree is None and header is not None:
+            self._search_tree = Tree.from_header_dict(self._header_from_json(header))
+        return self._search_tree
+
+    @search_tree.setter
+    def search_tree(self, tree: Optional[Tree]) -> None:
+        self._search_tree = tree
+
     def __copy__(self):
         new_workdir = get_unique_workdir(self.workdir)
         return self._copy(new_workdir)
@@ -87,7 +140,8 @@ class ParquetFile(BaseFile):
             file_created=self.file_created,
             file_type=self.file_type,
             workdir=new_workdir,
-            search_tree=copy(self.search_tree),
+            search_tree=copy(self._search_tree),
+            header=self._header,
         )
         return new_file
 
@@ -103,11 +157,13 @@ class ParquetFile(BaseFile):
         return self.workdir.name
 
     @classmethod
-    def predict_number_of_parquets(cls, results_file: ResultsFileType) -> int:
+    def predict_number_of_parquets(
+        cls, results_file: ResultsFileType, layout: str = CHUNKED_LAYOUT
+    ) -> int:
         """ Calculate future number of parquets for given Results file. """
         n = 0
         for df in results_file.tables.values():
-            n += ParquetFrame.predict_n_parquets(df)
+            n += ParquetFrame.predict_n_parquets(df, layout)
         return n
 
     @classmethod
@@ -117,10 +173,27 @@ class ParquetFile(BaseFile):
         results_file: ResultsFileType,
         pardir: PathLike = "",
         logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
+        backend: Optional[str] = None,
     ) -> "ParquetFile":
+        tables_class = get_tables_class(backend)
         workdir = Path(pardir, f"file-{id_}")
         workdir.mkdir()
-        tables = ParquetTables.from_dftables(results_file.tables, workdir, logger)
+        try:
+            tables = tables_class.from_dftables(
+                results_file.tables,
+                workdir,
+                logger,
+                value_dtype=value_dtype,
+                layout=layout,
+                profile=profile,
+            )
+        except Exception as e:
+            # storing can be cancelled using logger
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise e
         pqf = ParquetFile(
             id_=id_,
             file_path=results_file.file_path,
@@ -155,13 +228,136 @@ class ParquetFile(BaseFile):
             zf.extractall(file_dir)
         return file_dir, info
 
+    @staticmethod
+    def _header_to_json(
+        header_dct: Dict[str, Dict[int, VariableType]]
+    ) -> Dict[str, List[list]]:
+        """ Convert header dictionary into json serializable catalogue. """
+        return {
+            table: [[int(id_), *variable] for id_, variable in variables.items()]
+            for table, variables in header_dct.items()
+        }
+
+    @staticmethod
+    def _header_from_json(header: Dict[str, List[list]]) -> Dict[str, Dict[int, VariableType]]:
+        """ Convert stored catalogue into header dictionary. """
+        header_dct = {}
+        for table, rows in header.items():
+            header_dct[table] = {
+                row[0]: SimpleVariable(*row[1:]) if len(row) == 4 else Variable(*row[1:])
+                for row in rows
+            }
+        return header_dct
+
+    @classmethod
+    def _is_deferred(cls, info: Dict[str, Any]) -> bool:
+        """ Tables can be read on demand when search tree does not need them. """
+        return cls.HEADER_KEY in info
+
+    @classmethod
+    def _from_info(
+        cls, info: Dict[str, Any], tables: ParquetTables, workdir: Path
+    ) -> "ParquetFile":
+        """ Create parquet file instance using stored attributes. """
+        header = info.get(cls.HEADER_KEY)
+        tree = None if header else Tree.from_header_dict(tables.get_all_variables_dct())
+        return ParquetFile(
+            id_=info["id"],
+            file_path=Path(info["file_path"]),
+            file_name=info["file_name"],
+            file_created=datetime.fromtimestamp(info["file_created"]),
+            tables=tables,
+            file_type=info["file_type"],
+            workdir=workdir,
+            search_tree=tree,
+            header=header,
+        )
+
+    @classmethod
+    def read_archive_info(
+        cls, archive: ParquetArchive, archive_dir: str = ""
+    ) -> Dict[str, Any]:
+        """ Get content of info json stored in archive. """
+        return json.loads(archive.read_bytes(f"{archive_dir}{cls.INFO_JSON}"))
+
+    @classmethod
+    def get_archive_members(cls, archive: ParquetArchive, archive_dir: str = "") -> List[str]:
+        """ Get names of archive members holding file tables. """
+        info_name = f"{archive_dir}{cls.INFO_JSON}"
+        return [n for n in archive.namelist() if n.startswith(archive_dir) and n != info_name]
+
+    @classmethod
+    def extract_from_archive(
+        cls,
+        archive: ParquetArchive,
+        archive_dir: str,
+        workdir: Path,
+        info: Dict[str, Any] = None,
+        logger: BaseLogger = None,
+    ) -> "ParquetFile":
+        """
+        Extract file members from archive directly into given workdir.
+
+        Stored attributes can be replaced using 'info' dictionary,
+        (for example 'id' and 'file_name').
+
+        """
+        info = {**cls.read_archive_info(archive, archive_dir), **(info if info else {})}
+        info["name"] = workdir.name
+        workdir.mkdir()
+        try:
+            for member in cls.get_archive_members(archive, archive_dir):
+                path = Path(workdir, member[len(archive_dir) :])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                archive.extract(member, path)
+                if logger:
+                    logger.increment_progress()
+            tables_class = get_tables_class(info.get("backend"))
+            tables = tables_class.from_fs(workdir, deferred=cls._is_deferred(info))
+        except Exception as e:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise e
+        pqf = cls._from_info(info, tables, workdir)
+        pqf.mark_unsaved()
+        return pqf
+
+    @classmethod
+    def from_archive(
+        cls, archive: ParquetArchive, archive_dir: str = "", dest_dir: PathLike = ""
+    ) -> "ParquetFile":
+        """ Create parquet file instance, parquets are read from archive on demand. """
+        info = cls.read_archive_info(archive, archive_dir)
+        workdir = Path(dest_dir, f"{info['name']}")
+        workdir.mkdir()
+        try:
+            tables_class = get_tables_class(info.get("backend"))
+            tables = tables_class.from_archive(
+                archive, workdir, archive_dir, deferred=cls._is_deferred(info)
+            )
+        except Exception as e:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise e
+        return cls._from_info(info, tables, workdir)
+
     @classmethod
     def from_file_system(
-        cls, source: PathLike, dest_dir: PathLike = "", logger: BaseLogger = None
+        cls,
+        source: PathLike,
+        dest_dir: PathLike = "",
+        logger: BaseLogger = None,
+        lazy: bool = False,
     ) -> "ParquetFile":
-        """ Create parquet file instance from filesystem files. """
+        """
+        Create parquet file instance from filesystem files.
+
+        When 'lazy' is True, '.cff' archive is not extracted and
+        parquets are read from the archive when requested.
+
+        """
         source = Path(source)
-        if source.suffix == cls.EXT:
+        if lazy and source.suffix == cls.EXT:
+            return cls.from_archive(ParquetArchive(source), dest_dir=dest_dir)
+        elif source.suffix == cls.EXT:
             workdir, info = cls._unzip_source_file(source, dest_dir)
         elif source.is_dir():
             with open(Path(source, cls.INFO_JSON), "r") as f:
@@ -170,18 +366,9 @@ class ParquetFile(BaseFile):
         else:
             raise IOError(f"Invalid file type. Only '{cls.EXT}' files are allowed")
 
-        tables = ParquetTables.from_fs(workdir)
-        tree = Tree.from_header_dict(tables.get_all_variables_dct())
-        pqf = ParquetFile(
-            id_=info["id"],
-            file_path=Path(info["file_path"]),
-            file_name=info["file_name"],
-            file_created=datetime.fromtimestamp(info["file_created"]),
-            tables=tables,
-            file_type=info["file_type"],
-            workdir=workdir,
-            search_tree=tree,
-        )
+        tables_class = get_tables_class(info.get("backend"))
+        tables = tables_class.from_fs(workdir, deferred=cls._is_deferred(info))
+        pqf = cls._from_info(info, tables, workdir)
         pqf.info_json_path.unlink()
         return pqf
 
@@ -190,41 +377,168 @@ class ParquetFile(BaseFile):
         return Path(self.workdir, self.INFO_JSON)
 
     def clean_up(self) -> None:
-        shutil.rmtree(self.workdir, ignore_errors=True)
+        # directories of frames being read are removed by their last reader
+        being_read = set()
+        for pqf in self.tables.values():
+            pqf.clean_up()
+            if pqf.n_readers:
+                being_read.add(pqf.workdir)
+        if not being_read:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+        elif self.workdir.exists():
+            for path in self.workdir.iterdir():
+                if path.is_dir() and path.absolute() not in being_read:
+                    shutil.rmtree(path, ignore_errors=True)
+                elif not path.is_dir():
+                    path.unlink()
+
+    def get_info(self) -> Dict[str, Any]:
+        """ Get file attributes stored in info json. """
+        return {
+            "id": self.id_,
+            "file_path": str(self.file_path),
+            "file_name": self.file_name,
+            "file_created": self.file_created.timestamp(),
+            "file_type": self.file_type,
+            "name": self.name,
+            "backend": self.tables.BACKEND,
+            self.HEADER_KEY: self.get_header(),
+        }
+
+    def get_header(self) -> Dict[str, List[list]]:
+        """ Get json serializable header catalogue. """
+        # catalogue item is only valid until its table is loaded (and possibly modified)
+        catalogue = self._header if self._header is not None else {}
+        header = {}
+        for table, pqf in self.tables.items():
+            if pqf.deferred and table in catalogue:
+                header[table] = catalogue[table]
+            else:
+                variables = {table: self.tables.get_variables_dct(table)}
+                header.update(self._header_to_json(variables))
+        return header
+
+    def save_to_fs(self) -> None:
+        """ Write info json and reference parquets, see 'from_file_system'. """
+        with open(str(self.info_json_path), "w") as f:
+            json.dump(self.get_info(), f)
+        for pqf in self.tables.values():
+            pqf.save_reference_parquets()
 
     @contextlib.contextmanager
     def temporary_attribute_json(self) -> Path:
         with open(str(self.info_json_path), "w") as f:
-            json.dump(
-                {
-                    "id": self.id_,
-                    "file_path": str(self.file_path),
-                    "file_name": self.file_name,
-                    "file_created": self.file_created.timestamp(),
-                    "file_type": self.file_type,
-                    "name": self.name,
-                },
-                f,
-                indent=4,
-            )
+            json.dump(self.get_info(), f)
         try:
             yield self.info_json_path
         finally:
             self.info_json_path.unlink()
 
+    def get_results_tables(
+        self,
+        variables: Union[VariableType, List[VariableType], List[int]],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        part_match: bool = False,
+    ) -> Dict[str, pa.Table]:
+        """
+        Get results as arrow tables without converting into pandas.
+
+        Results are not processed (no units conversion or aggregation),
+        output includes a table for each matching table name.
+        See 'ParquetFrame.as_arrow' for table structure.
+
+        """
+        table_id_map = self.find_table_id_map(variables, part_match=part_match)
+        return {
+            table: self.tables.get_results_table(table, ids, start_date, end_date)
+            for table, ids in table_id_map.items()
+        }
+
     def count_parquets(self):
         """ Count all child parquets. """
         return sum(pqf.parquet_count for pqf in self.tables.values())
 
+    def migrate_layout(self, layout: str, logger: BaseLogger = None) -> None:
+        """ Rewrite all tables using given parquet frame layout. """
+        self.tables.migrate_layout(layout, logger)
+
+    def vacuum(self, force: bool = False, logger: BaseLogger = None) -> int:
+        """ Repack fragmented tables, see 'ParquetFrame.vacuum'. """
+        return self.tables.vacuum(force, logger)
+
+    def _is_info_unsaved(
+        self, info: Dict[str, Any], relative_to: Path, saved_members: Set[str]
+    ) -> bool:
+        info_name = self.info_json_path.relative_to(relative_to).as_posix()
+        return info != self._saved_info or info_name not in saved_members
+
+    def has_unsaved_changes(self, relative_to: Path, saved_members: Set[str]) -> bool:
+        """ Check if any item would be written when saving incrementally. """
+        return self._is_info_unsaved(self.get_info(), relative_to, saved_members) or any(
+            pqf.has_unsaved_changes(relative_to, saved_members) for pqf in self.tables.values()
+        )
+
+    def add_to_writer(
+        self, writer: ArchiveWriter, relative_to: Path, saved_members: Set[str] = None
+    ) -> None:
+        """
+        Add info json and all parquets to given archive writer.
+
+        When 'saved_members' are given, only items changed since
+        the file has been saved are added.
+
+        """
+        info = self.get_info()
+        info_name = self.info_json_path.relative_to(relative_to).as_posix()
+        if saved_members is None or self._is_info_unsaved(info, relative_to, saved_members):
+            writer.write_buffer(info_name, lambda: json.dumps(info).encode(), progress=False)
+        for pqt_frame in self.tables.values():
+            pqt_frame.add_to_writer(writer, relative_to, saved_members)
+
     def save_file_to_zip(self, zf: ZipFile, relative_to: Path, logger: BaseLogger = None):
-        with self.temporary_attribute_json() as f:
-            zf.write(f, arcname=f.relative_to(relative_to))
+        with ArchiveWriter(zf, logger) as writer:
+            self.add_to_writer(writer, relative_to)
+
+    def mark_saved(self) -> None:
+        """ Consider current state as stored in archive. """
+        self._saved_info = self.get_info()
+        for pqt_frame in self.tables.values():
+            pqt_frame.mark_saved()
+
+    def mark_unsaved(self) -> None:
+        """ Consider all items as changed since last save. """
+        self._saved_info = None
         for pqt_frame in self.tables.values():
-            pqt_frame.save_frame_to_zip(zf, relative_to, logger)
+            pqt_frame.mark_unsaved()
+
+    def get_member_names(self, relative_to: Path) -> List[str]:
+        """ Get archive names of all stored items. """
+        names = [self.info_json_path.relative_to(relative_to).as_posix()]
+        for pqt_frame in self.tables.values():
+            names.extend(pqt_frame.get_member_names(relative_to))
+        return names
+
+    def count_unsaved_parquets(self, relative_to: Path, saved_members: Set[str]) -> int:
+        """ Count parquets which need to be written when saving incrementally. """
+        return sum(
+            len(pqf.get_unsaved_parquet_paths(relative_to, saved_members))
+            for pqf in self.tables.values()
+        )
+
+    def uses_archive(self) -> bool:
+        """ Check if any of tables is served from an archive. """
+        return any(pqf.archive is not None for pqf in self.tables.values())
 
     def save_as(self, dir_: PathLike, name: str) -> Path:
         """ Save parquet storage into given location. """
         device = Path(dir_, f"{name}{self.EXT}")
-        with ZipFile(device, mode="w") as zf:
+        # archive is written into a temporary file as it can be a source of lazy tables
+        temp_device = device.with_name(f"{device.name}.tmp")
+        with ZipFile(temp_device, mode="w") as zf:
             self.save_file_to_zip(zf, self.workdir)
+        self.tables.close_archive()
+        os.replace(temp_device, device)
+        if self.uses_archive():
+            self.tables.set_archive(ParquetArchive(device), self.workdir)
         return device
@@ -1,23 +1,90 @@
+import contextlib
+import json
+import os
 import shutil
 import tempfile
+import threading
+import warnings
 from pathlib import Path
+from typing import Optional, Union, List
 from zipfile import ZipFile
 
 from esofile_reader.df.df_storage import DFStorage
 from esofile_reader.id_generator import incremental_id_gen, get_unique_name
-from esofile_reader.pqt.parquet_file import ParquetFile
-from esofile_reader.pqt.parquet_tables import get_unique_workdir
+from esofile_reader.pqt.column_cache import ColumnCache
+from esofile_reader.pqt.parquet_archive import (
+    ParquetArchive,
+    ArchiveWriter,
+    find_archive_dirs,
+    MANIFEST_JSON,
+)
+from esofile_reader.pqt.parquet_file import ParquetFile, get_tables_class
+from esofile_reader.pqt.parquet_tables import get_unique_workdir, CHUNKED_LAYOUT, exclusive
+from esofile_reader.pqt.storage_profile import StorageProfile, get_profile
 from esofile_reader.processing.progress_logger import BaseLogger
 from esofile_reader.typehints import ResultsFileType, PathLike
 
 
 class ParquetStorage(DFStorage):
+    """
+    A class to store multiple results files as parquets.
+
+    Storage is saved as a zip archive. Once the archive has been
+    saved or loaded, 'save' only appends items changed since then
+    and updates archive manifest. The archive is fully rewritten
+    when the size of obsolete members exceeds 'MAX_GARBAGE_RATIO'.
+
+    Results can be read by many threads while the storage is being
+    modified. Operations which modify the storage run one at a time
+    and 'files' is replaced (never mutated) once a file is added or
+    removed, parquet frames serve readers from immutable snapshots.
+
+    Files are stored in two steps. Parquets are written into a new
+    staging directory ('stage_file', this can run concurrently and
+    also in other processes using 'stage_results_file') and staged
+    directories are renamed into working directory by 'commit'.
+    Interrupted writes never leave partial files in the storage.
+
+    Parameters
+    ----------
+    workdir : PathLike, default None
+        A directory where parquets are stored, temporary
+        directory is created when not specified.
+    profile : {str, StorageProfile}, default None
+        Options used to write parquets of stored files,
+        this can be a name of predefined profile
+        ('default', 'speed' or 'archive').
+    cache_size : int, default None
+        Size of cache of decoded columns shared by all stored
+        files in bytes, 'CACHE_SIZE' is used when not specified
+        and zero disables caching.
+    backend : {'parquet', 'feather'}, default None
+        Format of data files of stored files, 'feather' stores
+        uncompressed memory mapped Arrow IPC files which are
+        faster to read but larger, 'parquet' is used when None.
+
+    """
+
     EXT = ".cfs"
+    STAGE_PREFIX = ".stage-"
+    MAX_GARBAGE_RATIO = 0.5
+    CACHE_SIZE = 128 << 20
 
-    def __init__(self, workdir: PathLike = None):
+    def __init__(
+        self,
+        workdir: PathLike = None,
+        profile: Union[str, StorageProfile, None] = None,
+        cache_size: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
         super().__init__()
         self.files = {}
         self.path = None
+        self._write_lock = threading.RLock()
+        self.profile = get_profile(profile)
+        self.backend = get_tables_class(backend).BACKEND
+        cache_size = self.CACHE_SIZE if cache_size is None else cache_size
+        self.column_cache = ColumnCache(cache_size) if cache_size else None
         if workdir:
             self.workdir = Path(workdir)
             self.workdir.mkdir()
@@ -31,99 +98,409 @@ class ParquetStorage(DFStorage):
         return self.copy_to(get_unique_workdir(self.workdir))
 
     def copy_to(self, new_workdir: Path):
-        pqs = ParquetStorage(new_workdir)
+        cache_size = self.column_cache.max_size if self.column_cache else 0
+        pqs = ParquetStorage(
+            new_workdir, profile=self.profile, cache_size=cache_size, backend=self.backend
+        )
         for id_, file in self.files.items():
             new_file = file.copy_to(new_workdir)
-            pqs.files[id_] = new_file
+            pqs._add_file(new_file)
         return pqs
 
+    def _add_file(self, file: ParquetFile) -> None:
+        """ Register parquet file, file tables share storage column cache. """
+        file.tables.set_column_cache(self.column_cache)
+        self.files = {**self.files, file.id_: file}
+
+    @exclusive
+    def set_cache_size(self, cache_size: int) -> None:
+        """ Change size of decoded columns cache, zero disables caching. """
+        if not cache_size:
+            self.column_cache = None
+            for file in self.files.values():
+                file.tables.set_column_cache(None)
+        elif self.column_cache is None:
+            self.column_cache = ColumnCache(cache_size)
+            for file in self.files.values():
+                file.tables.set_column_cache(self.column_cache)
+        else:
+            self.column_cache.resize(cache_size)
+
     @classmethod
-    def _load_storage(cls, path: Path, logger: BaseLogger) -> "ParquetStorage":
+    def _load_storage(
+        cls, path: Path, logger: BaseLogger, lazy: bool = False
+    ) -> "ParquetStorage":
         if path.suffix != cls.EXT:
             raise IOError(f"Invalid file type loaded. Only '{cls.EXT}' files are allowed")
         pqs = ParquetStorage()
         pqs.path = path
 
-        logger.log_section("unzipping files")
-        with ZipFile(path, "r") as zf:
-            zf.extractall(pqs.workdir)
+        if lazy:
+            logger.log_section("reading archive")
+            archive = ParquetArchive(path)
+            for dir_ in find_archive_dirs(archive):
+                if archive.contains(f"{dir_}/{ParquetFile.INFO_JSON}"):
+                    pqf = ParquetFile.from_archive(archive, f"{dir_}/", pqs.workdir)
+                    pqs._add_file(pqf)
+        else:
+            logger.log_section("unzipping files")
+            archive = ParquetArchive(path)
+            with ZipFile(path, "r") as zf:
+                zf.extractall(pqs.workdir, members=archive.infolist())
+
+            logger.log_section("creating parquet instances")
+            for dir_ in [d for d in pqs.workdir.iterdir() if d.is_dir()]:
+                pqf = ParquetFile.from_file_system(dir_)
+                pqs._add_file(pqf)
 
-        logger.log_section("creating parquet instances")
-        for dir_ in [d for d in pqs.workdir.iterdir() if d.is_dir()]:
-            pqf = ParquetFile.from_file_system(dir_)
-            pqs.files[pqf.id_] = pqf
+        for pqf in pqs.files.values():
+            pqf.mark_saved()
         return pqs
 
     @classmethod
-    def load_storage(cls, path: PathLike, logger: BaseLogger = None) -> "ParquetStorage":
-        """ Load ParquetStorage from filesystem. """
+    def load_storage(
+        cls, path: PathLike, logger: BaseLogger = None, lazy: bool = False
+    ) -> "ParquetStorage":
+        """
+        Load ParquetStorage from filesystem.
+
+        When 'lazy' is True, storage archive is not extracted,
+        only reference parquets are read when loading and data
+        parquets are served from the archive on demand.
+
+        """
         path = path if isinstance(path, Path) else Path(path)
         logger = logger if logger else BaseLogger(path.name)
         with logger.log_task("Load storage"):
-            return cls._load_storage(path, logger)
+            return cls._load_storage(path, logger, lazy=lazy)
+
+    @classmethod
+    def stage_results_file(
+        cls,
+        results_file: ResultsFileType,
+        staging_dir: PathLike,
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
+        backend: Optional[str] = None,
+    ) -> Path:
+        """
+        Write results file into a new directory within 'staging_dir'.
+
+        Staged directory holds parquets, reference parquets and info
+        json so this can be called from another process, staging
+        directory needs to be on the same filesystem as the storage
+        which commits the file. Returns path of staged file.
 
-    def store_file(self, results_file: ResultsFileType, logger: BaseLogger = None) -> int:
-        """ Store results file as persistent 'ParquetFile'. """
+        """
+        stage_dir = Path(tempfile.mkdtemp(prefix=cls.STAGE_PREFIX, dir=staging_dir))
+        try:
+            file = ParquetFile.from_results_file(
+                id_=0,
+                results_file=results_file,
+                pardir=stage_dir,
+                logger=logger,
+                value_dtype=value_dtype,
+                layout=layout,
+                profile=profile,
+                backend=backend,
+            )
+            file.save_to_fs()
+        except Exception as e:
+            # storing can be cancelled using logger
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            raise e
+        return file.workdir
+
+    def stage_file(
+        self,
+        results_file: ResultsFileType,
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
+        backend: Optional[str] = None,
+    ) -> Path:
+        """ Write results file into storage working directory, file is added by 'commit'. """
         logger = logger if logger else BaseLogger(self.workdir.name)
-        with logger.log_task(f"Store file {results_file.file_name}"):
+        with logger.log_task(f"Stage file {results_file.file_name}"):
             logger.log_section("calculating number of parquets")
-            n = ParquetFile.predict_number_of_parquets(results_file)
+            n = ParquetFile.predict_number_of_parquets(results_file, layout)
             logger.set_maximum_progress(n)
-            id_gen = incremental_id_gen(checklist=set(self.files.keys()))
-            id_ = next(id_gen)
 
             logger.log_section("writing parquets")
-            file = ParquetFile.from_results_file(
-                id_=id_, results_file=results_file, pardir=self.workdir, logger=logger,
+            return self.stage_results_file(
+                results_file,
+                self.workdir,
+                logger=logger,
+                value_dtype=value_dtype,
+                layout=layout,
+                profile=profile if profile else self.profile,
+                backend=backend if backend else self.backend,
             )
-            self.files[id_] = file
-        return id_
 
+    @exclusive
+    def commit(self, staged_paths: Union[PathLike, List[PathLike]]) -> List[int]:
+        """
+        Add staged files into storage, returns ids of added files.
+
+        Staged directories are renamed into working directory and
+        all files are published together once these are moved.
+        When any of the files cannot be added, already moved
+        directories are returned back to staging area.
+
+        """
+        staged_paths = staged_paths if isinstance(staged_paths, list) else [staged_paths]
+        id_gen = incremental_id_gen(checklist=set(self.files.keys()))
+        files = []
+        moved = []
+        try:
+            for path in map(Path, staged_paths):
+                id_ = next(id_gen)
+                workdir = Path(self.workdir, f"file-{id_}")
+                if workdir.exists():
+                    workdir = get_unique_workdir(workdir)
+                os.replace(path, workdir)
+                moved.append((path, workdir))
+                file = ParquetFile.from_file_system(workdir)
+                files.append(file)
+                file.id_ = id_
+                file.mark_unsaved()
+                file.tables.set_column_cache(self.column_cache)
+        except BaseException as e:
+            for i, (path, workdir) in reversed(list(enumerate(moved))):
+                try:
+                    # info json is consumed when file is loaded
+                    if i < len(files):
+                        files[i].save_to_fs()
+                    os.replace(workdir, path)
+                except Exception:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            raise e
+        for path, _ in moved:
+            with contextlib.suppress(OSError):
+                path.parent.rmdir()
+        self.files = {**self.files, **{file.id_: file for file in files}}
+        return [file.id_ for file in files]
+
+    def discard(self, staged_paths: Union[PathLike, List[PathLike]]) -> None:
+        """ Remove staged files which have not been committed. """
+        staged_paths = staged_paths if isinstance(staged_paths, list) else [staged_paths]
+        for path in map(Path, staged_paths):
+            shutil.rmtree(path, ignore_errors=True)
+            with contextlib.suppress(OSError):
+                path.parent.rmdir()
+
+    def store_file(
+        self,
+        results_file: ResultsFileType,
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
+        backend: Optional[str] = None,
+    ) -> int:
+        """ Store results file as persistent 'ParquetFile', see 'stage_file'. """
+        path = self.stage_file(
+            results_file,
+            logger=logger,
+            value_dtype=value_dtype,
+            layout=layout,
+            profile=profile,
+            backend=backend,
+        )
+        try:
+            return self.commit(path)[0]
+        except Exception as e:
+            self.discard(path)
+            raise e
+
+    @exclusive
+    def migrate_layout(self, layout: str, logger: BaseLogger = None) -> None:
+        """ Rewrite all stored tables using given parquet frame layout. """
+        logger = logger if logger else BaseLogger(self.workdir.name)
+        with logger.log_task(f"Migrate storage to '{layout}' layout"):
+            logger.set_maximum_progress(sum(len(f.table_names) for f in self.files.values()))
+            for file in self.files.values():
+                file.migrate_layout(layout, logger)
+
+    @exclusive
+    def vacuum(self, force: bool = False, logger: BaseLogger = None) -> int:
+        """
+        Repack fragmented tables of all files, see 'ParquetFrame.vacuum'.
+
+        Returns number of bytes reclaimed in the working directory,
+        call 'save' to reclaim space in the storage archive.
+
+        """
+        logger = logger if logger else BaseLogger(self.workdir.name)
+        with logger.log_task("Vacuum storage"):
+            logger.set_maximum_progress(sum(len(f.table_names) for f in self.files.values()))
+            return sum(file.vacuum(force, logger) for file in self.files.values())
+
+    @exclusive
     def delete_file(self, id_: int, logger: BaseLogger = None) -> None:
         """ Delete file with given id. """
         logger = logger if logger else BaseLogger(self.workdir.name)
         with logger.log_task(f"Delete file: {self.files[id_].file_name}"):
-            shutil.rmtree(self.files[id_].workdir, ignore_errors=True)
-            del self.files[id_]
+            files = dict(self.files)
+            file = files.pop(id_)
+            self.files = files
+            file.clean_up()
 
     def count_parquets(self):
         """ Count all child parquets. """
         return sum(pqf.count_parquets() for pqf in self.files.values())
 
+    def get_member_names(self) -> List[str]:
+        """ Get archive names of all stored items. """
+        names = []
+        for pqf in self.files.values():
+            names.extend(pqf.get_member_names(self.workdir))
+        return names
+
+    def _close_archives(self) -> None:
+        """ Unmap archives of lazy files, mapped archive cannot be modified on Windows. """
+        for pqf in self.files.values():
+            pqf.tables.close_archive()
+
+    def _mark_saved(self, path: Path) -> None:
+        """ Consider current state as stored in given archive. """
+        self.path = path
+        for pqf in self.files.values():
+            pqf.mark_saved()
+        lazy_files = [pqf for pqf in self.files.values() if pqf.uses_archive()]
+        if lazy_files:
+            archive = ParquetArchive(path)
+            for pqf in lazy_files:
+                pqf.tables.set_archive(archive, self.workdir)
+
+    @exclusive
     def save_as(self, dir_: PathLike, name: str, logger: BaseLogger = None) -> Path:
         """ Save parquet storage into given location. """
         logger = logger if logger else BaseLogger(self.workdir.name)
         with logger.log_task("save storage"):
             logger.set_maximum_progress(self.count_parquets())
             path = Path(dir_, f"{name}{self.EXT}")
-            with ZipFile(path, mode="w") as zf:
-                for pqf in self.files.values():
-                    pqf.save_file_to_zip(zf, self.workdir, logger)
-            self.path = path
+            # archive is written into a temporary file as it can be a source of lazy tables
+            temp_path = path.with_name(f"{path.name}.tmp")
+            with ZipFile(temp_path, mode="w") as zf:
+                with ArchiveWriter(zf, logger) as writer:
+                    for pqf in self.files.values():
+                        pqf.add_to_writer(writer, self.workdir)
+                zf.writestr(MANIFEST_JSON, json.dumps(self.get_member_names()))
+            self._close_archives()
+            os.replace(temp_path, path)
+            self._mark_saved(path)
         return path
 
+    def _is_full_save_required(self, archive: ParquetArchive, names: List[str]) -> bool:
+        """ Check if archive would contain too many obsolete members. """
+        obsolete = set(archive.namelist()).difference(names)
+        garbage_size = archive.garbage_size + sum(
+            archive.get_info(name).compress_size for name in obsolete
+        )
+        return garbage_size > self.MAX_GARBAGE_RATIO * archive.path.stat().st_size
+
+    @exclusive
+    def save_changes(self, logger: BaseLogger = None) -> Path:
+        """ Append items changed since last save into storage archive. """
+        logger = logger if logger else BaseLogger(self.workdir.name)
+        archive = ParquetArchive(self.path)
+        names = self.get_member_names()
+        if self._is_full_save_required(archive, names):
+            return self.save_as(self.path.parent, self.path.with_suffix("").name, logger)
+        saved_members = set(archive.namelist())
+        if set(names) == saved_members and not any(
+            pqf.has_unsaved_changes(self.workdir, saved_members) for pqf in self.files.values()
+        ):
+            return self.path
+        with logger.log_task("save storage changes"):
+            logger.set_maximum_progress(
+                sum(
+                    pqf.count_unsaved_parquets(self.workdir, saved_members)
+                    for pqf in self.files.values()
+                )
+            )
+            self._close_archives()
+            with warnings.catch_warnings():
+                # updated members are appended, manifest defines valid ones
+                warnings.filterwarnings(
+                    "ignore", message="Duplicate name", category=UserWarning
+                )
+                with ZipFile(self.path, mode="a") as zf:
+                    with ArchiveWriter(zf, logger) as writer:
+                        for pqf in self.files.values():
+                            pqf.add_to_writer(writer, self.workdir, saved_members)
+                    zf.writestr(MANIFEST_JSON, json.dumps(names))
+            self._mark_saved(self.path)
+        return self.path
+
+    @exclusive
     def save(self, logger: BaseLogger = None) -> Path:
-        """ Save parquet storage. """
+        """ Save parquet storage, only changes are written when archive exists. """
         if not self.path:
             raise FileNotFoundError("Path not defined! Call 'save_as' first.")
+        if self.path.exists():
+            return self.save_changes(logger)
         dir_ = self.path.parent
         name = self.path.with_suffix("").name
         return self.save_as(dir_, name, logger)
 
-    def merge_with(self, storage_path: PathLike, logger: BaseLogger = None) -> None:
-        """ Merge this storage with arbitrary number of other ones. """
+    @exclusive
+    def merge_with(
+        self, storage_paths: Union[PathLike, List[PathLike]], logger: BaseLogger = None
+    ) -> None:
+        """
+        Merge this storage with arbitrary number of other ones.
+
+        Archive members are extracted directly into final file
+        directories, ids and file names are renamed on the fly
+        when these already exist in this storage.
+
+        """
+        storage_paths = storage_paths if isinstance(storage_paths, list) else [storage_paths]
+        storage_paths = [Path(p) for p in storage_paths]
         logger = logger if logger else BaseLogger(self.workdir.name)
-        storage_path = Path(storage_path)
-        if not logger:
-            logger = BaseLogger(storage_path.name)
-        with logger.log_task(f"merge storage with {storage_path.name}"):
-            id_gen = incremental_id_gen(start=1, checklist=set(self.files.keys()))
-            temporary_storage = ParquetStorage._load_storage(storage_path, logger)
-            for id_, file in dict(sorted(temporary_storage.files.items())).items():
+        names = ", ".join(p.name for p in storage_paths)
+        with logger.log_task(f"merge storage with {names}"):
+            logger.log_section("reading archives")
+            sources = []
+            for path in storage_paths:
+                if path.suffix != self.EXT:
+                    raise IOError(
+                        f"Invalid file type merged. Only '{self.EXT}' files are allowed"
+                    )
+                archive = ParquetArchive(path)
+                dirs = [
+                    f"{dir_}/"
+                    for dir_ in find_archive_dirs(archive)
+                    if archive.contains(f"{dir_}/{ParquetFile.INFO_JSON}")
+                ]
+                infos = [ParquetFile.read_archive_info(archive, dir_) for dir_ in dirs]
+                # files are merged sorted by id to keep their order
+                for info, dir_ in sorted(zip(infos, dirs), key=lambda x: x[0]["id"]):
+                    sources.append((archive, dir_, info))
+            logger.set_maximum_progress(
+                sum(len(ParquetFile.get_archive_members(a, d)) for a, d, _ in sources)
+            )
+
+            logger.log_section("extracting files")
+            for archive, dir_, info in sources:
                 # create new identifiers in case that id already exists
-                new_id = next(id_gen) if id_ in self.files.keys() else id_
-                new_name = get_unique_name(file.file_name, self.get_all_file_names())
-                file.rename(new_name)
-                new_file = file.copy_to(self.workdir, new_id=new_id)
-                self.files[new_id] = new_file
-            del temporary_storage
+                id_ = info["id"]
+                if id_ in self.files:
+                    id_ = next(incremental_id_gen(start=1, checklist=set(self.files.keys())))
+                workdir = Path(self.workdir, f"file-{id_}")
+                if workdir.exists():
+                    workdir = get_unique_workdir(workdir)
+                new_info = {
+                    "id": id_,
+                    "file_name": get_unique_name(info["file_name"], self.get_all_file_names()),
+                }
+                self._add_file(
+                    ParquetFile.extract_from_archive(
+                        archive, dir_, workdir, info=new_info, logger=logger
+                    )
+                )
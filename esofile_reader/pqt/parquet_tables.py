@@ -1,7 +1,12 @@
 import contextlib
+import json
+import os
 import shutil
+import threading
+from datetime import datetime
+from functools import partial, wraps
 from pathlib import Path
-from typing import List, Dict, Tuple, Sequence, Union, Any, Optional
+from typing import List, Dict, Tuple, Sequence, Union, Any, Optional, Set, Callable
 from uuid import uuid1
 from zipfile import ZipFile
 
@@ -10,28 +15,90 @@ import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 
+from esofile_reader.df.df_functions import cast_numeric_columns
 from esofile_reader.df.df_tables import DFTables
 from esofile_reader.df.level_names import TIMESTAMP_COLUMN, ID_LEVEL
 from esofile_reader.exceptions import CorruptedData
 from esofile_reader.id_generator import get_unique_name
+from esofile_reader.pqt.column_cache import ColumnCache
+from esofile_reader.pqt.parquet_archive import ParquetArchive, ArchiveWriter, find_archive_dirs
+from esofile_reader.pqt.storage_profile import StorageProfile, get_profile
+from esofile_reader.pqt.thread_pools import get_thread_pool
 from esofile_reader.processing.progress_logger import BaseLogger
 from esofile_reader.typehints import PathLike
 
 PARQUET_ID = "pqt_id"
 PARQUET_NAME = "pqt_name"
 
+CHUNKED_LAYOUT = "chunked"
+SINGLE_LAYOUT = "single"
+LAYOUTS = [CHUNKED_LAYOUT, SINGLE_LAYOUT]
+LAYOUT_METADATA_KEY = b"esofile_reader_layout"
+PROFILE_METADATA_KEY = b"esofile_reader_profile"
+LEVELS_METADATA_KEY = b"esofile_reader_levels"
+ID_MARKER_COLUMN = "id_marker"
+
+
+def validate_layout(layout: str) -> None:
+    """ Check if given parquet frame layout is supported. """
+    if layout not in LAYOUTS:
+        raise ValueError(
+            f"Invalid parquet frame layout '{layout}', "
+            f"layout must be one of '{', '.join(LAYOUTS)}'."
+        )
+
 
 @contextlib.contextmanager
 def parquet_frame_factory(
-    df: pd.DataFrame, name: str, pardir: PathLike = "", progress_logger: BaseLogger = None,
+    df: pd.DataFrame,
+    name: str,
+    pardir: PathLike = "",
+    progress_logger: BaseLogger = None,
+    value_dtype: Optional[Union[str, type]] = None,
+    layout: str = CHUNKED_LAYOUT,
+    profile: Union[str, StorageProfile, None] = None,
 ):
-    pqf = ParquetFrame.from_df(df, name, pardir, progress_logger)
+    pqf = ParquetFrame.from_df(
+        df,
+        name,
+        pardir,
+        progress_logger,
+        value_dtype=value_dtype,
+        layout=layout,
+        profile=profile,
+    )
     try:
         yield pqf
     finally:
         pqf.clean_up()
 
 
+def exclusive(method: Callable) -> Callable:
+    """ Run method while holding instance write lock, writers run one at a time. """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def link_or_copy(src: PathLike, dst: PathLike) -> None:
+    """ Create a hard link of given file, file is copied when linking is not possible. """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def unlink_file(path: Path) -> None:
+    """ Remove file which is about to be written, file can be hard linked to another frame. """
+    # files are never modified in place so frame copies can share them
+    with contextlib.suppress(FileNotFoundError):
+        path.unlink()
+
+
 def get_unique_workdir(workdir: Path) -> Path:
     old_name = workdir.name
     pardir = workdir.parent
@@ -40,6 +107,150 @@ def get_unique_workdir(workdir: Path) -> Path:
     return Path(pardir, new_name)
 
 
+class _ReferenceIndex:
+    """
+    Compact numpy representation of parquet frame reference table.
+
+    Parquet names are stored as codes pointing to 'pqt_names' array,
+    parquet ids are stored as plain integer array. Column keys are
+    mapped to row positions using a hash map.
+
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        pqt_names: np.ndarray,
+        pqt_ids: np.ndarray,
+        columns: pd.MultiIndex,
+        positions: Optional[Dict[Any, int]] = None,
+    ):
+        self.codes = codes
+        self.pqt_names = pqt_names
+        self.pqt_ids = pqt_ids
+        self.columns = columns
+        self._positions = positions
+        self._pqt_id_index = None
+        self._name_codes = None
+
+    @classmethod
+    def from_reference_df(cls, reference_df: pd.DataFrame) -> "_ReferenceIndex":
+        codes, uniques = pd.factorize(reference_df[PARQUET_NAME], sort=False)
+        pqt_ids = reference_df[PARQUET_ID].to_numpy(dtype=np.int64)
+        return cls(codes, np.asarray(uniques, dtype=object), pqt_ids, reference_df.index)
+
+    def __len__(self):
+        return len(self.pqt_ids)
+
+    def append(self, appended_df: pd.DataFrame, columns: pd.MultiIndex) -> "_ReferenceIndex":
+        """ Create a new index with appended reference items, this index is not modified. """
+        if self._name_codes is None:
+            self._name_codes = {name: i for i, name in enumerate(self.pqt_names)}
+        name_codes = dict(self._name_codes)
+        new_names = []
+        codes = np.empty(len(appended_df.index), dtype=self.codes.dtype)
+        for i, name in enumerate(appended_df[PARQUET_NAME]):
+            if name not in name_codes:
+                name_codes[name] = len(name_codes)
+                new_names.append(name)
+            codes[i] = name_codes[name]
+        positions = None
+        if self._positions is not None:
+            positions = dict(self._positions)
+            positions.update((k, i) for i, k in enumerate(appended_df.index, start=len(self)))
+        reference_index = _ReferenceIndex(
+            np.concatenate([self.codes, codes]),
+            np.concatenate([self.pqt_names, np.asarray(new_names, dtype=object)]),
+            np.concatenate([self.pqt_ids, appended_df[PARQUET_ID].to_numpy(dtype=np.int64)]),
+            columns,
+            positions,
+        )
+        reference_index._name_codes = name_codes
+        return reference_index
+
+    @property
+    def positions(self) -> Dict[Any, int]:
+        if self._positions is None:
+            self._positions = {k: i for i, k in enumerate(self.columns)}
+        return self._positions
+
+    @property
+    def pqt_id_index(self) -> pd.Index:
+        if self._pqt_id_index is None:
+            self._pqt_id_index = pd.Index(self.pqt_ids)
+        return self._pqt_id_index
+
+    def is_key_list(self, items: Any) -> bool:
+        """ Check if all items are complete column keys. """
+        nlevels = self.columns.nlevels
+        return isinstance(items, (list, pd.Index)) and all(
+            isinstance(item, tuple) and len(item) == nlevels for item in items
+        )
+
+    def get_positions(self, items: Any) -> Optional[np.ndarray]:
+        """ Get row positions for column keys or boolean mask, None if not supported. """
+        if isinstance(items, pd.Series):
+            items = items.to_numpy()
+        if isinstance(items, (list, np.ndarray)) and len(items) == 0:
+            return np.array([], dtype=np.int64)
+        if (
+            isinstance(items, (list, np.ndarray))
+            and len(items) == len(self)
+            and isinstance(items[0], (bool, np.bool_))
+        ):
+            return np.flatnonzero(np.asarray(items, dtype=bool))
+        if self.is_key_list(items):
+            positions = self.positions
+            missing = [item for item in items if item not in positions]
+            if missing:
+                raise KeyError(f"{missing} not in index")
+            return np.fromiter(
+                (positions[item] for item in items), dtype=np.int64, count=len(items)
+            )
+        return None
+
+    def get_pqt_ref_pairs(self, positions: np.ndarray) -> Dict[str, List[int]]:
+        """ Get a hash of parquet name: ids pairs for given positions. """
+        codes = self.codes[positions]
+        pqt_ids = self.pqt_ids[positions]
+        sorter = np.argsort(codes, kind="stable")
+        sorted_codes = codes[sorter]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+        groups = np.split(sorter, boundaries) if len(sorter) > 0 else []
+        # keep order of first appearance
+        groups.sort(key=lambda x: x[0])
+        return {self.pqt_names[codes[g[0]]]: pqt_ids[g].tolist() for g in groups}
+
+
+class _FrameSnapshot:
+    """
+    Immutable state of parquet frame.
+
+    Published snapshot is never modified, writers create a new
+    one instead so readers holding the previous snapshot can
+    finish with consistent index, references and parquets.
+
+    """
+
+    __slots__ = ("index", "reference_df", "_reference_index")
+
+    def __init__(
+        self,
+        index: pd.Index,
+        reference_df: pd.DataFrame,
+        reference_index: Optional[_ReferenceIndex] = None,
+    ):
+        self.index = index
+        self.reference_df = reference_df
+        self._reference_index = reference_index
+
+    @property
+    def reference_index(self) -> _ReferenceIndex:
+        if self._reference_index is None:
+            self._reference_index = _ReferenceIndex.from_reference_df(self.reference_df)
+        return self._reference_index
+
+
 class _ParquetIndexer:
     """
     Very simplified indexer to provide partial  compatibility
@@ -49,6 +260,9 @@ class _ParquetIndexer:
     Ids are stored as int to provide compatibility with the
     standard DfData.
 
+    Datetime row slices are pushed down to parquet reads
+    so only relevant row groups are loaded.
+
     """
 
     def __init__(self, frame: "ParquetFrame"):
@@ -57,6 +271,13 @@ class _ParquetIndexer:
     def _split_missing(self, items: Any) -> Tuple[pd.Index, pd.Index]:
         """ Identify missing index items. """
         items = [items] if isinstance(items, (tuple, str, int)) else items
+        reference_index = self.frame._reference_index
+        if reference_index.is_key_list(items) and len(items) > 0:
+            positions = reference_index.positions
+            missing = [item for item in items if item not in positions]
+            existing = [positions[item] for item in items if item in positions]
+            missing = pd.Index(missing) if missing else pd.Index([])
+            return self.frame.columns.take(existing), missing
         try:
             existing = self.frame._reference_df.loc[items, :].index
             missing = pd.Index([])
@@ -67,15 +288,20 @@ class _ParquetIndexer:
         return existing, missing
 
     def __getitem__(self, item):
-        if isinstance(item, tuple):
-            rows, col = item
-            df = self.frame._get_df(items=col)
-        else:
-            rows = item
-            df = self.frame.as_df()
-        return df.loc[rows, :]
+        rows, col = item if isinstance(item, tuple) else (item, None)
+        with self.frame._reading():
+            row_range = self.frame._get_row_range(rows)
+            if col is None:
+                df = self.frame.as_df(row_range=row_range)
+            else:
+                df = self.frame._get_df(items=col, row_range=row_range)
+        return df if row_range else df.loc[rows, :]
 
     def __setitem__(self, key, value):
+        with self.frame._write_lock:
+            self._set_item(key, value)
+
+    def _set_item(self, key, value):
         if not isinstance(value, (int, float, str, pd.Series, list, np.ndarray)):
             raise TypeError(
                 f"Invalid value type: {value.__class__.__name__}, "
@@ -96,34 +322,201 @@ class _ParquetIndexer:
 
 
 class ParquetFrame:
+    """
+    A DataFrame like class which stores data in parquet files.
+
+    Frame can be read by many threads while being modified, see
+    '_FrameSnapshot'.
+
+    Parameters
+    ----------
+    workdir : Path
+        A directory where parquets are stored.
+    layout : {'chunked', 'single'}
+        Defines how columns are distributed between parquets, chunks
+        hold at most 'MAX_N_COLUMNS' columns or 'MAX_SIZE' KB of data,
+        single layout stores all columns in one parquet.
+    archive : ParquetArchive, default None
+        An archive holding parquets which have not been extracted.
+    archive_dir : str, default ''
+        A prefix of frame parquets within the archive.
+    profile : {str, StorageProfile}, default None
+        Options used to write parquets, see 'StorageProfile'.
+    column_cache : ColumnCache, default None
+        A cache of decoded columns, columns are not cached when None.
+    deferred : bool, default False
+        Read reference parquets stored in workdir (or archive)
+        on first access.
+
+    """
+
     MAX_SIZE = 1024
     MAX_N_COLUMNS = 100
+    # applies to all data parquets unless set by profile
+    ROW_GROUP_SIZE = 1024
+    MAX_READ_WORKERS = 8
+    MAX_N_DELTAS = 50
+    DELTA_PREFIX = "delta-"
+    DATA_FILE_EXT = ".parquet"
     INDEX_PARQUET = "index.parquet"
     PQT_REF_PARQUET = "reference.parquet"
 
-    def __init__(self, workdir: Path):
+    def __init__(
+        self,
+        workdir: Path,
+        layout: str = CHUNKED_LAYOUT,
+        archive: Optional[ParquetArchive] = None,
+        archive_dir: str = "",
+        profile: Union[str, StorageProfile, None] = None,
+        column_cache: Optional[ColumnCache] = None,
+        deferred: bool = False,
+    ):
+        validate_layout(layout)
+        self._deferred = False
+        self._loading_references = False
+        self._references_lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._readers_lock = threading.Lock()
+        self._n_readers = 0
+        self._removed_parquets = set()
+        self._clean_up_pending = False
+        self._local = threading.local()
         self.workdir = workdir.absolute()
+        self.layout = layout
+        self.profile = get_profile(profile)
+        self.column_cache = column_cache
+        self.archive = archive
+        self.archive_dir = archive_dir
+        self._dirty_parquets = set()
+        self._all_dirty = False
+        self._reference_dirty = True
         self._indexer = _ParquetIndexer(self)
-        self._index = pd.Index([])
-        self._reference_df = pd.DataFrame(
-            {PARQUET_ID: pd.Series([], dtype=int), PARQUET_NAME: pd.Series([], dtype=str),}
-        )
+        if deferred:
+            self._state = None
+            self._deferred = True
+        else:
+            self._state = _FrameSnapshot(
+                pd.Index([]),
+                pd.DataFrame(
+                    {
+                        PARQUET_ID: pd.Series([], dtype=int),
+                        PARQUET_NAME: pd.Series([], dtype=str),
+                    }
+                ),
+            )
+
+    @property
+    def _snapshot(self) -> _FrameSnapshot:
+        """ Get snapshot pinned by current reader or the latest published one. """
+        snapshot = getattr(self._local, "snapshot", None)
+        if snapshot is None:
+            self.load_references()
+            snapshot = self._state
+        return snapshot
+
+    def _publish(
+        self,
+        index: pd.Index = None,
+        reference_df: pd.DataFrame = None,
+        reference_index: Optional[_ReferenceIndex] = None,
+    ) -> None:
+        """ Replace current snapshot, readers holding the previous one are not affected. """
+        state = self._state
+        if reference_df is None:
+            self._state = _FrameSnapshot(index, state.reference_df, state._reference_index)
+        else:
+            index = state.index if index is None else index
+            self._state = _FrameSnapshot(index, reference_df, reference_index)
+
+    @contextlib.contextmanager
+    def _reading(self):
+        """ Pin current snapshot, parquets it references are kept until reading ends. """
+        if getattr(self._local, "snapshot", None) is not None:
+            yield self._local.snapshot
+            return
+        self.load_references()
+        with self._readers_lock:
+            self._n_readers += 1
+            snapshot = self._state
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = None
+            with self._readers_lock:
+                self._n_readers -= 1
+                last_reader = self._n_readers == 0
+                if last_reader:
+                    removed, self._removed_parquets = self._removed_parquets, set()
+                    clean_up = self._clean_up_pending
+            if last_reader and clean_up:
+                self._clean_up()
+            elif last_reader:
+                self._delete_parquets(removed)
+
+    @property
+    def _reference_df(self) -> pd.DataFrame:
+        return self._snapshot.reference_df
+
+    @_reference_df.setter
+    def _reference_df(self, df: pd.DataFrame) -> None:
+        self.load_references()
+        self._publish(reference_df=df)
+        self._reference_dirty = True
+
+    @property
+    def _reference_index(self) -> _ReferenceIndex:
+        return self._snapshot.reference_index
+
+    @property
+    def _index(self) -> pd.Index:
+        return self._snapshot.index
+
+    @_index.setter
+    def _index(self, val: pd.Index) -> None:
+        self.load_references()
+        self._publish(index=val)
+
+    @property
+    def layout(self) -> str:
+        self.load_references()
+        return self._layout
+
+    @layout.setter
+    def layout(self, layout: str) -> None:
+        self.load_references()
+        self._layout = layout
+
+    @property
+    def profile(self) -> StorageProfile:
+        self.load_references()
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile: StorageProfile) -> None:
+        self.load_references()
+        self._profile = profile
 
     @property
     def name(self):
         return self.workdir.name
 
+    @property
+    def n_readers(self) -> int:
+        return self._n_readers
+
     @property
     def parquet_names(self) -> List[str]:
-        names = []
-        for chunk in self._reference_df[PARQUET_NAME].drop_duplicates().tolist():
-            names.append(chunk)
-        return names
+        return self._reference_index.pqt_names.tolist()
 
     @property
     def parquet_paths(self) -> List[Path]:
         return [Path(self.workdir, chunk) for chunk in self.parquet_names]
 
+    @property
+    def delta_names(self) -> List[str]:
+        return [name for name in self.parquet_names if name.startswith(self.DELTA_PREFIX)]
+
     @property
     def index(self) -> pd.Index:
         return self._index
@@ -150,9 +543,10 @@ class ParquetFrame:
 
     @property
     def parquet_count(self) -> int:
-        return len(self.parquet_paths) + len(self.reference_paths)
+        return len(self._get_stored_parquet_paths()) + len(self.reference_paths)
 
     @index.setter
+    @exclusive
     def index(self, val: pd.Index) -> None:
         if not issubclass(type(val), pd.Index):
             raise TypeError("Index must be subclass if pd.Index.")
@@ -161,10 +555,12 @@ class ParquetFrame:
                 f"Expected index length is {len(self.index)}, new index length is {len(val)}."
             )
         self._index = val
+        self._reference_dirty = True
 
     @columns.setter
+    @exclusive
     def columns(self, val: pd.MultiIndex) -> None:
-        self._reference_df.index = val
+        self._reference_df = self._reference_df.set_axis(val, axis=0)
 
     @property
     def empty(self):
@@ -181,20 +577,40 @@ class ParquetFrame:
         return self._copy(new_workdir)
 
     def _copy(self, new_workdir: Path):
-        shutil.copytree(self.workdir, new_workdir)
-        parquet_frame = ParquetFrame(new_workdir)
+        # reference parquets would be copied into new workdir
+        self.load_references()
+        shutil.copytree(self.workdir, new_workdir, copy_function=link_or_copy)
+        parquet_frame = type(self)(
+            new_workdir,
+            layout=self.layout,
+            archive=self.archive,
+            archive_dir=self.archive_dir,
+            profile=self.profile,
+            column_cache=self.column_cache,
+        )
         parquet_frame.workdir = new_workdir
         parquet_frame._reference_df = self._reference_df.copy()
         parquet_frame._index = self._index.copy()
+        parquet_frame.mark_unsaved()
         return parquet_frame
 
     def copy_to(self, new_pardir: Path):
         return self._copy(Path(new_pardir, self.name))
 
     @classmethod
-    def _get_columns_per_parquet(cls, df: pd.DataFrame) -> List[int]:
+    def _get_columns_per_parquet(
+        cls, df: pd.DataFrame, layout: str = CHUNKED_LAYOUT
+    ) -> List[int]:
         """ Calculate number of columns per parquet for given DataFrame.  """
-        sizes = df.memory_usage(index=False)
+        return cls._split_column_sizes(df.memory_usage(index=False), layout)
+
+    @classmethod
+    def _split_column_sizes(
+        cls, sizes: Sequence[int], layout: str = CHUNKED_LAYOUT
+    ) -> List[int]:
+        """ Calculate number of columns per parquet for given column sizes in bytes. """
+        if layout == SINGLE_LAYOUT:
+            return [len(sizes)] if len(sizes) > 0 else []
         max_size_in_bytes = cls.MAX_SIZE << 10
         n_columns = []
         column_counter = 0
@@ -211,21 +627,38 @@ class ParquetFrame:
         return n_columns
 
     @classmethod
-    def predict_n_parquets(cls, df: pd.DataFrame) -> int:
+    def predict_n_parquets(cls, df: pd.DataFrame, layout: str = CHUNKED_LAYOUT) -> int:
         """ Predict number of parquets required to store DataFrame. """
-        return len(cls._get_columns_per_parquet(df))
+        return len(cls._get_columns_per_parquet(df, layout))
 
-    @staticmethod
-    def _create_unique_parquet_name():
+    @classmethod
+    def _create_unique_parquet_name(cls, delta: bool = False):
         """ Create a unique filesystem name using uuid. """
-        return f"{str(uuid1())}.parquet"
+        prefix = cls.DELTA_PREFIX if delta else ""
+        return f"{prefix}{str(uuid1())}{cls.DATA_FILE_EXT}"
 
-    def _append_reference(self, pqt_ids: List[int], pqt_name: str, mi: pd.MultiIndex):
+    @staticmethod
+    def _create_reference_df(
+        pqt_ids: List[int], pqt_name: Union[str, List[str]], mi: pd.MultiIndex
+    ) -> pd.DataFrame:
+        """ Create reference items for given parquet ids. """
+        pqt_names = [pqt_name] * len(pqt_ids) if isinstance(pqt_name, str) else pqt_name
+        return pd.DataFrame({PARQUET_ID: pqt_ids, PARQUET_NAME: pqt_names}, index=mi)
+
+    def _append_reference(
+        self, pqt_ids: List[int], pqt_name: Union[str, List[str]], mi: pd.MultiIndex
+    ):
         """ Append new items into reference DataFrame. """
-        df = pd.DataFrame(
-            {PARQUET_ID: pqt_ids, PARQUET_NAME: [pqt_name] * len(pqt_ids)}, index=mi
-        )
-        self._reference_df = self._reference_df.append(df)
+        self.load_references()
+        state = self._state
+        df = self._create_reference_df(pqt_ids, pqt_name, mi)
+        reference_df = pd.concat([state.reference_df, df])
+        # avoid rebuilding lookup of the whole frame when only few columns are added
+        reference_index = state._reference_index
+        if reference_index is not None:
+            reference_index = reference_index.append(df, reference_df.index)
+        self._publish(reference_df=reference_df, reference_index=reference_index)
+        self._reference_dirty = True
 
     def _insert_reference(self, pos: int, pqt_ids: List[int], pqt_name: str, mi: pd.MultiIndex):
         """ Insert new items to reference DataFrame."""
@@ -235,9 +668,7 @@ class ParquetFrame:
         elif 0 <= pos < length:
             frames = [
                 self._reference_df.iloc[0:pos],
-                pd.DataFrame(
-                    {PARQUET_ID: pqt_ids, PARQUET_NAME: [pqt_name] * len(pqt_ids)}, index=mi
-                ),
+                self._create_reference_df(pqt_ids, pqt_name, mi),
                 self._reference_df.iloc[pos:],
             ]
             self._reference_df = pd.concat(frames)
@@ -247,60 +678,280 @@ class ParquetFrame:
             )
 
     @staticmethod
-    def _write_table(df: pd.DataFrame, path: Path, preserve_index: bool = True) -> None:
-        """ Write given parquet table into given path. """
-        with open(path, "bw") as f:
-            pq.write_table(pa.Table.from_pandas(df, preserve_index=preserve_index), f)
+    def _write_table(
+        df: pd.DataFrame,
+        path: Union[Path, pa.NativeFile],
+        preserve_index: bool = True,
+        row_group_size: Optional[int] = None,
+        metadata: Optional[Dict[bytes, bytes]] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """ Write given DataFrame into given path or arrow stream. """
+        table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+        if metadata:
+            table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+        ParquetFrame._write_arrow_table(table, path, row_group_size, options)
+
+    @staticmethod
+    def _write_arrow_table(
+        table: pa.Table,
+        path: Union[Path, pa.NativeFile],
+        row_group_size: Optional[int] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """ Write given arrow table into given path or arrow stream. """
+        options = options if options else {}
+        if isinstance(path, pa.NativeFile):
+            pq.write_table(table, path, row_group_size=row_group_size, **options)
+        else:
+            unlink_file(path)
+            with open(path, "bw") as f:
+                pq.write_table(table, f, row_group_size=row_group_size, **options)
+
+    def _write_data_file(self, df: pd.DataFrame, path: Path) -> None:
+        """ Write DataFrame with parquet id columns into given path. """
+        self._write_table(
+            df,
+            path,
+            preserve_index=False,
+            row_group_size=self.profile.row_group_size or self.ROW_GROUP_SIZE,
+            options=self.profile.get_write_options(),
+        )
 
     def _save_df_to_parquet(self, name: str, df: pd.DataFrame) -> None:
         """ Replace previously stored parquet. """
         path = Path(self.workdir, name)
-        with contextlib.suppress(FileNotFoundError):
-            path.unlink()
+        self._invalidate_cached_columns([name])
         df.reset_index(drop=True, inplace=True)
-        self._write_table(df, path, preserve_index=False)
-
-    def _store_df(self, df: pd.DataFrame, logger: BaseLogger = None) -> None:
+        self._write_data_file(df, path)
+        self._dirty_parquets.add(name)
+
+    def _store_df(
+        self,
+        df: pd.DataFrame,
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+    ) -> None:
         """ Save DataFrame into multiple parquet files. """
         df = df.copy()  # avoid potential frame mutation
-        self._index = df.index.copy()
-        self._reference_df.index = pd.MultiIndex.from_tuples([], names=df.columns.names)
-        n_columns = self._get_columns_per_parquet(df)
+        if value_dtype:
+            df = cast_numeric_columns(df, value_dtype)
+        self._publish(
+            index=df.index.copy(),
+            reference_df=self._reference_df.set_axis(
+                pd.MultiIndex.from_tuples([], names=df.columns.names), axis=0
+            ),
+        )
+        self._store_chunks(df, logger=logger)
+
+    def _write_chunks(self, df: pd.DataFrame, logger: BaseLogger = None) -> List[str]:
+        """ Write DataFrame using parquet ids as columns, return parquet name per column. """
+        pqt_names = []
         start = 0
-        for n in n_columns:
+        for n in self._get_columns_per_parquet(df, self.layout):
             end = start + n
-            dfi = df.iloc[:, start:end]
-
-            # use parquet id as the only identifier
-            pqt_columns = pd.RangeIndex(start=start, stop=start + len(dfi.columns))
             pqt_name = self._create_unique_parquet_name()
-            self._append_reference(pqt_columns.tolist(), pqt_name, dfi.columns)
-
-            # index and columns data are stored separately
-            # index is not saved in parquet files
-            dfi.columns = pqt_columns
-
-            self._save_df_to_parquet(pqt_name, dfi)
+            self._save_df_to_parquet(pqt_name, df.iloc[:, start:end].copy())
+            pqt_names.extend([pqt_name] * n)
             start = end
 
             if logger:
                 logger.increment_progress()
                 logger.log_section(f"writing parquet {logger.progress}/{logger.max_progress}")
+        return pqt_names
+
+    def _read_pqt_id_df(self, positions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """ Read stored columns, parquet ids are used as columns. """
+        positions = self._get_all_positions() if positions is None else positions
+        tables = self._read_tables(self._reference_index.get_pqt_ref_pairs(positions))
+        df = self._select_columns(self._stitch_tables(tables), positions).to_pandas()
+        df.columns = pd.Index(self._reference_index.pqt_ids[positions], dtype=np.int32)
+        return df
+
+    def _delete_parquets(self, pqt_names: Set[str]) -> None:
+        """ Delete given parquets and their cached columns. """
+        self._invalidate_cached_columns(pqt_names)
+        for pqt_name in pqt_names:
+            with contextlib.suppress(FileNotFoundError):
+                Path(self.workdir, pqt_name).unlink()
+
+    def _remove_unreferenced_parquets(self, pqt_names: Sequence[str]) -> None:
+        """ Delete given parquets if these are not referenced anymore. """
+        referenced = set(self.parquet_names)
+        unreferenced = set(pqt_names).difference(referenced)
+        with self._readers_lock:
+            # parquets can be still needed by snapshots pinned by readers
+            if self._n_readers:
+                self._removed_parquets.update(unreferenced)
+                return
+        self._delete_parquets(unreferenced)
+
+    def _store_chunks(self, df: pd.DataFrame, logger: BaseLogger = None) -> None:
+        """ Split DataFrame columns into new parquets and append references. """
+        first_pqt_id = int(self._get_unique_pqt_id())
+        mi = df.columns
+
+        # use parquet id as the only identifier, index and
+        # columns data are stored separately
+        pqt_ids = pd.RangeIndex(start=first_pqt_id, stop=first_pqt_id + len(mi))
+        df.columns = pqt_ids
+
+        if self.layout == SINGLE_LAYOUT and not self._reference_df.empty:
+            # all the columns need to be rewritten into a new single parquet
+            old_names = self.parquet_names
+            df = pd.concat(
+                [self._read_pqt_id_df(), df.reset_index(drop=True)], axis=1, sort=False
+            )
+            pqt_names = self._write_chunks(df, logger=logger)
+            reference_df = pd.concat(
+                [self._reference_df, self._create_reference_df(pqt_ids.tolist(), "", mi)]
+            )
+            self._reference_df = reference_df.assign(**{PARQUET_NAME: pqt_names})
+            self._remove_unreferenced_parquets(old_names)
+        else:
+            pqt_names = self._write_chunks(df, logger=logger)
+            self._append_reference(pqt_ids.tolist(), pqt_names, mi)
+
+    @exclusive
+    def migrate_layout(self, layout: str) -> None:
+        """ Rewrite all stored columns using given layout. """
+        validate_layout(layout)
+        self.layout = layout
+        self._reference_dirty = True
+        if self._reference_df.empty:
+            return
+        self._rewrite_chunks()
+
+    def _rewrite_chunks(self) -> None:
+        """ Write all referenced columns into new chunks using current layout. """
+        old_names = self.parquet_names
+        pqt_names = self._write_chunks(self._read_pqt_id_df())
+        self._reference_df = self._reference_df.assign(**{PARQUET_NAME: pqt_names})
+        self._remove_unreferenced_parquets(old_names)
+
+    def _get_parquet_size(self, pqt_name: str) -> int:
+        """ Get size of parquet stored locally or in archive. """
+        path = Path(self.workdir, pqt_name)
+        if path.exists():
+            return path.stat().st_size
+        member = self._get_archive_member(pqt_name)
+        return self.archive.get_info(member).file_size if member else 0
+
+    def _read_n_columns(self, pqt_name: str) -> int:
+        """ Read number of columns stored in given parquet. """
+        return pq.ParquetFile(self._get_source(pqt_name)).metadata.num_columns
+
+    def is_fragmented(self) -> bool:
+        """
+        Check if columns are not distributed optimally.
+
+        Frame is fragmented when it contains delta parquets, when
+        stored parquets hold dropped columns or when there's more
+        parquets than required for the current layout. Columns are
+        assumed to be 64 bit so smaller dtypes are never reported.
+
+        """
+        if self._reference_df.empty:
+            return False
+        if self.delta_names:
+            return True
+        pairs = self._reference_index.get_pqt_ref_pairs(self._get_all_positions())
+        if any(self._read_n_columns(name) > len(ids) for name, ids in pairs.items()):
+            return True
+        sizes = [len(self._index) * np.dtype(np.float64).itemsize] * len(self._reference_index)
+        return len(pairs) > len(self._split_column_sizes(sizes, self.layout))
+
+    @exclusive
+    def vacuum(self, force: bool = False) -> int:
+        """
+        Repack columns into optimal chunks and remove dropped columns.
+
+        Frame is only rewritten when fragmented unless 'force' is True,
+        reference parquets are rewritten on next save. Returns number
+        of bytes reclaimed (this can be negative when forced).
+
+        """
+        if self._reference_df.empty or not (force or self.is_fragmented()):
+            return 0
+        size = sum(map(self._get_parquet_size, set(self.parquet_names)))
+        self._rewrite_chunks()
+        return size - sum(map(self._get_parquet_size, set(self.parquet_names)))
+
+    @exclusive
+    def compact(self) -> None:
+        """ Merge delta parquets into regular chunks. """
+        delta_names = self.delta_names
+        if not delta_names:
+            return
+        if self.layout == SINGLE_LAYOUT:
+            self.migrate_layout(SINGLE_LAYOUT)
+        else:
+            reference_df = self._reference_df.copy()
+            cond = reference_df[PARQUET_NAME].isin(delta_names).to_numpy()
+            df = self._read_pqt_id_df(np.flatnonzero(cond))
+            reference_df.loc[cond, PARQUET_NAME] = self._write_chunks(df)
+            self._reference_df = reference_df
+            self._remove_unreferenced_parquets(delta_names)
+
+    def _write_delta(self, df: pd.DataFrame) -> str:
+        """ Write DataFrame with parquet id columns into a new delta, chunks are kept. """
+        pqt_name = self._create_unique_parquet_name(delta=True)
+        self._save_df_to_parquet(pqt_name, df)
+        return pqt_name
+
+    def _compact_if_required(self) -> None:
+        """ Merge delta parquets when there's too many of them. """
+        if len(self.delta_names) > self.MAX_N_DELTAS:
+            self.compact()
 
     @classmethod
     def from_df(
-        cls, df: pd.DataFrame, name: str, pardir: PathLike = "", logger: BaseLogger = None,
+        cls,
+        df: pd.DataFrame,
+        name: str,
+        pardir: PathLike = "",
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
     ) -> "ParquetFrame":
         """ Store pandas.DataFrame as a parquet frame. """
+        validate_layout(layout)
+        profile = get_profile(profile)
         workdir = Path(pardir, f"table-{name}").absolute()
         workdir.mkdir()
-        pqf = ParquetFrame(workdir)
-        pqf._store_df(df, logger=logger)
+        pqf = cls(workdir, layout=layout, profile=profile)
+        pqf._store_df(df, logger=logger, value_dtype=value_dtype)
         return pqf
 
+    def _get_archive_member(self, name: str) -> Optional[str]:
+        """ Get name of archive member for given parquet, None when not archived. """
+        if self.archive is None:
+            return None
+        member = f"{self.archive_dir}{name}"
+        return member if self.archive.contains(member) else None
+
+    def _get_source(self, name: str) -> Union[Path, pa.BufferReader]:
+        """ Get local parquet path, parquets not extracted are read from archive. """
+        path = Path(self.workdir, name)
+        if self.archive is not None and not path.exists():
+            member = self._get_archive_member(name)
+            if member:
+                return self.archive.open(member)
+        return path
+
+    def _parquet_exists(self, name: str) -> bool:
+        """ Check if parquet is stored locally or in archive. """
+        return Path(self.workdir, name).exists() or self._get_archive_member(name) is not None
+
+    def set_archive(self, archive: Optional[ParquetArchive], archive_dir: str = "") -> None:
+        """ Serve parquets missing in workdir from given archive. """
+        self.archive = archive
+        self.archive_dir = archive_dir
+
     def find_missing_ref_parquets(self) -> List[Path]:
         """ Check if parquets referenced in chunks table exist. """
-        return [p for p in self.parquet_paths if not p.exists()]
+        return [p for p in self.parquet_paths if not self._parquet_exists(p.name)]
 
     def clear_reference_parquets(self):
         """ Delete previously stored reference parquets."""
@@ -310,18 +961,52 @@ class ParquetFrame:
 
     def find_missing_reference_parquets(self):
         """ Check if there are all requited index parquets. """
-        return [p for p in self.reference_paths if not p.exists()]
+        return [p for p in self.reference_paths if not self._parquet_exists(p.name)]
 
     def read_reference_parquets(self):
         """ Load reference parquets from filesystem. """
-        index = pq.read_pandas(self.index_parquet_path).to_pandas().iloc[:, 0]
+        index_table = pq.read_pandas(self._get_source(self.INDEX_PARQUET))
+        metadata = index_table.schema.metadata or {}
+        self.layout = metadata.get(LAYOUT_METADATA_KEY, CHUNKED_LAYOUT.encode()).decode()
+        if PROFILE_METADATA_KEY in metadata:
+            self.profile = StorageProfile.from_json(metadata[PROFILE_METADATA_KEY])
+        index = index_table.to_pandas().iloc[:, 0]
         if index.name == TIMESTAMP_COLUMN:
-            self._index = pd.DatetimeIndex(index, name=TIMESTAMP_COLUMN)
+            index = pd.DatetimeIndex(index, name=TIMESTAMP_COLUMN)
         else:
-            self._index = pd.Index(index, name=index.name)
-        ref_df = pq.read_pandas(self.reference_parquet_path).to_pandas()
-        ref_df.index = self.cast_mi_level_items_to_int(ref_df.index, ID_LEVEL)
-        self._reference_df = ref_df
+            index = pd.Index(index, name=index.name)
+        ref_table = pq.read_table(self._get_source(self.PQT_REF_PARQUET))
+        if LEVELS_METADATA_KEY in (ref_table.schema.metadata or {}):
+            ref_df = self._reference_df_from_arrow(ref_table)
+        else:
+            # reference parquets written by previous versions store ids as str
+            ref_df = ref_table.to_pandas()
+            ref_df.index = self.cast_mi_level_items_to_int(ref_df.index, ID_LEVEL)
+        self._state = _FrameSnapshot(index, ref_df)
+        self._reference_dirty = True
+
+    @property
+    def deferred(self) -> bool:
+        """ Check if reference parquets have not been read yet. """
+        return self._deferred
+
+    def load_references(self) -> None:
+        """ Read reference parquets of a frame created with deferred references. """
+        if not self._deferred:
+            return
+        # frame can be accessed concurrently by multiple readers
+        with self._references_lock:
+            if not self._deferred or self._loading_references:
+                return
+            self._loading_references = True
+            # loaded references match the stored ones
+            reference_dirty = self._reference_dirty
+            try:
+                self._read_from_fs(self)
+                self._deferred = False
+            finally:
+                self._loading_references = False
+            self._reference_dirty = reference_dirty
 
     @classmethod
     def _read_from_fs(cls, pqf: "ParquetFrame") -> "ParquetFrame":
@@ -340,9 +1025,33 @@ class ParquetFrame:
         return pqf
 
     @classmethod
-    def from_fs(cls, workdir: Path) -> "ParquetFrame":
-        """ Read already existing parquet frame from filesystem. """
-        pqf = ParquetFrame(workdir)
+    def from_fs(cls, workdir: Path, deferred: bool = False) -> "ParquetFrame":
+        """
+        Read already existing parquet frame from filesystem.
+
+        When 'deferred' is True, reference parquets are read
+        on first access (and missing parquets are reported then).
+
+        """
+        pqf = cls(workdir, deferred=deferred)
+        if deferred:
+            return pqf
+        try:
+            cls._read_from_fs(pqf)
+        except Exception as e:
+            pqf.clean_up()
+            raise e
+        return pqf
+
+    @classmethod
+    def from_archive(
+        cls, workdir: Path, archive: ParquetArchive, archive_dir: str, deferred: bool = False
+    ) -> "ParquetFrame":
+        """ Read parquet frame from archive, parquets are not extracted. """
+        workdir.mkdir()
+        pqf = cls(workdir, archive=archive, archive_dir=archive_dir, deferred=deferred)
+        if deferred:
+            return pqf
         try:
             cls._read_from_fs(pqf)
         except Exception as e:
@@ -359,101 +1068,315 @@ class ParquetFrame:
 
     @staticmethod
     def cast_mi_level_items_to_int(mi: pd.MultiIndex, level: str) -> pd.MultiIndex:
-        """ Convert MultiIndex level to int type. """
+        """ Convert MultiIndex level items to int type, non numeric items are kept. """
+        values = pd.Series(mi.get_level_values(level))
+        numeric = pd.to_numeric(values, errors="coerce")
+        is_int = numeric.notna().to_numpy()
+        if is_int.all():
+            items = numeric.to_numpy(dtype=np.int64)
+        else:
+            items = values.to_numpy(dtype=object)
+            items[is_int] = numeric[is_int].to_numpy(dtype=np.int64).astype(object)
+        arrays = [items if name == level else mi.get_level_values(name) for name in mi.names]
+        return pd.MultiIndex.from_arrays(arrays, names=mi.names)
 
-        def to_int(val):
-            try:
-                return int(val)
-            except ValueError:
-                return val
+    @staticmethod
+    def _reference_df_to_arrow(reference_df: pd.DataFrame) -> pa.Table:
+        """ Convert reference table, ids are stored as int and special markers as str. """
+        mi = reference_df.index
+        ids = pd.Series(mi.get_level_values(ID_LEVEL))
+        numeric_ids = pd.to_numeric(ids, errors="coerce")
+        is_marker = numeric_ids.isna().to_numpy()
+        arrays = {
+            ID_LEVEL: pa.array(numeric_ids.fillna(0).to_numpy(dtype=np.int64), mask=is_marker),
+            ID_MARKER_COLUMN: pa.array(
+                ids.astype(str).where(is_marker), type=pa.string(), from_pandas=True
+            ),
+        }
+        for name in mi.names:
+            if name != ID_LEVEL:
+                # level types are inferred (as with 'from_pandas') to keep int and null items
+                arrays[name] = pa.array(mi.get_level_values(name), from_pandas=True)
+        arrays[PARQUET_ID] = pa.array(reference_df[PARQUET_ID].to_numpy())
+        arrays[PARQUET_NAME] = pa.array(reference_df[PARQUET_NAME], type=pa.string())
+        metadata = {LEVELS_METADATA_KEY: json.dumps(list(mi.names)).encode()}
+        return pa.table(arrays).replace_schema_metadata(metadata)
 
-        mi_df = mi.to_frame(index=False)
-        mi_df[level] = mi_df[level].apply(to_int)
-        return pd.MultiIndex.from_frame(mi_df, names=mi.names)
+    @staticmethod
+    def _reference_df_from_arrow(table: pa.Table) -> pd.DataFrame:
+        """ Create reference table from arrow, header levels are built from dictionaries. """
+        names = json.loads(table.schema.metadata[LEVELS_METADATA_KEY])
+        ids = table.column(ID_LEVEL)
+        if ids.null_count == 0:
+            id_level = ids.to_numpy()
+        else:
+            is_marker = ids.is_null()
+            id_level = ids.fill_null(0).to_numpy().astype(object)
+            markers = table.column(ID_MARKER_COLUMN).filter(is_marker)
+            id_level[is_marker.to_numpy()] = markers.to_numpy()
+        levels = []
+        codes = []
+        for name in names:
+            if name == ID_LEVEL:
+                level_codes, level = pd.factorize(id_level)
+            else:
+                array = table.column(name).dictionary_encode().combine_chunks()
+                # missing items are stored as null indices, these map to -1 code
+                level_codes = array.indices.fill_null(-1).to_numpy()
+                if array.type.value_type == pa.null():
+                    level = np.array([], dtype=object)
+                else:
+                    level = array.dictionary.to_numpy(zero_copy_only=False)
+            levels.append(level)
+            codes.append(level_codes)
+        mi = pd.MultiIndex(levels=levels, codes=codes, names=names)
+        return pd.DataFrame(
+            {
+                PARQUET_ID: table.column(PARQUET_ID).to_numpy(),
+                PARQUET_NAME: table.column(PARQUET_NAME).to_numpy(),
+            },
+            index=mi,
+        )
 
-    def clean_up(self):
+    def _clean_up(self) -> None:
+        self._invalidate_cached_columns()
         shutil.rmtree(self.workdir, ignore_errors=True)
 
+    def clean_up(self):
+        with self._readers_lock:
+            # workdir is removed by the last reader
+            if self._n_readers:
+                self._clean_up_pending = True
+                return
+        self._clean_up()
+
+    def set_column_cache(self, column_cache: Optional[ColumnCache]) -> None:
+        """ Use given cache to store decoded columns, None disables caching. """
+        self._invalidate_cached_columns()
+        self.column_cache = column_cache
+
+    def _invalidate_cached_columns(self, pqt_names: Optional[Sequence[str]] = None) -> None:
+        """ Remove columns of given parquets from cache, all columns if not specified. """
+        if self.column_cache is not None:
+            self.column_cache.invalidate(str(self.workdir), pqt_names)
+
+    def _get_row_range(self, rows: Any) -> Optional[Tuple[int, int]]:
+        """ Convert datetime slice into row positions, return None if not possible. """
+        if not isinstance(rows, slice) or rows.step is not None:
+            return None
+        if rows.start is None and rows.stop is None:
+            return None
+        if not all(isinstance(r, (datetime, type(None))) for r in (rows.start, rows.stop)):
+            return None
+        index = self._index
+        if not (isinstance(index, pd.DatetimeIndex) and index.is_monotonic_increasing):
+            return None
+        start = 0 if rows.start is None else index.searchsorted(rows.start, side="left")
+        stop = len(index) if rows.stop is None else index.searchsorted(rows.stop, side="right")
+        return int(start), int(max(start, stop))
+
+    def _read_table_from_parquet(
+        self,
+        pqt_name: str,
+        columns: List[int] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> pa.Table:
+        """ Read arrow table from given parquet, only row groups in range are read. """
+        columns = list(map(str, columns)) if columns else None
+        path = self._get_source(pqt_name)
+        if row_range is None:
+            return pq.read_table(path, columns=columns, memory_map=True)
+        start, stop = row_range
+        # ParquetFile is not a context manager on older pyarrow, close the source instead
+        source = pa.memory_map(str(path), "r") if isinstance(path, Path) else path
+        with source:
+            pqt_file = pq.ParquetFile(source)
+            row_groups = []
+            first_row = None
+            offset = 0
+            for i in range(pqt_file.num_row_groups):
+                n_rows = pqt_file.metadata.row_group(i).num_rows
+                if offset < stop and offset + n_rows > start:
+                    first_row = offset if first_row is None else first_row
+                    row_groups.append(i)
+                offset += n_rows
+            if not row_groups:
+                schema = pqt_file.schema_arrow
+                if columns:
+                    schema = pa.schema([schema[schema.get_field_index(c)] for c in columns])
+                return schema.empty_table()
+            table = pqt_file.read_row_groups(row_groups, columns=columns)
+        return table.slice(start - first_row, stop - start)
+
     def _read_df_from_parquet(self, pqt_name: str, columns: List[int] = None) -> pd.DataFrame:
         """ Read DataFrame from given parquet. """
-        columns = list(map(str, columns)) if columns else None
-        table = pq.read_pandas(Path(self.workdir, pqt_name), columns=columns, memory_map=True)
-        df = table.to_pandas()
+        df = self._read_table_from_parquet(pqt_name, columns=columns).to_pandas()
         df.columns = df.columns.astype(np.int32)
         return df
 
-    def _get_columns(self, pqt_ids: List[int]) -> pd.MultiIndex:
-        """ Reconstruct columns multiindex. """
+    def _read_cached_table(
+        self,
+        pqt_name: str,
+        columns: List[int],
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> pa.Table:
+        """ Read arrow table using cached columns, only complete columns are cached. """
+        names = list(map(str, columns))
+        keys = [(str(self.workdir), pqt_name, name) for name in names]
+        arrays = [self.column_cache.get(key) for key in keys]
+        missing = [i for i, array in enumerate(arrays) if array is None]
+        if missing and row_range is not None:
+            return self._read_table_from_parquet(pqt_name, columns, row_range)
+        if missing:
+            table = self._read_table_from_parquet(pqt_name, [names[i] for i in missing])
+            for i, array in zip(missing, table.columns):
+                self.column_cache.put(keys[i], array)
+                arrays[i] = array
+        if row_range is not None:
+            start, stop = row_range
+            arrays = [array.slice(start, stop - start) for array in arrays]
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def _read_tables(
+        self, pairs: Dict[str, List[int]], row_range: Optional[Tuple[int, int]] = None
+    ) -> List[pa.Table]:
+        """ Read arrow tables for given parquet name: ids pairs. """
+        if self.column_cache is not None:
+            read = partial(self._read_cached_table, row_range=row_range)
+        else:
+            read = partial(self._read_table_from_parquet, row_range=row_range)
+        if len(pairs) > 1 and self.MAX_READ_WORKERS > 1:
+            # pyarrow releases GIL when decoding so parquets can be read concurrently
+            executor = get_thread_pool(self.MAX_READ_WORKERS)
+            return list(executor.map(read, *zip(*pairs.items())))
+        return [read(name, ids) for name, ids in pairs.items()]
 
-        def sorter(sr: pd.Series) -> pd.Series:
-            return sr.apply(lambda x: pqt_ids.index(x))
+    @staticmethod
+    def _stitch_tables(tables: List[pa.Table]) -> pa.Table:
+        """ Join columns of given tables into a single arrow table. """
+        arrays = []
+        names = []
+        for table in tables:
+            arrays.extend(table.columns)
+            names.extend(table.column_names)
+        return pa.Table.from_arrays(arrays, names=names)
 
-        df = self._reference_df.loc[self._reference_df[PARQUET_ID].isin(pqt_ids), :]
-        df = df.sort_values(by=PARQUET_ID, key=sorter)
-        return df.index
+    def _get_index(self, row_range: Optional[Tuple[int, int]] = None) -> pd.Index:
+        """ Get a copy of index, optionally sliced by row positions. """
+        return self.index.copy() if row_range is None else self.index[slice(*row_range)]
 
-    def _assign_indexes(self, df: pd.DataFrame) -> pd.DataFrame:
-        """ Assign original index and columns indexes. """
-        df.index = self.index.copy()
-        df.columns = self._get_columns(df.columns.tolist())
-        return df
+    def _get_all_positions(self) -> np.ndarray:
+        """ Get positions of all columns. """
+        return np.arange(len(self._reference_index), dtype=np.int64)
 
-    def _get_pqt_ref_pairs(self, items: pd.Index) -> Dict[str, List[int]]:
-        """ Get a hash of parquet name: ids pairs for given items. """
-        pairs = {}
-        df = self._reference_df.loc[items, :]
-        groups = df.groupby([PARQUET_NAME], sort=False)
-        for chunk_name, chunk_df in groups:
-            pairs[chunk_name] = chunk_df[PARQUET_ID].tolist()
-        return pairs
-
-    def _build_df(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
-        """ Join frames extracted from parquets and assign indexes.. """
-        try:
-            df = pd.concat(frames, axis=1, sort=False)
-        except ValueError:
-            df = pd.DataFrame([], index=self.index)
-        df = self._assign_indexes(df)
+    def _get_positions(self, items: Any) -> np.ndarray:
+        """ Get reference positions for given column items. """
+        items = [items] if isinstance(items, (tuple, str, int)) else items
+        positions = self._reference_index.get_positions(items)
+        if positions is None:
+            # use pandas indexing for partial keys, slices...
+            index = self._reference_df.loc[items, :].index
+            positions = self._reference_index.get_positions(list(index))
+        return positions
+
+    def _select_columns(self, table: pa.Table, positions: np.ndarray) -> pa.Table:
+        """ Order stitched table columns by given reference positions. """
+        lookup = {name: i for i, name in enumerate(table.column_names)}
+        pqt_ids = self._reference_index.pqt_ids[positions]
+        return table.select([lookup[str(pqt_id)] for pqt_id in pqt_ids])
+
+    def _build_df(
+        self,
+        tables: List[pa.Table],
+        positions: np.ndarray,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> pd.DataFrame:
+        """ Join tables extracted from parquets and assign indexes. """
+        index = self._get_index(row_range)
+        if tables:
+            df = self._select_columns(self._stitch_tables(tables), positions).to_pandas()
+            df.index = index
+        else:
+            df = pd.DataFrame([], index=index)
+        df.columns = self.columns.take(positions)
         return df
 
-    def _get_df(self, items: Any) -> pd.DataFrame:
+    def _get_df(self, items: Any, row_range: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
         """ Get a single DataFrame from multiple parquets. """
-        items = [items] if isinstance(items, (tuple, str, int)) else items
-        items = self._reference_df.loc[items, :].index
-        pairs = self._get_pqt_ref_pairs(items)
-        frames = []
-        for pqt_name, pqt_ids in pairs.items():
-            frames.append(self._read_df_from_parquet(pqt_name, columns=pqt_ids))
-        df = self._build_df(frames)
-        return df.loc[:, items]
-
-    def as_df(self) -> pd.DataFrame:
+        positions = self._get_positions(items)
+        pairs = self._reference_index.get_pqt_ref_pairs(positions)
+        return self._build_df(self._read_tables(pairs, row_range), positions, row_range)
+
+    def as_df(self, row_range: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
         """ Return parquet frame as a single DataFrame. """
-        frames = []
-        for pqt_name in self.parquet_names:
-            frames.append(self._read_df_from_parquet(pqt_name))
-        df = self._build_df(frames)
-        return df.loc[:, self.columns]
+        with self._reading():
+            positions = self._get_all_positions()
+            pairs = self._reference_index.get_pqt_ref_pairs(positions)
+            return self._build_df(self._read_tables(pairs, row_range), positions, row_range)
+
+    def _get_id_positions(self, ids: Union[int, Sequence[int]]) -> np.ndarray:
+        """ Get reference positions of given variable ids, ids order is kept. """
+        ids = list(ids) if isinstance(ids, (list, tuple, np.ndarray, pd.Index)) else [ids]
+        all_ids = pd.Index(self.columns.get_level_values(ID_LEVEL))
+        positions = all_ids.get_indexer(ids)
+        if (positions == -1).any():
+            missing = [str(id_) for id_, pos in zip(ids, positions) if pos == -1]
+            raise KeyError(f"Cannot find ids: '{', '.join(missing)}'.")
+        return positions
+
+    def _create_arrow_fields(
+        self, positions: np.ndarray, types: List[pa.DataType]
+    ) -> List[pa.Field]:
+        """ Create arrow fields named by id with remaining header levels as metadata. """
+        names = self.columns.names
+        id_position = names.index(ID_LEVEL)
+        fields = []
+        for values, type_ in zip(self.columns.take(positions), types):
+            metadata = {
+                str(name).encode(): str(value).encode()
+                for i, (name, value) in enumerate(zip(names, values))
+                if i != id_position
+            }
+            fields.append(pa.field(str(values[id_position]), type_, metadata=metadata))
+        return fields
+
+    def as_arrow(
+        self,
+        ids: Union[int, Sequence[int], None] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> pa.Table:
+        """
+        Return parquet frame as arrow table without converting into pandas.
+
+        Index is stored as the first column, other columns are named
+        by variable ids and remaining header levels are stored in
+        column field metadata. Column arrays read from parquets are
+        not copied. Date range is only applied on datetime index.
+
+        """
+        with self._reading():
+            positions = (
+                self._get_all_positions() if ids is None else self._get_id_positions(ids)
+            )
+            row_range = self._get_row_range(slice(start_date, end_date))
+            pairs = self._reference_index.get_pqt_ref_pairs(positions)
+            tables = self._read_tables(pairs, row_range)
+            columns = self._select_columns(self._stitch_tables(tables), positions).columns
+            index = self._get_index(row_range)
+            fields = self._create_arrow_fields(positions, [c.type for c in columns])
+            level_names = list(map(str, self.columns.names))
+        index_array = pa.array(index)
+        index_name = index.name if index.name else "index"
+        fields.insert(0, pa.field(str(index_name), index_array.type))
+        metadata = {LEVELS_METADATA_KEY: json.dumps(level_names).encode()}
+        schema = pa.schema(fields, metadata=metadata)
+        return pa.Table.from_arrays([index_array, *columns], schema=schema)
 
     def _get_unique_pqt_id(self):
         """ Create unique parquet id. """
-        pqt_ids = self._reference_df.loc[:, PARQUET_ID]
-        max_ = pqt_ids.max()
-        return 0 if np.isnan(max_) else max_ + 1
-
-    def _find_smallest_parquet(self) -> str:
-        """ Find parquet with smallest size. """
-        sizes = pd.Series({p.name: p.stat().st_size for p in self.parquet_paths})
-        return sizes.idxmin()
-
-    def _is_new_parquet_required(self):
-        """ Check if all parquets are filled to max size. """
-        if self._reference_df.empty:
-            required = True
-        else:
-            sizes = [p.stat().st_size for p in self.parquet_paths]
-            required = all(map(lambda x: x > self.MAX_SIZE << 10, sizes))
-        return required
+        pqt_ids = self._reference_index.pqt_ids
+        return 0 if len(pqt_ids) == 0 else int(pqt_ids.max()) + 1
 
     def _insert_column(
         self, item: Union[Tuple[Any, ...], str, int], array: Sequence, pos: Optional[int] = None
@@ -463,31 +1386,43 @@ class ParquetFrame:
             item = (item, *[""] * (len(self.columns.names) - 1))
         mi = pd.MultiIndex.from_tuples([item], names=self.columns.names)
         pqt_id = self._get_unique_pqt_id()
-        if self._is_new_parquet_required():
-            pqt_name = self._create_unique_parquet_name()
-            df = pd.DataFrame({pqt_id: array})
-        else:
-            pqt_name = self._find_smallest_parquet()
-            df = self._read_df_from_parquet(pqt_name)
-            df.index = self._index
-            df[pqt_id] = array
-        self._insert_reference(pos, [pqt_id], pqt_name, mi)
-        self._save_df_to_parquet(pqt_name, df)
+        df = pd.DataFrame({pqt_id: array})
+        self._insert_reference(pos, [pqt_id], self._write_delta(df), mi)
+        self._compact_if_required()
 
     def _update_columns(self, existing: pd.Index, array: Sequence, rows):
-        """ Overwrite given columns with new values. """
-        pairs = self._get_pqt_ref_pairs(existing)
-        for pqt_name, pqt_ids in pairs.items():
-            df = self._read_df_from_parquet(pqt_name)
-            df.index = self._index
-            for pqt_id in pqt_ids:
-                df.loc[rows, pqt_id] = array
-            self._save_df_to_parquet(pqt_name, df)
+        """ Write updated columns into a delta parquet, original parquets are kept. """
+        reference_df = self._reference_df.copy()
+        old_names = reference_df.loc[existing, PARQUET_NAME].tolist()
+        df = self._read_pqt_id_df(self._get_positions(existing))
+        df.index = self._index
+        for pqt_id in df.columns:
+            df.loc[rows, pqt_id] = array
+        reference_df.loc[existing, PARQUET_NAME] = self._write_delta(df)
+        self._reference_df = reference_df
+        self._remove_unreferenced_parquets(old_names)
+        self._compact_if_required()
+
+    @exclusive
+    def append_columns(self, df: pd.DataFrame) -> None:
+        """ Append multiple columns at once, columns are stored in new parquets. """
+        if len(df.index) != len(self._index):
+            raise ValueError(
+                f"Expected index length is {len(self._index)}, "
+                f"appended frame index length is {len(df.index)}."
+            )
+        if self._reference_df.empty:
+            self._reference_df = self._reference_df.set_axis(
+                pd.MultiIndex.from_tuples([], names=df.columns.names), axis=0
+            )
+        self._store_chunks(df.copy())
 
+    @exclusive
     def insert(self, pos: int, item: Tuple[Any, ...], array: Sequence):
         """ Insert column at given position. """
         self._insert_column(item, array, pos=pos)
 
+    @exclusive
     def drop(self, columns: Any, level: str = None, **kwargs) -> None:
         """ Drop given columns from frame. """
         columns = columns if isinstance(columns, list) else [columns]
@@ -496,24 +1431,42 @@ class ParquetFrame:
             drop_index = self._reference_df.loc[arr, PARQUET_ID].index
         else:
             drop_index = self._reference_df.loc[columns, PARQUET_ID].index
-        # update parquet files
-        for pqt_name, ids in self._get_pqt_ref_pairs(items=drop_index).items():
-            df = self._read_df_from_parquet(pqt_name)
-            df.drop(columns=ids, inplace=True, axis=1)
-            if df.empty:
-                Path(self.workdir, pqt_name).unlink()
-            else:
-                self._save_df_to_parquet(pqt_name, df)
-        # update reference
-        self._reference_df.drop(drop_index, axis=0, inplace=True)
+        # parquets are only deleted when all the columns are dropped
+        old_names = self._reference_df.loc[drop_index, PARQUET_NAME].tolist()
+        self._reference_df = self._reference_df.drop(drop_index, axis=0)
+        self._remove_unreferenced_parquets(old_names)
+
+    def _write_index_parquet(self, path: Union[Path, pa.NativeFile]) -> None:
+        index_df = self._index.to_frame(index=False)
+        self._write_table(
+            index_df,
+            path,
+            preserve_index=True,
+            metadata={
+                LAYOUT_METADATA_KEY: self.layout.encode(),
+                PROFILE_METADATA_KEY: self.profile.to_json(),
+            },
+            options=self.profile.get_write_options(reference=True),
+        )
+
+    def _write_reference_parquet(self, path: Union[Path, pa.NativeFile]) -> None:
+        self._write_arrow_table(
+            self._reference_df_to_arrow(self._reference_df),
+            path,
+            options=self.profile.get_write_options(reference=True),
+        )
+
+    @staticmethod
+    def _serialize(write: Callable[[pa.NativeFile], None]) -> pa.Buffer:
+        """ Write parquet into memory. """
+        stream = pa.BufferOutputStream()
+        write(stream)
+        return stream.getvalue()
 
     def save_reference_parquets(self):
         """ Save reference parquets to filesystem. """
-        index_df = self._index.to_frame(index=False)
-        ref_df = self._reference_df.copy()
-        ref_df.index = self.cast_mi_level_to_str(ref_df.index, ID_LEVEL)
-        for df, path in zip([index_df, ref_df], self.reference_paths):
-            self._write_table(df, path, preserve_index=True)
+        self._write_index_parquet(self.index_parquet_path)
+        self._write_reference_parquet(self.reference_parquet_path)
 
     @contextlib.contextmanager
     def temporary_reference_parquets(self):
@@ -524,45 +1477,243 @@ class ParquetFrame:
         finally:
             self.clear_reference_parquets()
 
+    def mark_saved(self) -> None:
+        """ Consider current state as stored in archive. """
+        self._dirty_parquets.clear()
+        self._all_dirty = False
+        self._reference_dirty = False
+
+    def mark_unsaved(self) -> None:
+        """ Consider all parquets as changed since last save. """
+        # parquet names are not resolved here to keep deferred references unloaded
+        self._all_dirty = True
+        self._reference_dirty = True
+
+    def _get_stored_parquet_paths(self) -> List[Path]:
+        """ Get data parquet paths, deferred frame lists stored files instead of references. """
+        if not self._deferred:
+            return self.parquet_paths
+        # deferred frame has not been modified so stored files match references
+        names = {path.name for path in self.workdir.glob(f"*{self.DATA_FILE_EXT}")}
+        if self.archive is not None:
+            n = len(self.archive_dir)
+            names.update(
+                name[n:]
+                for name in self.archive.namelist()
+                if name.startswith(self.archive_dir)
+                and name.endswith(self.DATA_FILE_EXT)
+                and "/" not in name[n:]
+            )
+        names.difference_update(path.name for path in self.reference_paths)
+        return [Path(self.workdir, name) for name in sorted(names)]
+
+    def get_member_names(self, relative_to: Path) -> List[str]:
+        """ Get archive names of all parquets. """
+        paths = self._get_stored_parquet_paths() + self.reference_paths
+        return [path.relative_to(relative_to).as_posix() for path in paths]
+
+    def get_unsaved_parquet_paths(
+        self, relative_to: Path, saved_members: Set[str]
+    ) -> List[Path]:
+        """ Get parquets which have changed or are not included in saved members. """
+        return [
+            path
+            for path in self._get_stored_parquet_paths()
+            if self._all_dirty
+            or path.name in self._dirty_parquets
+            or path.relative_to(relative_to).as_posix() not in saved_members
+        ]
+
+    def is_reference_unsaved(self, relative_to: Path, saved_members: Set[str]) -> bool:
+        """ Check if reference parquets have changed or are not included in saved members. """
+        names = [p.relative_to(relative_to).as_posix() for p in self.reference_paths]
+        return self._reference_dirty or not saved_members.issuperset(names)
+
+    def has_unsaved_changes(self, relative_to: Path, saved_members: Set[str]) -> bool:
+        """ Check if any parquet would be written when saving incrementally. """
+        return self.is_reference_unsaved(relative_to, saved_members) or bool(
+            self.get_unsaved_parquet_paths(relative_to, saved_members)
+        )
+
+    def _add_stored_file(
+        self, writer: ArchiveWriter, path: Path, relative_to: Path, progress: bool = True
+    ) -> None:
+        arcname = path.relative_to(relative_to).as_posix()
+        if path.exists():
+            writer.write_file(arcname, path, progress=progress)
+        else:
+            member = self._get_archive_member(path.name)
+            writer.copy_member(self.archive, member, arcname, progress=progress)
+
+    def add_to_writer(
+        self, writer: ArchiveWriter, relative_to: Path, saved_members: Set[str] = None
+    ) -> None:
+        """
+        Add parquets to given archive writer.
+
+        When 'saved_members' are given, only parquets changed since the
+        frame has been saved are added. Reference parquets are written
+        directly from memory (or copied when references have not been
+        loaded), parquets which have not been extracted are copied from
+        the source archive.
+
+        """
+        if saved_members is None:
+            paths = self._get_stored_parquet_paths()
+            write_reference = True
+        else:
+            paths = self.get_unsaved_parquet_paths(relative_to, saved_members)
+            write_reference = self.is_reference_unsaved(relative_to, saved_members)
+        for path in paths:
+            self._add_stored_file(writer, path, relative_to)
+        if write_reference:
+            # reference parquets are only included in progress of full save
+            progress = saved_members is None
+            if self._deferred:
+                for path in self.reference_paths:
+                    self._add_stored_file(writer, path, relative_to, progress=progress)
+                return
+            for path, write in zip(
+                self.reference_paths, [self._write_index_parquet, self._write_reference_parquet]
+            ):
+                writer.write_buffer(
+                    path.relative_to(relative_to).as_posix(),
+                    partial(self._serialize, write),
+                    progress=progress,
+                )
+
     def save_frame_to_zip(
         self, zf: ZipFile, relative_to: Path, logger: BaseLogger = None
     ) -> None:
         """ Write parquets to given zip file. """
-        with self.temporary_reference_parquets():
-            all_paths = self.parquet_paths + self.reference_paths
-            for path in all_paths:
-                zf.write(path, arcname=path.relative_to(relative_to))
-                if logger:
-                    logger.increment_progress()
+        with ArchiveWriter(zf, logger) as writer:
+            self.add_to_writer(writer, relative_to)
 
 
 class ParquetTables(DFTables):
+    BACKEND = "parquet"
+    FRAME_CLASS = ParquetFrame
+
     def __init__(self):
         super().__init__()
 
     @classmethod
     def from_dftables(
-        cls, dftables: DFTables, pardir: Path, logger: BaseLogger = None
+        cls,
+        dftables: DFTables,
+        pardir: Path,
+        logger: BaseLogger = None,
+        value_dtype: Optional[Union[str, type]] = None,
+        layout: str = CHUNKED_LAYOUT,
+        profile: Union[str, StorageProfile, None] = None,
     ) -> "ParquetTables":
         """ Create parquet data from DataFrame like class. """
-        pqt = ParquetTables()
+        pqt = cls()
         for k, v in dftables.tables.items():
-            pqt.tables[k] = ParquetFrame.from_df(v, k, pardir, logger=logger)
+            pqt.tables[k] = cls.FRAME_CLASS.from_df(
+                v,
+                k,
+                pardir,
+                logger=logger,
+                value_dtype=value_dtype,
+                layout=layout,
+                profile=profile,
+            )
         return pqt
 
     @classmethod
-    def from_fs(cls, pardir: Path):
+    def from_fs(cls, pardir: Path, deferred: bool = False):
         """ Create parquet data from filesystem directory. """
-        pqt = ParquetTables()
+        pqt = cls()
         dirs = [p for p in Path(pardir).iterdir() if p.is_dir()]
         for p in dirs:
             table = str(p.name).split("-", maxsplit=1)[1]
-            pqf = ParquetFrame.from_fs(p)
+            pqf = cls.FRAME_CLASS.from_fs(p, deferred=deferred)
             pqt.tables[table] = pqf
         return pqt
 
+    @classmethod
+    def from_archive(
+        cls,
+        archive: ParquetArchive,
+        pardir: Path,
+        archive_dir: str = "",
+        deferred: bool = False,
+    ) -> "ParquetTables":
+        """ Create parquet data from archive, parquets are not extracted. """
+        pqt = cls()
+        for dir_ in find_archive_dirs(archive, archive_dir):
+            table = dir_.split("-", maxsplit=1)[1]
+            pqt.tables[table] = cls.FRAME_CLASS.from_archive(
+                Path(pardir, dir_), archive, f"{archive_dir}{dir_}/", deferred=deferred
+            )
+        return pqt
+
+    def set_archive(self, archive: Optional[ParquetArchive], pardir: Path) -> None:
+        """ Serve parquets from given archive, table dirs are relative to 'pardir'. """
+        for pqf in self.tables.values():
+            pqf.set_archive(archive, f"{pqf.workdir.relative_to(pardir).as_posix()}/")
+
+    def close_archive(self) -> None:
+        """ Release memory mapped archive so the archive file can be modified. """
+        for pqf in self.tables.values():
+            if pqf.archive is not None:
+                pqf.archive.close()
+
+    def set_column_cache(self, column_cache: Optional[ColumnCache]) -> None:
+        """ Use given cache to store decoded columns of all tables. """
+        for pqf in self.tables.values():
+            pqf.set_column_cache(column_cache)
+
+    def _append_columns(self, table: str, df: pd.DataFrame) -> None:
+        self.tables[table].append_columns(df)
+
+    # column masks are evaluated on frame columns before slicing, both
+    # steps need to use the same snapshot when frame is modified concurrently
+    def get_special_table(self, table: str) -> pd.DataFrame:
+        with self.tables[table]._reading():
+            return super().get_special_table(table)
+
+    def get_numeric_table(self, table: str) -> pd.DataFrame:
+        with self.tables[table]._reading():
+            return super().get_numeric_table(table)
+
+    def get_results_df(self, table: str, ids: Sequence[int], *args, **kwargs) -> pd.DataFrame:
+        with self.tables[table]._reading():
+            return super().get_results_df(table, ids, *args, **kwargs)
+
+    def _global_peak(self, table: str, ids: Sequence[int], *args, **kwargs) -> pd.DataFrame:
+        with self.tables[table]._reading():
+            return super()._global_peak(table, ids, *args, **kwargs)
+
+    def get_results_table(
+        self,
+        table: str,
+        ids: Sequence[int],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> pa.Table:
+        """ Get results as arrow table, see 'ParquetFrame.as_arrow'. """
+        return self.tables[table].as_arrow(ids, start_date=start_date, end_date=end_date)
+
+    def migrate_layout(self, layout: str, logger: BaseLogger = None) -> None:
+        """ Rewrite all tables using given layout. """
+        for pqf in self.tables.values():
+            pqf.migrate_layout(layout)
+            if logger:
+                logger.increment_progress()
+
+    def vacuum(self, force: bool = False, logger: BaseLogger = None) -> int:
+        """ Repack fragmented tables, return number of reclaimed bytes. """
+        reclaimed = 0
+        for pqf in self.tables.values():
+            reclaimed += pqf.vacuum(force=force)
+            if logger:
+                logger.increment_progress()
+        return reclaimed
+
     def copy_to(self, new_pardir: Path) -> "ParquetTables":
-        new_tables = ParquetTables()
+        new_tables = type(self)()
         for table, pqf in self.tables.items():
             new_tables[table] = pqf.copy_to(new_pardir)
         return new_tables
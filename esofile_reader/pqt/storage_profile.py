@@ -0,0 +1,104 @@
+import json
+from typing import Dict, Any, Optional, Union
+
+COMPRESSIONS = ["snappy", "zstd", "lz4", "gzip", "brotli", "none"]
+
+
+class StorageProfile:
+    """
+    Options used to write parquets of parquet frames.
+
+    Parameters
+    ----------
+    compression : {'snappy', 'zstd', 'lz4', 'gzip', 'brotli', 'none'}
+        Compression codec used for all parquets.
+    compression_level : int, default None
+        Codec specific compression level, codec default is used when None.
+    use_dictionary : bool, default True
+        Use dictionary encoding for index and reference parquets,
+        these include repeated strings (table, key, type, units).
+    data_page_size : int, default None
+        Approximate size of data page in bytes, pyarrow default
+        is used when None.
+    row_group_size : int, default None
+        Number of rows in row group of data parquets,
+        'ParquetFrame.ROW_GROUP_SIZE' is used when None. Small
+        row groups allow reading only requested rows, large ones
+        are faster to write and to read as a whole.
+
+    """
+
+    def __init__(
+        self,
+        compression: str = "snappy",
+        compression_level: Optional[int] = None,
+        use_dictionary: bool = True,
+        data_page_size: Optional[int] = None,
+        row_group_size: Optional[int] = None,
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Invalid compression '{compression}', allowed values are: {COMPRESSIONS}."
+            )
+        self.compression = compression
+        self.compression_level = compression_level
+        self.use_dictionary = use_dictionary
+        self.data_page_size = data_page_size
+        self.row_group_size = row_group_size
+
+    def __repr__(self):
+        options = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"StorageProfile({options})"
+
+    def __eq__(self, other):
+        return isinstance(other, StorageProfile) and self.to_dict() == other.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": self.use_dictionary,
+            "data_page_size": self.data_page_size,
+            "row_group_size": self.row_group_size,
+        }
+
+    def to_json(self) -> bytes:
+        return json.dumps(self.to_dict()).encode()
+
+    @classmethod
+    def from_json(cls, content: bytes) -> "StorageProfile":
+        return StorageProfile(**json.loads(content))
+
+    def get_write_options(self, reference: bool = False) -> Dict[str, Any]:
+        """ Get 'pyarrow.parquet.write_table' keyword arguments. """
+        options = {
+            "compression": "NONE" if self.compression == "none" else self.compression,
+            "compression_level": self.compression_level,
+            "data_page_size": self.data_page_size,
+        }
+        if reference:
+            options["use_dictionary"] = self.use_dictionary
+        return options
+
+
+DEFAULT_PROFILE = StorageProfile()
+SPEED_PROFILE = StorageProfile(compression="lz4", row_group_size=65536)
+ARCHIVE_PROFILE = StorageProfile(compression="zstd", compression_level=9, row_group_size=8760)
+
+PROFILES = {
+    "default": DEFAULT_PROFILE,
+    "speed": SPEED_PROFILE,
+    "archive": ARCHIVE_PROFILE,
+}
+
+
+def get_profile(profile: Union[str, StorageProfile, None]) -> StorageProfile:
+    """ Get storage profile instance from profile name. """
+    if profile is None:
+        return DEFAULT_PROFILE
+    elif isinstance(profile, StorageProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Invalid profile '{profile}', allowed values are: {list(PROFILES)}.")
@@ -0,0 +1,26 @@
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+_thread_pools = {}  # type: Dict[int, ThreadPoolExecutor]
+_thread_pools_lock = threading.Lock()
+
+
+def get_thread_pool(max_workers: int) -> ThreadPoolExecutor:
+    """ Get shared thread pool with given number of workers. """
+    with _thread_pools_lock:
+        if max_workers not in _thread_pools:
+            _thread_pools[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"parquet-pool-{max_workers}"
+            )
+        return _thread_pools[max_workers]
+
+
+@atexit.register
+def shutdown_thread_pools() -> None:
+    """ Shut down all shared thread pools. """
+    with _thread_pools_lock:
+        for thread_pool in _thread_pools.values():
+            thread_pool.shutdown()
+        _thread_pools.clear()
@@ -44,17 +44,22 @@ def create_header_multiindex(
     return pd.MultiIndex.from_tuples(tuples, names=names)
 
 
-def create_df_from_columns(outputs_dct: Dict[int, List[float]]) -> pd.DataFrame:
+def create_df_from_columns(
+    outputs_dct: Dict[int, List[float]], value_dtype: Union[str, type] = float
+) -> pd.DataFrame:
     """ Create plain values pd.DataFrame from dictionary. """
-    return pd.DataFrame(outputs_dct, dtype=float)
+    return pd.DataFrame(outputs_dct, dtype=value_dtype)
 
 
-def create_df_from_rows(outputs_rows: List[Tuple[int, int, float]]) -> pd.DataFrame:
+def create_df_from_rows(
+    outputs_rows: List[Tuple[int, int, float]], value_dtype: Union[str, type] = float
+) -> pd.DataFrame:
     """ Create pd.DataFrame from list of rows. """
     df = pd.DataFrame(outputs_rows, columns=[TIMESTAMP_COLUMN, ID_LEVEL, VALUE_LEVEL])
-    return pd.pivot_table(
+    df = pd.pivot_table(
         df, values=VALUE_LEVEL, index=TIMESTAMP_COLUMN, columns=ID_LEVEL, fill_value=math.nan
     )
+    return df.astype(value_dtype, copy=False)
 
 
 def insert_special_columns(
@@ -130,11 +135,12 @@ def _cast_to_df(
     dates: Dict[str, List[datetime]],
     special_columns: Dict[str, Dict[str, List[Union[str, int]]]],
     progress_logger: BaseLogger,
+    value_dtype: Union[str, type] = float,
 ) -> DFTables:
     """ Create pd.DataFrame tables from plain data structures. """
     tables = DFTables()
     for interval, values in outputs.items():
-        df = df_func(values)
+        df = df_func(values, value_dtype)
         mi = create_header_multiindex(header[interval], set(df.columns), COLUMN_LEVELS)
         df = align_id_level(df, mi.get_level_values(ID_LEVEL))
         df.columns = mi
@@ -165,6 +171,7 @@ class Parser(ABC):
         dates: Dict[str, List[datetime]],
         special_columns: Dict[str, Dict[str, List[Union[str, int]]]],
         progress_logger: BaseLogger,
+        value_dtype: Union[str, type] = float,
     ) -> DFTables:
         pass
 
@@ -201,9 +208,16 @@ class RawEsoParser(Parser):
         dates: Dict[str, List[datetime]],
         special_columns: Dict[str, Dict[str, List[Union[str, int]]]],
         progress_logger: BaseLogger,
+        value_dtype: Union[str, type] = float,
     ) -> DFTables:
         return _cast_to_df(
-            create_df_from_columns, outputs, header, dates, special_columns, progress_logger
+            create_df_from_columns,
+            outputs,
+            header,
+            dates,
+            special_columns,
+            progress_logger,
+            value_dtype=value_dtype,
         )
 
     @staticmethod
@@ -252,9 +266,16 @@ class RawSqlParser(Parser):
         dates: Dict[str, List[datetime]],
         special_columns: Dict[str, Dict[str, List[Union[str, int]]]],
         progress_logger: BaseLogger,
+        value_dtype: Union[str, type] = float,
     ) -> DFTables:
         return _cast_to_df(
-            create_df_from_rows, outputs, header, dates, special_columns, progress_logger
+            create_df_from_rows,
+            outputs,
+            header,
+            dates,
+            special_columns,
+            progress_logger,
+            value_dtype=value_dtype,
         )
 
     @staticmethod
@@ -1,8 +1,13 @@
+import asyncio
 import logging
+import threading
 import time
+from collections import namedtuple
 from contextlib import contextmanager
 from typing import Union
 
+from esofile_reader.exceptions import TaskCancelled
+
 formatter = logging.Formatter("%(name)s - %(levelname)s: %(message)s")
 ch = logging.StreamHandler()
 ch.setFormatter(formatter)
@@ -15,6 +20,11 @@ INFO = 20
 ERROR = 40
 IGNORE = 100
 
+ProgressEvent = namedtuple("ProgressEvent", "task section progress max_progress")
+
+# 'get_event_loop' returns the running loop when called from a coroutine on python 3.6
+get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
 
 class BaseLogger:
     CHUNK_SIZE = 20000
@@ -105,3 +115,106 @@ class TimeLogger(BaseLogger):
             raise e
         finally:
             self.section_timestamps.clear()
+
+
+class AsyncLogger(BaseLogger):
+    """
+    A logger which publishes progress as an asynchronous stream.
+
+    Logger is used by a task running in a worker thread, events
+    are passed to the event loop which runs the task and can be
+    consumed using 'async for event in logger'. Stream ends when
+    the task finishes.
+
+    Event loop is bound on first use within a coroutine so the
+    logger can be created outside of a running loop.
+
+    Task can be cancelled from the event loop, 'TaskCancelled'
+    is then raised in the worker thread on next progress report.
+
+    """
+
+    def __init__(self, name: str, level=ERROR):
+        super().__init__(name, level)
+        self.section = ""
+        self._loop = None
+        self._queue = None
+        self._pending = []
+        self._bind_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._closed = False
+        self._finished = False
+
+    def bind(self) -> None:
+        """ Bind logger to the running event loop, called within a coroutine. """
+        loop = get_running_loop()
+        with self._bind_lock:
+            if self._loop is None:
+                self._loop = loop
+                self._queue = asyncio.Queue()
+                # events published before the loop has been known
+                for event in self._pending:
+                    self._queue.put_nowait(event)
+                self._pending.clear()
+            elif self._loop is not loop:
+                raise RuntimeError("Logger is already bound to a different event loop.")
+
+    def __aiter__(self) -> "AsyncLogger":
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        self.bind()
+        if self._finished:
+            raise StopAsyncIteration
+        event = await self._queue.get()
+        if event is None:
+            self._finished = True
+            raise StopAsyncIteration
+        return event
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """ Request the task to stop on next progress report. """
+        self._cancelled.set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise TaskCancelled(f"Task '{self.current_task_name}' has been cancelled.")
+
+    def _publish(self, event) -> None:
+        with self._bind_lock:
+            if self._loop is None:
+                self._pending.append(event)
+                return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def _publish_progress(self) -> None:
+        event = ProgressEvent(
+            self.current_task_name, self.section, self.progress, self.max_progress
+        )
+        self._publish(event)
+
+    def log_section(self, message: str) -> None:
+        self.check_cancelled()
+        super().log_section(message)
+        self.section = message
+        self._publish_progress()
+
+    def increment_progress(self, i: Union[int, float] = 1) -> None:
+        self.check_cancelled()
+        super().increment_progress(i)
+        self._publish_progress()
+
+    def set_maximum_progress(self, max_progress: int, progress: int = 0):
+        self.check_cancelled()
+        super().set_maximum_progress(max_progress, progress)
+        self._publish_progress()
+
+    def close(self) -> None:
+        """ End progress stream. """
+        if not self._closed:
+            self._closed = True
+            self._publish(None)
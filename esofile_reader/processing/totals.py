@@ -2,9 +2,12 @@ import logging
 import re
 from typing import Dict, Generator, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 
+from esofile_reader.convertor import upcast_single_precision
+from esofile_reader.df.df_functions import cast_numeric_columns
 from esofile_reader.df.df_tables import DFTables
 from esofile_reader.df.level_names import (
     ID_LEVEL,
@@ -110,6 +113,9 @@ def _get_keyword(string: str, keywords: Dict[str, str]) -> str:
 
 def calculate_totals(df: pd.DataFrame) -> pd.DataFrame:
     """ Handle totals generation."""
+    # sums and averages are always calculated using double precision
+    single_precision = not df.empty and (df.dtypes == np.float32).all()
+    df = upcast_single_precision(df)
     averaged_arr = df.columns.get_level_values(UNITS_LEVEL).isin(AVERAGED_UNITS)
     mi_df = df.columns.to_frame(index=False)
     mi_df.drop_duplicates(inplace=True)
@@ -126,6 +132,9 @@ def calculate_totals(df: pd.DataFrame) -> pd.DataFrame:
     df = pd.concat([avg_df, sum_df], axis=1)
     df.sort_values(by=ID_LEVEL, axis=1, inplace=True)
 
+    if single_precision:
+        df = cast_numeric_columns(df, np.float32)
+
     return df
 
 
@@ -1,15 +1,18 @@
 import logging
 from datetime import datetime
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Dict, Tuple
 
 import pandas as pd
 
 from esofile_reader.convertor import (
+    apply_conversion,
     convert_units,
     convert_rate_to_energy,
     can_convert_rate_to_energy,
+    create_conversion_dict,
 )
-from esofile_reader.df.level_names import N_DAYS_COLUMN
+from esofile_reader.df.df_functions import create_global_peak_outputs
+from esofile_reader.df.level_names import N_DAYS_COLUMN, UNITS_LEVEL
 from esofile_reader.exceptions import *
 from esofile_reader.typehints import ResultsFileType, VariableType
 from esofile_reader.results_processing.table_formatter import TableFormatter
@@ -31,6 +34,73 @@ def get_n_days(
     return n_days
 
 
+OUTPUT_TYPES = ["standard", "global_max", "global_min", "local_max", "local_min"]
+UNITS_SYSTEMS = ["SI", "IP"]
+
+
+def validate_output_type(output_type: str) -> None:
+    """ Check if requested output type is supported. """
+    if output_type not in OUTPUT_TYPES:
+        raise InvalidOutputType(
+            f"Invalid output type_ '{output_type}' "
+            f"requested.\n'output_type' kwarg must be"
+            f" one of '{', '.join(OUTPUT_TYPES)}'."
+        )
+
+
+def validate_units_system(units_system: str) -> None:
+    """ Check if requested units system is supported. """
+    if units_system not in UNITS_SYSTEMS:
+        raise InvalidUnitsSystem(
+            f"Invalid units system '{units_system}' "
+            f"requested.\n'output_type' kwarg must be"
+            f" one of '[{', '.join(UNITS_SYSTEMS)}]'."
+        )
+
+
+def get_local_peak_results(
+    results_file: ResultsFileType,
+    output_type: str,
+    table: str,
+    ids: List[int],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """ Get local peak results, these are only available on .eso files. """
+    try:
+        return results_file.peak_tables[output_type].get_results_df(
+            table, ids, start_date, end_date
+        )
+    except (TypeError, AttributeError):
+        raise PeaksNotIncluded(
+            "Local peak outputs are not included, only Eso files with "
+            "kwarg 'ignore_peaks=False' includes local peak outputs."
+        )
+    except KeyError:
+        raise PeaksNotIncluded(
+            f"Local peak outputs '{output_type}' are not available for table '{table}'."
+        )
+
+
+def get_standard_results(
+    results_file: ResultsFileType,
+    table: str,
+    df: pd.DataFrame,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_day: bool = False,
+    rate_to_energy: bool = False,
+) -> pd.DataFrame:
+    """ Convert rate to energy and add day to index of sliced standard results. """
+    # rate conversion needs plain datetime index to identify interval
+    if rate_to_energy and can_convert_rate_to_energy(results_file, table):
+        n_days = get_n_days(results_file, table, start_date, end_date)
+        df = convert_rate_to_energy(df, n_days)
+    if include_day and results_file.tables.is_index_datetime(table):
+        df = results_file.tables.add_day_to_index(df, table, start_date, end_date)
+    return df
+
+
 def get_processed_results(
     results_file: ResultsFileType,
     variables: Union[VariableType, List[VariableType], int, List[int]],
@@ -84,8 +154,15 @@ def get_processed_results(
     """
 
     def standard():
-        return results_file.tables.get_results_df(
-            table, ids, start_date, end_date, include_day=table_formatter.include_day
+        df = results_file.tables.get_results_df(table, ids, start_date, end_date)
+        return get_standard_results(
+            results_file,
+            table,
+            df,
+            start_date,
+            end_date,
+            include_day=table_formatter.include_day,
+            rate_to_energy=rate_to_energy,
         )
 
     def global_max():
@@ -95,19 +172,9 @@ def get_processed_results(
         return results_file.tables.get_global_min_results_df(table, ids, start_date, end_date)
 
     def local_peak():
-        try:
-            return results_file.peak_tables[output_type].get_results_df(
-                table, ids, start_date, end_date
-            )
-        except (TypeError, AttributeError):
-            raise PeaksNotIncluded(
-                "Local peak outputs are not included, only Eso files with "
-                "kwarg 'ignore_peaks=False' includes local peak outputs."
-            )
-        except KeyError:
-            raise PeaksNotIncluded(
-                f"Local peak outputs '{output_type}' are not available for table '{table}'."
-            )
+        return get_local_peak_results(
+            results_file, output_type, table, ids, start_date, end_date
+        )
 
     switch = {
         "standard": standard,
@@ -117,19 +184,8 @@ def get_processed_results(
         "local_min": local_peak,
     }
 
-    if output_type not in switch:
-        raise InvalidOutputType(
-            f"Invalid output type_ '{output_type}' "
-            f"requested.\n'output_type' kwarg must be"
-            f" one of '{', '.join(switch.keys())}'."
-        )
-
-    if units_system not in ["SI", "IP"]:
-        raise InvalidUnitsSystem(
-            f"Invalid units system '{units_system}' "
-            f"requested.\n'output_type' kwarg must be"
-            f" one of '[SI, IP]'."
-        )
+    validate_output_type(output_type)
+    validate_units_system(units_system)
 
     if table_formatter is None:
         table_formatter = TableFormatter()
@@ -138,14 +194,6 @@ def get_processed_results(
     groups = results_file.find_table_id_map(variables, part_match=part_match)
     for table, ids in groups.items():
         df = switch[output_type]()
-        if (
-            output_type == "standard"
-            and rate_to_energy
-            and can_convert_rate_to_energy(results_file, table)
-        ):
-            n_days = get_n_days(results_file, table, start_date, end_date)
-            df = convert_rate_to_energy(df, n_days)
-
         if units_system != "SI" or rate_units != "W" or energy_units != "J":
             df = convert_units(df, units_system, rate_units, energy_units)
 
@@ -159,3 +207,154 @@ def get_processed_results(
             f"Any of requested variables is not "
             f"included in the results file '{results_file.file_name}'."
         )
+
+
+def convert_units_cached(
+    df: pd.DataFrame,
+    units_system: str,
+    rate_units: str,
+    energy_units: str,
+    conversion_dicts: Dict[tuple, dict],
+) -> pd.DataFrame:
+    """ Convert units, conversion dictionaries are reused for the same set of units. """
+    if units_system == "SI" and rate_units == "W" and energy_units == "J":
+        return df
+    units = df.columns.get_level_values(UNITS_LEVEL)
+    key = (units_system, *units.unique())
+    if key not in conversion_dicts:
+        conversion_dicts[key] = create_conversion_dict(
+            units, units_system=units_system, rate_units=rate_units, energy_units=energy_units
+        )
+    conversion_dict = conversion_dicts[key]
+    return apply_conversion(df, conversion_dict) if conversion_dict else df
+
+
+def derive_output_type_results(
+    results_file: ResultsFileType,
+    output_type: str,
+    table: str,
+    ids: List[int],
+    shared_df: pd.DataFrame,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_day: bool = False,
+    rate_to_energy: bool = False,
+) -> pd.DataFrame:
+    """ Get results of given output type from already sliced standard results. """
+    if output_type == "standard":
+        return get_standard_results(
+            results_file,
+            table,
+            shared_df.copy(),
+            start_date,
+            end_date,
+            include_day=include_day,
+            rate_to_energy=rate_to_energy,
+        )
+    elif output_type == "global_max":
+        return create_global_peak_outputs(shared_df, max_=True)
+    elif output_type == "global_min":
+        return create_global_peak_outputs(shared_df, max_=False)
+    return get_local_peak_results(results_file, output_type, table, ids, start_date, end_date)
+
+
+def get_batch_processed_results(
+    results_file: ResultsFileType,
+    variables: Union[VariableType, List[VariableType], int, List[int]],
+    output_types: List[str],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    part_match: bool = False,
+    table_formatter: TableFormatter = None,
+    units_system: Union[str, List[str]] = "SI",
+    rate_units: str = "W",
+    energy_units: str = "J",
+    rate_to_energy: bool = False,
+) -> Dict[Union[str, Tuple[str, str]], pd.DataFrame]:
+    """
+    Return multiple output types for given variables at once.
+
+    Variable ids are resolved and results are sliced only once,
+    all the requested output types are derived from the shared slice.
+
+    Parameters
+    ----------
+    results_file : ResultsFileType
+        A file from which results are extracted.
+    variables : VariableType or list of (VariableType)
+        Requested variables.
+    output_types : list of {'standard', global_max','global_min', 'local_min', 'local_max'}
+        Requested types of results (local peaks are only included on .eso files.
+    start_date : datetime like object, default None
+        A start date for requested results.
+    end_date : datetime like object, default None
+        An end date for requested results.
+    part_match : bool
+        Only substring of the part of variable is enough
+        to match when searching for variables if this is True.
+    table_formatter : TableFormatter,
+        Define output table index and column items.
+    units_system : {'SI', 'IP'} or list of {'SI', 'IP'}
+        Selected units type_ for requested outputs.
+    rate_to_energy : bool
+        Defines if 'rate' will be converted to energy.
+    rate_units : {'W', 'kW', 'MW', 'Btu/h', 'kBtu/h'}
+        Convert default 'Rate' outputs to requested units.
+    energy_units : {'J', 'kJ', 'MJ', 'GJ', 'Btu', 'kWh', 'MWh'}
+        Convert default 'Energy' outputs to requested units
+
+    Returns
+    -------
+    dict of {str, pandas.DataFrame}
+        Results for requested variables, output type is used as a key.
+        When 'units_system' is passed as a list, keys are
+        (output type, units system) tuples.
+
+    """
+    units_systems = units_system if isinstance(units_system, list) else [units_system]
+    for output_type in output_types:
+        validate_output_type(output_type)
+    for system in units_systems:
+        validate_units_system(system)
+
+    if table_formatter is None:
+        table_formatter = TableFormatter()
+
+    conversion_dicts = {}
+
+    def get_key(output_type: str, system: str) -> Union[str, Tuple[str, str]]:
+        return (output_type, system) if isinstance(units_system, list) else output_type
+
+    all_frames = {get_key(o, s): [] for o in output_types for s in units_systems}
+    groups = results_file.find_table_id_map(variables, part_match=part_match)
+    for table, ids in groups.items():
+        shared_df = results_file.tables.get_results_df(table, ids, start_date, end_date)
+        for output_type in output_types:
+            view_df = derive_output_type_results(
+                results_file,
+                output_type,
+                table,
+                ids,
+                shared_df,
+                start_date,
+                end_date,
+                include_day=table_formatter.include_day,
+                rate_to_energy=rate_to_energy,
+            )
+            for system in units_systems:
+                df = convert_units_cached(
+                    view_df.copy(), system, rate_units, energy_units, conversion_dicts
+                )
+                all_frames[get_key(output_type, system)].append(df)
+
+    results = {}
+    for key, frames in all_frames.items():
+        if frames:
+            df = pd.concat(frames, axis=1, sort=False)
+            results[key] = table_formatter.format_table(df, results_file.file_name)
+    if not results:
+        logging.warning(
+            f"Any of requested variables is not "
+            f"included in the results file '{results_file.file_name}'."
+        )
+    return results
@@ -7,7 +7,8 @@ from pandas.testing import assert_frame_equal
 
 from esofile_reader import GenericFile, Variable
 from esofile_reader.exceptions import NoResults
-from esofile_reader.processing.totals import process_totals
+from esofile_reader.id_generator import incremental_id_gen
+from esofile_reader.processing.totals import process_totals, process_totals_table
 from esofile_reader.search_tree import Tree
 from esofile_reader.df.df_tables import DFTables
 from esofile_reader.df.level_names import COLUMN_LEVELS, SPECIAL
@@ -197,3 +198,10 @@ def test_only_simple_tables():
     )
     with pytest.raises(NoResults):
         _ = GenericFile.from_totals(rf)
+
+
+def test_totals_keep_single_precision(test_file):
+    df = test_file.tables.get_numeric_table("daily").astype("float32")
+    totals_table = process_totals_table(df, incremental_id_gen(start=1))
+    assert (totals_table.dtypes == "float32").all()
+    assert totals_table.iloc[0].tolist() == [2, 4, 6, 8, 9.5, 23, 15.5]
@@ -0,0 +1,185 @@
+import asyncio
+import shutil
+import threading
+
+from pandas.testing import assert_frame_equal
+
+from esofile_reader.exceptions import TaskCancelled
+from esofile_reader.pqt.async_storage import AsyncParquetStorage, _ReadWriteLock
+from esofile_reader.pqt.parquet_storage import ParquetStorage
+from esofile_reader.processing.progress_logger import AsyncLogger, ProgressEvent
+from tests.session_fixtures import *
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class BlockingLogger(AsyncLogger):
+    """ Logger which waits for permission before reporting progress. """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.release = threading.Event()
+
+    def increment_progress(self, i=1) -> None:
+        self.release.wait()
+        super().increment_progress(i)
+
+
+@pytest.fixture
+def async_storage():
+    storage = ParquetStorage()
+    try:
+        yield AsyncParquetStorage(storage)
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_store_file_progress(async_storage, excel_file):
+    async def store():
+        logger = AsyncLogger("test")
+        task = asyncio.ensure_future(async_storage.store_file(excel_file, logger=logger))
+        events = [event async for event in logger]
+        return await task, events
+
+    id_, events = run(store())
+    assert async_storage.files[id_].tables == excel_file.tables
+    assert all(isinstance(event, ProgressEvent) for event in events)
+    assert events[-1].progress == events[-1].max_progress
+    assert events[-1].max_progress > 0
+
+
+def test_store_file_cancelled(async_storage, excel_file):
+    async def store():
+        logger = BlockingLogger("test")
+        task = asyncio.ensure_future(async_storage.store_file(excel_file, logger=logger))
+        await logger.__anext__()
+        task.cancel()
+        while not logger.cancelled:
+            await asyncio.sleep(0)
+        logger.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(store())
+    assert async_storage.files == {}
+    assert list(async_storage.storage.workdir.iterdir()) == []
+
+
+def test_store_file_cancelled_while_committing(async_storage, excel_file, caplog):
+    started = threading.Event()
+    release = threading.Event()
+    commit = async_storage.storage.commit
+
+    def blocking_commit(path):
+        started.set()
+        release.wait()
+        return commit(path)
+
+    async_storage.storage.commit = blocking_commit
+
+    async def store():
+        task = asyncio.ensure_future(async_storage.store_file(excel_file))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(store())
+    assert list(async_storage.files) == [0]
+    assert async_storage.files[0].tables == excel_file.tables
+    assert "stored with id '0'" in caplog.text
+
+
+def test_logger_created_outside_loop(async_storage, excel_file):
+    logger = AsyncLogger("test")
+
+    async def collect():
+        return [event async for event in logger]
+
+    async def store():
+        task = asyncio.ensure_future(async_storage.store_file(excel_file, logger=logger))
+        events = await asyncio.wait_for(collect(), timeout=10)
+        return await task, events
+
+    id_, events = run(store())
+    assert async_storage.files[id_].tables == excel_file.tables
+    assert events[-1].progress == events[-1].max_progress
+
+
+def test_logger_cancel_raises():
+    async def create_logger():
+        return AsyncLogger("test")
+
+    logger = run(create_logger())
+    logger.cancel()
+    with pytest.raises(TaskCancelled):
+        logger.increment_progress()
+
+
+def test_concurrent_readers(excel_file, tiny_eplusout, tmpdir):
+    storage = ParquetStorage()
+    try:
+        storage.store_file(excel_file)
+        storage.store_file(tiny_eplusout)
+        path = storage.save_as(tmpdir, "async")
+    finally:
+        shutil.rmtree(storage.workdir)
+
+    variables = list(excel_file.get_header_dictionary("daily").values())
+    table = tiny_eplusout.table_names[0]
+    ids = tiny_eplusout.tables.get_variable_ids(table)[:2]
+
+    async def read():
+        async_storage = await AsyncParquetStorage.load_storage(path, lazy=True)
+        try:
+            requests = [
+                async_storage.get_results(0, variables),
+                async_storage.get_results_tables(1, ids),
+                async_storage.get_results(0, variables),
+            ]
+            return await asyncio.gather(*requests)
+        finally:
+            await async_storage.close()
+            shutil.rmtree(async_storage.storage.workdir)
+
+    first, tables, second = run(read())
+    assert_frame_equal(first, second)
+    assert_frame_equal(first, excel_file.get_results(variables), check_dtype=False)
+    assert tables[table].column_names[1:] == [str(id_) for id_ in ids]
+
+
+def test_read_write_lock():
+    async def check():
+        lock = _ReadWriteLock()
+        order = []
+
+        async def read(name):
+            await lock.acquire_read()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            order.append(name)
+            await lock.release_read()
+
+        async def write(name):
+            await lock.acquire_write()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            order.append(name)
+            await lock.release_write()
+
+        await asyncio.gather(read("r1"), read("r2"), write("w"), read("r3"))
+        return order
+
+    order = run(check())
+    # readers run concurrently, writer is exclusive and blocks later readers
+    assert order[:2] == ["r1", "r2"]
+    assert order[4:] == ["w", "w", "r3", "r3"]
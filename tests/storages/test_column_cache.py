@@ -0,0 +1,72 @@
+import pyarrow as pa
+import pytest
+
+from esofile_reader.pqt.column_cache import ColumnCache
+
+
+def array(n):
+    return pa.chunked_array([pa.array([1.0] * n)])
+
+
+@pytest.fixture
+def cache():
+    return ColumnCache(max_size=800)
+
+
+def test_get_put(cache):
+    assert cache.get(("a", "b", "1")) is None
+    cache.put(("a", "b", "1"), array(10))
+    assert cache.get(("a", "b", "1")).to_pylist() == [1.0] * 10
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["size"] == 80
+
+
+def test_evict_least_recently_used(cache):
+    for i in range(4):
+        cache.put(("a", "b", str(i)), array(25))
+    _ = cache.get(("a", "b", "0"))
+    cache.put(("a", "b", "4"), array(25))
+    assert ("a", "b", "0") in cache
+    assert ("a", "b", "1") not in cache
+    assert cache.stats["evictions"] == 1
+    assert cache.size == 800
+
+
+def test_too_large_array_not_cached(cache):
+    cache.put(("a", "b", "1"), array(101))
+    assert len(cache) == 0
+
+
+def test_invalidate(cache):
+    cache.put(("a", "b", "1"), array(10))
+    cache.put(("a", "c", "1"), array(10))
+    cache.put(("x", "b", "1"), array(10))
+    cache.invalidate("a", ["b"])
+    assert ("a", "b", "1") not in cache
+    assert ("a", "c", "1") in cache
+    cache.invalidate("a")
+    assert len(cache) == 1
+    assert cache.size == 80
+
+
+def test_resize(cache):
+    for i in range(4):
+        cache.put(("a", "b", str(i)), array(25))
+    cache.resize(400)
+    assert len(cache) == 2
+    assert ("a", "b", "3") in cache
+
+
+def test_clear(cache):
+    cache.put(("a", "b", "1"), array(10))
+    _ = cache.get(("a", "b", "1"))
+    cache.clear()
+    assert cache.stats == {
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "size": 0,
+        "max_size": 800,
+        "n_items": 0,
+    }
@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from pandas.testing import assert_frame_equal
+
+from esofile_reader.pqt.column_cache import ColumnCache
+from esofile_reader.pqt.feather_tables import FeatherFrame, FeatherTables
+from esofile_reader.pqt.parquet_file import ParquetFile, get_tables_class
+from esofile_reader.pqt.parquet_storage import ParquetStorage
+from esofile_reader.pqt.parquet_tables import ParquetTables, SINGLE_LAYOUT
+from tests.session_fixtures import *
+
+
+@pytest.fixture
+def test_df():
+    names = ["id", "interval", "key", "type", "units"]
+    columns = pd.MultiIndex.from_tuples(
+        [(i, "hourly", f"ZONE{i}", "Zone Temperature", "C") for i in range(1, 13)],
+        names=names,
+    )
+    index = pd.DatetimeIndex(
+        pd.date_range("2002-1-1", freq="h", periods=50), name="timestamp"
+    )
+    index.freq = None
+    return pd.DataFrame(
+        [[float(row * 100 + col) for col in range(12)] for row in range(50)],
+        columns=columns,
+        index=index,
+    )
+
+
+@pytest.fixture
+def feather_frame(test_df):
+    with tempfile.TemporaryDirectory(dir=Path(ROOT_PATH, "storages")) as temp_dir:
+        FeatherFrame.MAX_N_COLUMNS = 5
+        FeatherFrame.ROW_GROUP_SIZE = 16
+        feather_frame = FeatherFrame.from_df(test_df, "test", pardir=temp_dir)
+        try:
+            yield feather_frame
+        finally:
+            del FeatherFrame.MAX_N_COLUMNS
+            del FeatherFrame.ROW_GROUP_SIZE
+            feather_frame.clean_up()
+
+
+def test_data_files_are_ipc(feather_frame):
+    assert len(feather_frame.parquet_names) == 3
+    for path in feather_frame.parquet_paths:
+        assert path.suffix == ".arrow"
+        with pa.memory_map(str(path), "r") as source:
+            reader = pa.ipc.open_file(source)
+            assert reader.num_record_batches == 4
+
+
+def test_as_df(feather_frame, test_df):
+    assert_frame_equal(test_df, feather_frame.as_df())
+
+
+def test_row_range(feather_frame, test_df):
+    start, end = datetime(2002, 1, 1, 10), datetime(2002, 1, 2, 3)
+    assert_frame_equal(test_df.loc[start:end, [2, 7]], feather_frame.loc[start:end, [2, 7]])
+
+
+def test_update_and_compact(feather_frame, test_df):
+    feather_frame.loc[:, 3] = list(range(50))
+    test_df.loc[:, 3] = list(range(50))
+    assert feather_frame.delta_names[0].endswith(".arrow")
+    feather_frame.compact()
+    assert feather_frame.delta_names == []
+    assert_frame_equal(test_df, feather_frame.as_df(), check_dtype=False)
+
+
+def test_migrate_layout(feather_frame, test_df):
+    feather_frame.migrate_layout(SINGLE_LAYOUT)
+    assert len(feather_frame.parquet_names) == 1
+    assert_frame_equal(test_df, feather_frame.as_df())
+
+
+def test_column_cache(feather_frame, test_df):
+    feather_frame.set_column_cache(ColumnCache(1 << 20))
+    assert_frame_equal(test_df.loc[:, [2, 3]], feather_frame.loc[:, [2, 3]])
+    assert_frame_equal(test_df.loc[:, [2, 3]], feather_frame.loc[:, [2, 3]])
+    assert feather_frame.column_cache.stats["hits"] == 2
+
+
+def test_as_arrow(feather_frame, test_df):
+    table = feather_frame.as_arrow(ids=[4, 5])
+    assert table.column_names == ["timestamp", "4", "5"]
+    assert table.column("5").to_pylist() == test_df[5].iloc[:, 0].tolist()
+
+
+def test_copy_keeps_class(feather_frame, test_df, tmpdir):
+    copied = feather_frame.copy_to(Path(tmpdir))
+    try:
+        assert isinstance(copied, FeatherFrame)
+        assert_frame_equal(test_df, copied.as_df())
+    finally:
+        copied.clean_up()
+
+
+def test_get_tables_class():
+    assert get_tables_class(None) is ParquetTables
+    assert get_tables_class("feather") is FeatherTables
+    with pytest.raises(ValueError):
+        get_tables_class("foo")
+
+
+@pytest.fixture(scope="module")
+def feather_storage_path(excel_file, tiny_eplusout):
+    storage = ParquetStorage(backend="feather")
+    try:
+        storage.store_file(excel_file)
+        storage.store_file(tiny_eplusout, backend="parquet")
+        with tempfile.TemporaryDirectory(dir=Path(ROOT_PATH, "storages")) as temp_dir:
+            yield storage.save_as(temp_dir, "feather_storage")
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_load_feather_storage(feather_storage_path, excel_file, tiny_eplusout, lazy):
+    storage = ParquetStorage.load_storage(feather_storage_path, lazy=lazy)
+    try:
+        assert isinstance(storage.files[0].tables, FeatherTables)
+        assert isinstance(storage.files[1].tables, ParquetTables)
+        assert storage.files[0].get_info()["backend"] == "feather"
+        assert storage.files[0].tables == excel_file.tables
+        assert storage.files[1].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_store_file_with_backend(excel_file, tmpdir):
+    pqf = ParquetFile.from_results_file(0, excel_file, pardir=tmpdir, backend="feather")
+    try:
+        paths = [p for frame in pqf.tables.values() for p in frame.parquet_paths]
+        assert all(p.suffix == ".arrow" for p in paths)
+        assert pqf.tables == excel_file.tables
+    finally:
+        pqf.clean_up()
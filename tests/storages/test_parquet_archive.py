@@ -0,0 +1,132 @@
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from esofile_reader.pqt.parquet_archive import ParquetArchive, ArchiveWriter, find_archive_dirs
+from esofile_reader.pqt.thread_pools import get_thread_pool
+from esofile_reader.processing.progress_logger import BaseLogger
+from tests.session_fixtures import *
+
+
+@pytest.fixture
+def archive_path(tmpdir):
+    path = Path(tmpdir, "test.zip")
+    with ZipFile(path, "w") as zf:
+        zf.writestr("foo/bar.txt", b"stored")
+        zf.writestr("foo/baz/a.txt", b"nested")
+        zf.writestr("deflated.txt", b"deflated" * 100, compress_type=ZIP_DEFLATED)
+    return path
+
+
+def test_read_stored_member(archive_path):
+    archive = ParquetArchive(archive_path)
+    assert archive.read_bytes("foo/bar.txt") == b"stored"
+
+
+def test_read_deflated_member(archive_path):
+    archive = ParquetArchive(archive_path)
+    assert archive.read_bytes("deflated.txt") == b"deflated" * 100
+
+
+def test_contains(archive_path):
+    archive = ParquetArchive(archive_path)
+    assert archive.contains("foo/bar.txt")
+    assert not archive.contains("foo/missing.txt")
+
+
+def test_find_archive_dirs(archive_path):
+    archive = ParquetArchive(archive_path)
+    assert find_archive_dirs(archive) == ["foo"]
+    assert find_archive_dirs(archive, "foo/") == ["baz"]
+
+
+def test_copy_member(archive_path, tmpdir):
+    archive = ParquetArchive(archive_path)
+    path = Path(tmpdir, "copy.zip")
+    with ZipFile(path, "w") as zf:
+        archive.copy_member("deflated.txt", zf, "copy.txt")
+    assert ParquetArchive(path).read_bytes("copy.txt") == b"deflated" * 100
+
+
+def test_read_parquet_member(tmpdir):
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    pqt_path = Path(tmpdir, "test.parquet")
+    df.to_parquet(pqt_path)
+    path = Path(tmpdir, "test.zip")
+    with ZipFile(path, "w") as zf:
+        zf.write(pqt_path, arcname="test.parquet")
+    archive = ParquetArchive(path)
+    table = pq.read_table(archive.open("test.parquet"))
+    assert table.to_pandas().equals(df)
+
+
+def test_archive_writer(archive_path, tmpdir):
+    source = ParquetArchive(archive_path)
+    file_path = Path(tmpdir, "file.txt")
+    file_path.write_bytes(b"file")
+    logger = BaseLogger("test")
+    path = Path(tmpdir, "written.zip")
+    with ZipFile(path, "w") as zf:
+        with ArchiveWriter(zf, logger, max_workers=2) as writer:
+            writer.write_file("file.txt", file_path)
+            writer.write_buffer("buffer.txt", lambda: b"buffer")
+            writer.copy_member(source, "deflated.txt", "copied.txt")
+            writer.write_buffer("ignored.txt", lambda: b"", progress=False)
+    archive = ParquetArchive(path)
+    assert archive.namelist() == ["file.txt", "buffer.txt", "copied.txt", "ignored.txt"]
+    assert archive.read_bytes("file.txt") == b"file"
+    assert archive.read_bytes("buffer.txt") == b"buffer"
+    assert archive.read_bytes("copied.txt") == b"deflated" * 100
+    assert logger.progress == 3
+
+
+def test_archive_writer_stream_large_file(tmpdir, monkeypatch):
+    monkeypatch.setattr(ArchiveWriter, "MAX_BUFFERED_SIZE", 0)
+    monkeypatch.setattr(ArchiveWriter, "MAX_PENDING", 1)
+    paths = []
+    for i in range(5):
+        paths.append(Path(tmpdir, f"{i}.txt"))
+        paths[-1].write_bytes(str(i).encode() * 10)
+    path = Path(tmpdir, "written.zip")
+    with ZipFile(path, "w") as zf:
+        with ArchiveWriter(zf) as writer:
+            for p in paths:
+                writer.write_file(p.name, p)
+    archive = ParquetArchive(path)
+    assert archive.namelist() == [p.name for p in paths]
+    assert archive.read_bytes("3.txt") == b"3" * 10
+
+
+def test_archive_writer_error(tmpdir):
+    def fail():
+        raise ValueError("foo")
+
+    with ZipFile(Path(tmpdir, "written.zip"), "w") as zf:
+        with pytest.raises(ValueError):
+            with ArchiveWriter(zf) as writer:
+                writer.write_buffer("fail.txt", fail)
+
+
+def test_archive_writer_shared_thread_pool(tmpdir):
+    for i in range(2):
+        with ZipFile(Path(tmpdir, f"{i}.zip"), "w") as zf:
+            with ArchiveWriter(zf, max_workers=2) as writer:
+                assert writer._executor is get_thread_pool(2)
+                writer.write_buffer("buffer.txt", lambda: b"buffer")
+    assert get_thread_pool(2).submit(lambda: 1).result() == 1
+
+
+def test_close_archive(archive_path):
+    archive = ParquetArchive(archive_path)
+    assert archive.read_bytes("foo/bar.txt") == b"stored"
+    assert archive._buffer is not None
+    archive.close()
+    with ZipFile(archive_path, "a") as zf:
+        zf.writestr("appended.txt", b"appended")
+        assert archive.read_bytes("foo/bar.txt") == b"stored"
+        assert archive.read_bytes("deflated.txt") == b"deflated" * 100
+    assert archive._buffer is None
+    archive.reload()
+    assert archive.read_bytes("appended.txt") == b"appended"
+    assert archive._buffer is not None
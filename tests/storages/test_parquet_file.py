@@ -1,6 +1,8 @@
+import json
 import shutil
 import tempfile
 from copy import copy
+from zipfile import ZipFile
 
 from esofile_reader.pqt.parquet_storage import ParquetFile
 from esofile_reader.pqt.parquet_tables import ParquetFrame
@@ -111,3 +113,89 @@ def test_copy_parquet_file(parquet_file):
         assert copied_parquet_file.tables == parquet_file.tables
     finally:
         copied_parquet_file.clean_up()
+
+
+def test_get_results_tables(excel_file, tmpdir):
+    pqf = ParquetFile.from_results_file(0, excel_file, pardir=tmpdir)
+    try:
+        table = pqf.table_names[0]
+        ids = pqf.tables.get_variable_ids(table)[:2]
+        tables = pqf.get_results_tables(ids)
+        assert list(tables.keys()) == [table]
+        arrow_table = tables[table]
+        assert arrow_table.column_names[1:] == [str(id_) for id_ in ids]
+        df = pqf.tables.get_results_df(table, ids)
+        assert arrow_table.column(1).to_pylist() == df.iloc[:, 0].tolist()
+        assert arrow_table.num_rows == len(df.index)
+    finally:
+        pqf.clean_up()
+
+
+@pytest.fixture
+def saved_excel_file_path(excel_file, tmpdir):
+    pardir = Path(tmpdir, "source")
+    pardir.mkdir()
+    pqf = ParquetFile.from_results_file(0, excel_file, pardir=pardir)
+    try:
+        yield pqf.save_as(tmpdir, "excel")
+    finally:
+        pqf.clean_up()
+
+
+def test_header_catalogue_stored(saved_excel_file_path, excel_file):
+    with ZipFile(saved_excel_file_path) as zf:
+        info = json.loads(zf.read(ParquetFile.INFO_JSON))
+    header = ParquetFile._header_from_json(info[ParquetFile.HEADER_KEY])
+    assert header == excel_file.tables.get_all_variables_dct()
+
+
+def test_deferred_file_loading(saved_excel_file_path, excel_file, tmpdir):
+    pqf = ParquetFile.from_file_system(saved_excel_file_path, tmpdir)
+    try:
+        assert pqf._search_tree is None
+        assert all(pqf_.deferred for pqf_ in pqf.tables.values())
+        variable = next(iter(excel_file.get_header_dictionary("daily").values()))
+        assert pqf.search_tree.find_ids(variable) == excel_file.search_tree.find_ids(variable)
+        # tree is built from catalogue without reading tables
+        assert all(pqf_.deferred for pqf_ in pqf.tables.values())
+        assert pqf.tables == excel_file.tables
+        assert not any(pqf_.deferred for pqf_ in pqf.tables.values())
+    finally:
+        pqf.clean_up()
+
+
+def test_load_file_without_header_catalogue(saved_excel_file_path, excel_file, tmpdir):
+    with ZipFile(saved_excel_file_path) as zf:
+        info = json.loads(zf.read(ParquetFile.INFO_JSON))
+        members = {n: zf.read(n) for n in zf.namelist() if n != ParquetFile.INFO_JSON}
+    del info[ParquetFile.HEADER_KEY]
+    with ZipFile(saved_excel_file_path, "w") as zf:
+        zf.writestr(ParquetFile.INFO_JSON, json.dumps(info))
+        for name, content in members.items():
+            zf.writestr(name, content)
+    pqf = ParquetFile.from_file_system(saved_excel_file_path, tmpdir)
+    try:
+        assert pqf._search_tree is not None
+        assert not any(pqf_.deferred for pqf_ in pqf.tables.values())
+        assert pqf.get_header() == ParquetFile._header_to_json(
+            excel_file.tables.get_all_variables_dct()
+        )
+    finally:
+        pqf.clean_up()
+
+
+def test_header_catalogue_updated(saved_excel_file_path, excel_file, tmpdir):
+    pqf = ParquetFile.from_file_system(saved_excel_file_path, tmpdir)
+    try:
+        variable = next(iter(excel_file.get_header_dictionary("daily").values()))
+        id_, new_variable = pqf.rename_variable(variable, new_key="FOO")
+        path = pqf.save_as(tmpdir, "renamed")
+    finally:
+        pqf.clean_up()
+    Path(tmpdir, "renamed").mkdir()
+    pqf = ParquetFile.from_file_system(path, Path(tmpdir, "renamed"))
+    try:
+        assert pqf.search_tree.find_ids(new_variable) == [id_]
+        assert pqf.search_tree.find_ids(variable) == []
+    finally:
+        pqf.clean_up()
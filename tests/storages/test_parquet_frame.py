@@ -1,14 +1,28 @@
+import os
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from datetime import datetime
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 from pandas.testing import assert_frame_equal, assert_index_equal
 
-from esofile_reader.pqt.parquet_tables import ParquetFrame, parquet_frame_factory, CorruptedData
+from esofile_reader.pqt.column_cache import ColumnCache
+from esofile_reader.pqt.parquet_tables import (
+    ParquetFrame,
+    _ReferenceIndex,
+    parquet_frame_factory,
+    CorruptedData,
+    SINGLE_LAYOUT,
+    CHUNKED_LAYOUT,
+)
+from esofile_reader.pqt.storage_profile import StorageProfile, get_profile
+from esofile_reader.pqt.thread_pools import get_thread_pool
 from tests.session_fixtures import ROOT_PATH
 
 
@@ -181,6 +195,29 @@ def test_column_reference_invalid_mixed_type(parquet_frame):
         _ = (parquet_frame[[(2, "daily", "BLOCK1:ZONE2", "Zone Temperature", "C"), 6]],)
 
 
+def test_reference_index_positions(parquet_frame, test_df):
+    reference_index = parquet_frame._reference_index
+    keys = [test_df.columns[5], test_df.columns[1]]
+    assert reference_index.get_positions(keys).tolist() == [5, 1]
+    mask = [False] * 13 + [True]
+    assert reference_index.get_positions(mask).tolist() == [13]
+    assert reference_index.get_positions([2, 3]) is None
+    with pytest.raises(KeyError):
+        reference_index.get_positions([(1000, "some", "invalid", "variable", "")])
+
+
+def test_reference_index_pqt_ref_pairs(parquet_frame):
+    pairs = parquet_frame._reference_index.get_pqt_ref_pairs(np.array([13, 0, 6, 1]))
+    names = parquet_frame.parquet_names
+    assert pairs == {names[2]: [13], names[0]: [0, 1], names[1]: [6]}
+
+
+def test_reference_index_invalidated(parquet_frame):
+    _ = parquet_frame._reference_index
+    parquet_frame.drop(columns=[6, 10], level="id")
+    assert len(parquet_frame._reference_index) == 12
+
+
 def test_loc_slice_rows(parquet_frame, test_df):
     assert_frame_equal(
         test_df.loc[datetime(2002, 1, 1) : datetime(2002, 1, 2)],
@@ -195,6 +232,55 @@ def test_loc(parquet_frame, test_df):
     )
 
 
+@pytest.fixture
+def hourly_df():
+    columns = pd.MultiIndex.from_tuples(
+        [(1, "hourly", "BLOCK1:ZONE1", "Zone Temperature", "C"), (2, "hourly", "a", "b", "W")],
+        names=["id", "interval", "key", "type", "units"],
+    )
+    index = pd.DatetimeIndex(pd.date_range("2002-1-1", freq="h", periods=48), name="timestamp")
+    index.freq = None
+    return pd.DataFrame(np.arange(96).reshape(48, 2), index=index, columns=columns)
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (datetime(2002, 1, 1, 5), datetime(2002, 1, 1, 23)),
+        (datetime(2002, 1, 1, 5, 30), None),
+        (None, datetime(2002, 1, 2, 3)),
+        (datetime(2002, 2, 1), None),
+        (datetime(2001, 1, 1), datetime(2001, 1, 2)),
+    ],
+)
+def test_loc_row_range_pushdown(hourly_df, start, end):
+    ParquetFrame.ROW_GROUP_SIZE = 10
+    try:
+        with parquet_frame_factory(df=hourly_df, name="test") as pqf:
+            assert pqf._get_row_range(slice(start, end)) is not None
+            assert_frame_equal(hourly_df.loc[start:end, [2]], pqf.loc[start:end, [2]])
+            assert_frame_equal(hourly_df.loc[start:end], pqf.loc[start:end])
+    finally:
+        ParquetFrame.ROW_GROUP_SIZE = 1024
+
+
+def test_row_range_reads_row_groups(hourly_df):
+    ParquetFrame.ROW_GROUP_SIZE = 10
+    try:
+        with parquet_frame_factory(df=hourly_df, name="test") as pqf:
+            table = pqf._read_table_from_parquet(pqf.parquet_names[0], row_range=(12, 15))
+            assert table.num_rows == 3
+            assert table.column(0).to_pylist() == [24, 26, 28]
+    finally:
+        ParquetFrame.ROW_GROUP_SIZE = 1024
+
+
+def test_row_range_not_applicable(parquet_frame):
+    assert parquet_frame._get_row_range(slice(None, None)) is None
+    assert parquet_frame._get_row_range(slice("2002-01", None)) is None
+    assert parquet_frame._get_row_range([datetime(2002, 1, 1)]) is None
+
+
 def test_invalid_loc(parquet_frame):
     with pytest.raises(KeyError):
         _ = parquet_frame.loc[:, ["a", "b", "c", 1.1234]]
@@ -273,6 +359,33 @@ def test_get_full_df(parquet_frame, test_df):
     assert_frame_equal(test_df, parquet_frame.as_df())
 
 
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_read_workers(parquet_frame, test_df, max_workers):
+    ParquetFrame.MAX_READ_WORKERS = max_workers
+    try:
+        assert_frame_equal(test_df, parquet_frame.as_df())
+        assert_frame_equal(test_df[[14, 2, 8]], parquet_frame[[14, 2, 8]])
+    finally:
+        ParquetFrame.MAX_READ_WORKERS = 8
+
+
+def test_read_thread_pool_is_shared(parquet_frame, test_df):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        dfs = list(executor.map(lambda _: parquet_frame.as_df(), range(20)))
+    for df in dfs:
+        assert_frame_equal(test_df, df)
+    prefix = f"parquet-pool-{ParquetFrame.MAX_READ_WORKERS}_"
+    read_threads = [t for t in threading.enumerate() if t.name.startswith(prefix)]
+    assert 0 < len(read_threads) <= ParquetFrame.MAX_READ_WORKERS
+
+
+def test_thread_pools_by_size():
+    assert get_thread_pool(8) is get_thread_pool(8)
+    assert get_thread_pool(2) is not get_thread_pool(8)
+    assert get_thread_pool(2)._max_workers == 2
+    assert get_thread_pool(8)._max_workers == 8
+
+
 def test_insert_column_start(parquet_frame, test_df):
     parquet_frame.insert(0, (100, "this", "is", "dummy", "type"), ["a", "b", "c"])
     test_df.insert(0, (100, "this", "is", "dummy", "type"), ["a", "b", "c"])
@@ -291,6 +404,84 @@ def test_insert_column_end(parquet_frame, test_df):
     assert_frame_equal(parquet_frame.as_df(), test_df)
 
 
+def test_insert_column_end_extends_reference_index(parquet_frame, test_df):
+    reference_index = parquet_frame._reference_index
+    positions = dict(reference_index.positions)
+    parquet_frame.insert(14, (100, "this", "is", "dummy", "type"), ["a", "b", "c"])
+    new_reference_index = parquet_frame._reference_index
+    # previous snapshot is not modified
+    assert reference_index.positions == positions
+    assert len(reference_index) == 14
+    rebuilt = _ReferenceIndex.from_reference_df(parquet_frame._reference_df)
+    assert new_reference_index._positions == rebuilt.positions
+    assert new_reference_index.pqt_ids.tolist() == rebuilt.pqt_ids.tolist()
+    pairs = new_reference_index.get_pqt_ref_pairs(np.arange(15))
+    assert pairs == rebuilt.get_pqt_ref_pairs(np.arange(15))
+
+
+def test_append_columns(parquet_frame, test_df):
+    columns = pd.MultiIndex.from_tuples(
+        [(100, "this", "is", "dummy", "type"), (101, "this", "is", "other", "type")],
+        names=test_df.columns.names,
+    )
+    df = pd.DataFrame([[1, 2], [3, 4], [5, 6]], index=test_df.index, columns=columns)
+    parquet_frame.append_columns(df)
+    test_df = pd.concat([test_df, df], axis=1)
+    assert_frame_equal(parquet_frame.as_df(), test_df)
+    assert parquet_frame.parquet_count == 6
+
+
+def test_append_columns_invalid_length(parquet_frame, test_df):
+    columns = pd.MultiIndex.from_tuples(
+        [(100, "this", "is", "dummy", "type")], names=test_df.columns.names
+    )
+    with pytest.raises(ValueError):
+        parquet_frame.append_columns(pd.DataFrame([[1], [2]], columns=columns))
+
+
+def test_insert_column_delta(parquet_frame, test_df):
+    original_names = set(parquet_frame.parquet_names)
+    parquet_frame.insert(5, (100, "this", "is", "dummy", "type"), [1, 2, 3])
+    assert set(parquet_frame.parquet_names).difference(original_names) == set(
+        parquet_frame.delta_names
+    )
+    assert len(parquet_frame.delta_names) == 1
+
+
+def test_update_column_delta(parquet_frame, test_df):
+    var = (14, "daily", "Some Curve", "Performance Curve Input Variable 1", "kg/s")
+    original_names = set(parquet_frame.parquet_names)
+    parquet_frame.loc[:, var] = [7, 8, 9]
+    test_df.loc[:, var] = [7, 8, 9]
+    assert original_names.issubset(set(parquet_frame.parquet_names))
+    assert len(parquet_frame.delta_names) == 1
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
+def test_compact(parquet_frame, test_df):
+    var = (14, "daily", "Some Curve", "Performance Curve Input Variable 1", "kg/s")
+    parquet_frame.loc[:, var] = [7, 8, 9]
+    parquet_frame.insert(5, (100, "this", "is", "dummy", "type"), [1, 2, 3])
+    test_df.loc[:, var] = [7, 8, 9]
+    test_df.insert(5, (100, "this", "is", "dummy", "type"), [1, 2, 3])
+    parquet_frame.compact()
+    assert not parquet_frame.delta_names
+    assert len(list(parquet_frame.workdir.iterdir())) == len(parquet_frame.parquet_names)
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
+def test_compact_automatically(parquet_frame, test_df):
+    ParquetFrame.MAX_N_DELTAS = 2
+    try:
+        for i in range(3):
+            parquet_frame.insert(0, (100 + i, "this", "is", "dummy", "type"), [1, 2, 3])
+            test_df.insert(0, (100 + i, "this", "is", "dummy", "type"), [1, 2, 3])
+    finally:
+        ParquetFrame.MAX_N_DELTAS = 50
+    assert not parquet_frame.delta_names
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
 def test_insert_column_invalid(parquet_frame):
     with pytest.raises(IndexError):
         parquet_frame.insert(25, (100, "this", "is", "dummy", "type"), ["a", "b", "c"])
@@ -328,6 +519,13 @@ def test_drop_multiple_items_no_level(parquet_frame, test_df):
     assert_frame_equal(test_df, parquet_frame.as_df())
 
 
+def test_drop_keeps_partially_referenced_parquets(parquet_frame, test_df):
+    test_df.drop(columns=[6], inplace=True, level="id")
+    parquet_frame.drop(columns=[6], inplace=True, level="id")
+    assert len(list(parquet_frame.workdir.iterdir())) == 3
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
 def test_drop_invalid_level(parquet_frame):
     with pytest.raises(KeyError):
         parquet_frame.drop(columns=[1, 2, 3], level="foo")
@@ -353,6 +551,110 @@ def test_read_missing_parquets(parquet_frame):
         ParquetFrame.from_fs(parquet_frame.workdir)
 
 
+def test_deferred_references(parquet_frame, test_df):
+    parquet_frame.save_reference_parquets()
+    loaded_pqf = ParquetFrame.from_fs(parquet_frame.workdir, deferred=True)
+    assert loaded_pqf.deferred
+    assert parquet_frame.index_parquet_path.exists()
+    assert_frame_equal(test_df, loaded_pqf.as_df())
+    assert not loaded_pqf.deferred
+    assert loaded_pqf.layout == parquet_frame.layout
+    assert not parquet_frame.index_parquet_path.exists()
+
+
+def test_deferred_missing_parquets(parquet_frame):
+    parquet_frame.save_reference_parquets()
+    parquet_frame.index_parquet_path.unlink()
+    loaded_pqf = ParquetFrame.from_fs(parquet_frame.workdir, deferred=True)
+    with pytest.raises(CorruptedData):
+        _ = loaded_pqf.columns
+    assert loaded_pqf.deferred
+
+
+def test_reader_keeps_removed_parquets(parquet_frame, test_df):
+    old_paths = parquet_frame.parquet_paths
+    with parquet_frame._reading():
+        # writer runs in another thread while snapshot is pinned
+        writer = threading.Thread(
+            target=parquet_frame.drop, args=(["SPECIAL", 2, 3, 4, 5],), kwargs={"level": "id"}
+        )
+        writer.start()
+        writer.join()
+        assert all(p.exists() for p in old_paths)
+        assert_frame_equal(test_df, parquet_frame.as_df())
+    assert not old_paths[0].exists()
+    assert_frame_equal(test_df.iloc[:, 5:], parquet_frame.as_df())
+
+
+def test_clean_up_waits_for_readers(parquet_frame):
+    with parquet_frame._reading():
+        parquet_frame.clean_up()
+        assert parquet_frame.workdir.exists()
+    assert not parquet_frame.workdir.exists()
+
+
+def test_concurrent_readers_and_writer(parquet_frame, test_df):
+    ParquetFrame.MAX_N_DELTAS = 3
+    key = test_df.columns[1]
+
+    def write():
+        for i in range(20):
+            parquet_frame[key] = [i, i, i]
+
+    def read():
+        for _ in range(20):
+            df = parquet_frame.as_df()
+            assert df[key].nunique() == 1
+            assert_frame_equal(test_df.drop(columns=key), df.drop(columns=key))
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(write)] + [executor.submit(read) for _ in range(3)]
+            for future in futures:
+                future.result()
+    finally:
+        ParquetFrame.MAX_N_DELTAS = 50
+    assert parquet_frame[key].iloc[:, 0].tolist() == [19, 19, 19]
+    assert len(os.listdir(parquet_frame.workdir)) == len(set(parquet_frame.parquet_names))
+
+
+def test_vacuum_not_fragmented(parquet_frame):
+    names = parquet_frame.parquet_names
+    assert not parquet_frame.is_fragmented()
+    assert parquet_frame.vacuum() == 0
+    assert parquet_frame.parquet_names == names
+
+
+def test_vacuum_dropped_columns(parquet_frame, test_df):
+    parquet_frame.drop([2, 3, 6, 8, 11], level="id")
+    expected_df = test_df.drop(columns=[2, 3, 6, 8, 11], level="id")
+    assert len(set(parquet_frame.parquet_names)) == 3
+    assert parquet_frame.is_fragmented()
+    assert parquet_frame.vacuum() > 0
+    assert len(set(parquet_frame.parquet_names)) == 2
+    assert len(os.listdir(parquet_frame.workdir)) == 2
+    assert not parquet_frame.is_fragmented()
+    assert_frame_equal(expected_df, parquet_frame.as_df())
+
+
+def test_vacuum_deltas(parquet_frame, test_df):
+    parquet_frame.insert(2, ("new", "daily", "foo", "bar", "baz"), [0, 0, 0])
+    parquet_frame[test_df.columns[5]] = [1, 2, 3]
+    expected_df = parquet_frame.as_df()
+    assert parquet_frame.is_fragmented()
+    parquet_frame.vacuum()
+    assert parquet_frame.delta_names == []
+    assert len(set(parquet_frame.parquet_names)) == 3
+    assert_frame_equal(expected_df, parquet_frame.as_df())
+
+
+def test_vacuum_force(parquet_frame, test_df):
+    names = parquet_frame.parquet_names
+    parquet_frame.vacuum(force=True)
+    assert set(names).isdisjoint(parquet_frame.parquet_names)
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
 def test_read_reference_parquets(parquet_frame, test_df):
     with parquet_frame.temporary_reference_parquets():
         loaded_pqf = ParquetFrame(workdir=parquet_frame.workdir)
@@ -361,12 +663,96 @@ def test_read_reference_parquets(parquet_frame, test_df):
         assert_frame_equal(parquet_frame._reference_df, loaded_pqf._reference_df)
 
 
+def test_reference_parquet_typed_ids(parquet_frame):
+    with parquet_frame.temporary_reference_parquets():
+        table = pq.read_table(parquet_frame.reference_parquet_path)
+    assert str(table.schema.field("id").type) == "int64"
+    assert table.column("id").null_count == 1
+    assert table.column("id_marker").drop_null().to_pylist() == ["SPECIAL"]
+    assert table.column("id").to_pylist()[1:] == [2, 3, 4, 5, 6, 0, 8, 9, 10, 11, 12, 13, 14]
+
+
+@pytest.mark.parametrize(
+    "keys, units",
+    [([10, 20, 10], ["C", "W", "C"]), (["a", None, "b"], [None, None, None])],
+)
+def test_reference_arrow_round_trip(keys, units):
+    mi = pd.MultiIndex.from_arrays(
+        [["special", 1, 2], ["t", "t", "t"], keys, units], names=["id", "table", "key", "units"]
+    )
+    ref_df = pd.DataFrame({"pqt_id": [0, 1, 2], "pqt_name": ["a", "a", "b"]}, index=mi)
+    table = ParquetFrame._reference_df_to_arrow(ref_df)
+    loaded_df = ParquetFrame._reference_df_from_arrow(table)
+    assert_frame_equal(ref_df, loaded_df)
+
+
+def test_read_legacy_reference_parquet(parquet_frame, test_df):
+    ref_df = parquet_frame._reference_df.copy()
+    ref_df.index = ParquetFrame.cast_mi_level_to_str(ref_df.index, "id")
+    with parquet_frame.temporary_reference_parquets():
+        ParquetFrame._write_table(ref_df, parquet_frame.reference_parquet_path)
+        loaded_pqf = ParquetFrame(workdir=parquet_frame.workdir)
+        loaded_pqf.read_reference_parquets()
+    assert_frame_equal(parquet_frame._reference_df, loaded_pqf._reference_df)
+    assert_frame_equal(test_df, loaded_pqf.as_df())
+
+
 def test_parquet_frame_context_manager(parquet_frame, test_df):
     with parquet_frame_factory(df=test_df, name="test") as pqf:
         assert_frame_equal(test_df, pqf.as_df(), check_index_type=False)
     assert not pqf.workdir.exists()
 
 
+def test_from_df_value_dtype(test_df):
+    test_df = test_df.astype(float)
+    with parquet_frame_factory(df=test_df, name="test", value_dtype="float32") as pqf:
+        df = pqf.as_df()
+        assert (df.dtypes == "float32").all()
+        assert_frame_equal(test_df, df, check_dtype=False)
+
+
+def test_single_layout(test_df):
+    with parquet_frame_factory(df=test_df, name="test", layout=SINGLE_LAYOUT) as pqf:
+        assert len(pqf.parquet_names) == 1
+        assert_frame_equal(test_df, pqf.as_df())
+        assert_frame_equal(test_df[[2, 5, 8]], pqf[[2, 5, 8]])
+
+
+def test_single_layout_append_columns(test_df):
+    columns = pd.MultiIndex.from_tuples(
+        [(100, "this", "is", "dummy", "type")], names=test_df.columns.names
+    )
+    df = pd.DataFrame([[1], [3], [5]], index=test_df.index, columns=columns)
+    with parquet_frame_factory(df=test_df, name="test", layout=SINGLE_LAYOUT) as pqf:
+        pqf.append_columns(df)
+        assert len(list(pqf.workdir.iterdir())) == 1
+        assert_frame_equal(pd.concat([test_df, df], axis=1), pqf.as_df())
+
+
+def test_invalid_layout(test_df):
+    with pytest.raises(ValueError):
+        with parquet_frame_factory(df=test_df, name="test", layout="foo"):
+            pass
+
+
+def test_migrate_layout(parquet_frame, test_df):
+    parquet_frame.migrate_layout(SINGLE_LAYOUT)
+    assert len(list(parquet_frame.workdir.iterdir())) == 1
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+    parquet_frame.migrate_layout(CHUNKED_LAYOUT)
+    assert len(list(parquet_frame.workdir.iterdir())) == 3
+    assert_frame_equal(test_df, parquet_frame.as_df())
+
+
+def test_read_reference_parquets_layout(parquet_frame):
+    parquet_frame.migrate_layout(SINGLE_LAYOUT)
+    with parquet_frame.temporary_reference_parquets():
+        loaded_pqf = ParquetFrame(workdir=parquet_frame.workdir)
+        loaded_pqf.read_reference_parquets()
+        assert loaded_pqf.layout == SINGLE_LAYOUT
+
+
 def test_copy_to(parquet_frame, test_df):
     with tempfile.TemporaryDirectory(dir=Path(ROOT_PATH, "storages")) as temp_dir:
         copied_frame = parquet_frame.copy_to(temp_dir)
@@ -385,6 +771,7 @@ def test_copy(parquet_frame, test_df):
 def test_predict_n_parquets(shape, n_parquets):
     df = pd.DataFrame(np.random.uniform(0, 10e6, shape))
     assert ParquetFrame.predict_n_parquets(df) == n_parquets
+    assert ParquetFrame.predict_n_parquets(df, SINGLE_LAYOUT) == 1
 
 
 @pytest.mark.parametrize(
@@ -399,3 +786,166 @@ def test_predict_n_parquets(shape, n_parquets):
 def test_predict_n_columns_in_parquet(shape, n_columns):
     df = pd.DataFrame(np.random.uniform(0, 10e6, shape))
     assert ParquetFrame._get_columns_per_parquet(df) == n_columns
+
+
+@pytest.mark.parametrize(
+    "profile,codec",
+    [
+        (None, "SNAPPY"),
+        ("speed", "LZ4"),
+        ("archive", "ZSTD"),
+        (StorageProfile(compression="none"), "UNCOMPRESSED"),
+    ],
+)
+def test_storage_profile_codec(test_df, profile, codec):
+    with parquet_frame_factory(df=test_df, name="test", profile=profile) as pqf:
+        metadata = pq.ParquetFile(pqf.parquet_paths[0]).metadata
+        assert metadata.row_group(0).column(0).compression == codec
+        assert_frame_equal(test_df, pqf.as_df(), check_column_type=False)
+
+
+def test_storage_profile_row_group_size(hourly_df):
+    profile = StorageProfile(row_group_size=10)
+    with parquet_frame_factory(df=hourly_df, name="test", profile=profile) as pqf:
+        assert pq.ParquetFile(pqf.parquet_paths[0]).metadata.row_group(0).num_rows == 10
+
+
+def test_storage_profile_reference_dictionary(test_df):
+    profile = StorageProfile(use_dictionary=False)
+    with parquet_frame_factory(df=test_df, name="test", profile=profile) as pqf:
+        with pqf.temporary_reference_parquets():
+            metadata = pq.ParquetFile(pqf.reference_parquet_path).metadata
+            encodings = metadata.row_group(0).column(0).encodings
+            assert "PLAIN_DICTIONARY" not in encodings
+            assert "RLE_DICTIONARY" not in encodings
+
+
+def test_storage_profile_restored(test_df):
+    profile = StorageProfile(compression="zstd", compression_level=3, data_page_size=1024)
+    with parquet_frame_factory(df=test_df, name="test", profile=profile) as pqf:
+        with pqf.temporary_reference_parquets():
+            loaded_pqf = ParquetFrame(pqf.workdir)
+            loaded_pqf.read_reference_parquets()
+            assert loaded_pqf.profile == profile
+
+
+def test_invalid_storage_profile():
+    with pytest.raises(ValueError):
+        StorageProfile(compression="foo")
+    with pytest.raises(ValueError):
+        get_profile("foo")
+
+
+def test_as_arrow(parquet_frame, test_df):
+    table = parquet_frame.as_arrow()
+    assert table.column_names == ["timestamp", *[str(c[0]) for c in test_df.columns]]
+    assert table.column("timestamp").to_pylist() == test_df.index.to_pydatetime().tolist()
+    assert table.column("4").to_pylist() == test_df.loc[:, 4].iloc[:, 0].tolist()
+    assert table.schema.field("4").metadata == {
+        b"interval": b"daily",
+        b"key": b"BLOCK1:ZONE1",
+        b"type": b"Heating Load",
+        b"units": b"W",
+    }
+
+
+def test_as_arrow_ids(parquet_frame, test_df):
+    table = parquet_frame.as_arrow([13, 2, "SPECIAL"])
+    assert table.column_names == ["timestamp", "13", "2", "SPECIAL"]
+    assert table.column("13").to_pylist() == [13, 13, 13]
+
+
+def test_as_arrow_date_range(parquet_frame):
+    table = parquet_frame.as_arrow(2, start_date=datetime(2002, 1, 2))
+    assert table.column("timestamp").to_pylist() == [
+        datetime(2002, 1, 2),
+        datetime(2002, 1, 3),
+    ]
+    assert table.column("2").to_pylist() == [2, 2]
+
+
+def test_as_arrow_missing_id(parquet_frame):
+    with pytest.raises(KeyError):
+        parquet_frame.as_arrow([2, 100])
+
+
+def test_copy_links_parquets(parquet_frame, test_df):
+    copied_frame = copy(parquet_frame)
+    try:
+        for original, copied in zip(parquet_frame.parquet_paths, copied_frame.parquet_paths):
+            assert original.stat().st_ino == copied.stat().st_ino
+        copied_frame.loc[:, 2] = [100, 100, 100]
+        copied_frame.compact()
+        copied_frame.migrate_layout(SINGLE_LAYOUT)
+        assert_frame_equal(test_df, parquet_frame.as_df())
+        assert copied_frame.loc[:, 2].iloc[:, 0].tolist() == [100, 100, 100]
+    finally:
+        copied_frame.clean_up()
+
+
+def test_copy_without_links(parquet_frame, test_df, monkeypatch):
+    def link(src, dst):
+        raise OSError("Links are not supported.")
+
+    monkeypatch.setattr(os, "link", link)
+    copied_frame = copy(parquet_frame)
+    try:
+        for original, copied in zip(parquet_frame.parquet_paths, copied_frame.parquet_paths):
+            assert original.stat().st_ino != copied.stat().st_ino
+        assert_frame_equal(test_df, copied_frame.as_df())
+    finally:
+        copied_frame.clean_up()
+
+
+def test_reference_parquets_not_shared(parquet_frame):
+    with parquet_frame.temporary_reference_parquets():
+        copied_frame = copy(parquet_frame)
+        try:
+            copied_frame.save_reference_parquets()
+            original = parquet_frame.reference_parquet_path.stat().st_ino
+            assert original != copied_frame.reference_parquet_path.stat().st_ino
+        finally:
+            copied_frame.clean_up()
+
+
+@pytest.fixture
+def cached_parquet_frame(test_df):
+    with parquet_frame_factory(df=test_df, name="test") as pqf:
+        pqf.set_column_cache(ColumnCache(1 << 20))
+        yield pqf
+
+
+def test_column_cache_hits(cached_parquet_frame, test_df):
+    assert_frame_equal(test_df.loc[:, [2, 3]], cached_parquet_frame.loc[:, [2, 3]])
+    assert cached_parquet_frame.column_cache.stats["misses"] == 2
+    assert_frame_equal(test_df.loc[:, [3, 4]], cached_parquet_frame.loc[:, [3, 4]])
+    assert cached_parquet_frame.column_cache.stats["hits"] == 1
+    assert cached_parquet_frame.column_cache.stats["misses"] == 3
+
+
+def test_column_cache_row_range(cached_parquet_frame, test_df):
+    _ = cached_parquet_frame.as_df()
+    start, end = datetime(2002, 1, 2), datetime(2002, 1, 3)
+    assert_frame_equal(
+        test_df.loc[start:end, [2, 3]], cached_parquet_frame.loc[start:end, [2, 3]]
+    )
+    assert cached_parquet_frame.column_cache.stats["hits"] == 2
+
+
+def test_column_cache_invalidated(cached_parquet_frame, test_df):
+    _ = cached_parquet_frame.as_df()
+    n_items = len(cached_parquet_frame.column_cache)
+    cached_parquet_frame.migrate_layout(SINGLE_LAYOUT)
+    assert len(cached_parquet_frame.column_cache) == 0
+    assert_frame_equal(test_df, cached_parquet_frame.as_df())
+    assert len(cached_parquet_frame.column_cache) == n_items
+    cached_parquet_frame.drop(columns=[2, 3], level="id")
+    cached_parquet_frame.clean_up()
+    assert len(cached_parquet_frame.column_cache) == 0
+
+
+def test_column_cache_update(cached_parquet_frame, test_df):
+    _ = cached_parquet_frame.as_df()
+    cached_parquet_frame.loc[:, 2] = [100, 100, 100]
+    test_df.loc[:, 2] = [100, 100, 100]
+    assert_frame_equal(test_df, cached_parquet_frame.as_df())
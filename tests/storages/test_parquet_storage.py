@@ -1,9 +1,19 @@
 import contextlib
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
+from functools import partial
+from zipfile import ZipFile
 
+from pandas.testing import assert_frame_equal
+
+from esofile_reader.pqt.parquet_archive import ParquetArchive
+from esofile_reader.pqt import parquet_storage
+from esofile_reader.pqt.parquet_file import ParquetFile
 from esofile_reader.pqt.parquet_storage import ParquetStorage
 from esofile_reader.pqt.parquet_tables import ParquetFrame
+from esofile_reader.processing.progress_logger import BaseLogger
 from tests.session_fixtures import *
 
 
@@ -136,3 +146,432 @@ def test_storage_in_path(tmpdir):
     pqs = ParquetStorage(path)
     assert pqs.workdir == path
     assert path.exists()
+
+
+@pytest.fixture(scope="module")
+def archived_storage(excel_file, tiny_eplusout):
+    storage = ParquetStorage()
+    storage.store_file(excel_file)
+    storage.store_file(tiny_eplusout)
+    path = storage.save_as("", "archived")
+    shutil.rmtree(storage.workdir)
+    try:
+        yield path
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+
+@pytest.fixture
+def lazy_storage(archived_storage):
+    storage = ParquetStorage.load_storage(archived_storage, lazy=True)
+    try:
+        yield storage
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_lazy_load_parquets_not_extracted(lazy_storage):
+    assert [p.name for p in lazy_storage.workdir.rglob("*.parquet")] == []
+
+
+@pytest.mark.parametrize("id_,test_file", [(0, "excel_file"), (1, "tiny_eplusout")])
+def test_lazy_load_tables(lazy_storage, id_, test_file, request):
+    test_file = request.getfixturevalue(test_file)
+    assert lazy_storage.files[id_].file_name == test_file.file_name
+    assert lazy_storage.files[id_].tables == test_file.tables
+
+
+def test_lazy_load_update_table(lazy_storage, excel_file):
+    tables = lazy_storage.files[0].tables
+    table = tables.get_table_names()[0]
+    id_ = tables.get_variable_ids(table)[0]
+    array = [1] * len(tables.get_table(table).index)
+    tables.update_variable_values(table, id_, array)
+    df = tables.get_table(table)
+    assert df.iloc[:, 0].tolist() == array
+    assert_frame_equal(
+        df.iloc[:, 1:], excel_file.tables.get_table(table).iloc[:, 1:], check_dtype=False
+    )
+
+
+def test_lazy_save_as_same_path(archived_storage, excel_file):
+    storage = ParquetStorage.load_storage(archived_storage, lazy=True)
+    try:
+        path = storage.save()
+        assert path == archived_storage
+        assert storage.files[0].tables == excel_file.tables
+        loaded_storage = ParquetStorage.load_storage(path)
+        try:
+            assert loaded_storage.files[0].tables == excel_file.tables
+        finally:
+            shutil.rmtree(loaded_storage.workdir)
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_lazy_save_as_new_path(lazy_storage, tiny_eplusout):
+    path = lazy_storage.save_as("", "lazy_copy")
+    try:
+        loaded_storage = ParquetStorage.load_storage(path)
+        try:
+            assert loaded_storage.files[1].tables == tiny_eplusout.tables
+        finally:
+            shutil.rmtree(loaded_storage.workdir)
+    finally:
+        path.unlink()
+
+
+@pytest.fixture
+def saved_storage(excel_file, tiny_eplusout, tmpdir):
+    storage = ParquetStorage()
+    storage.store_file(excel_file)
+    storage.store_file(tiny_eplusout)
+    storage.save_as(tmpdir, "incremental")
+    try:
+        yield storage
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def load_and_check(path, expected_files):
+    loaded_storage = ParquetStorage.load_storage(path)
+    try:
+        assert sorted(loaded_storage.files.keys()) == sorted(expected_files.keys())
+        for id_, test_file in expected_files.items():
+            assert loaded_storage.files[id_].file_name == test_file.file_name
+            assert loaded_storage.files[id_].tables == test_file.tables
+    finally:
+        shutil.rmtree(loaded_storage.workdir)
+
+
+def test_save_without_changes(saved_storage):
+    n_members = len(ZipFile(saved_storage.path).infolist())
+    size = saved_storage.path.stat().st_size
+    saved_storage.save()
+    saved_storage.save()
+    assert len(ZipFile(saved_storage.path).infolist()) == n_members
+    assert saved_storage.path.stat().st_size == size
+
+
+def test_save_only_changed_members(saved_storage, excel_file, tiny_eplusout):
+    n_members = len(ZipFile(saved_storage.path).infolist())
+    tables = saved_storage.files[0].tables
+    table = tables.get_table_names()[0]
+    id_ = tables.get_variable_ids(table)[0]
+    tables.update_variable_name(table, id_, "new key", "new type")
+    saved_storage.save()
+    # reference parquets, info json (header catalogue) and manifest are appended
+    assert len(ZipFile(saved_storage.path).infolist()) == n_members + 4
+    load_and_check(saved_storage.path, {0: saved_storage.files[0], 1: tiny_eplusout})
+
+
+def test_save_new_file(saved_storage, excel_file, tiny_eplusout):
+    saved_storage.store_file(excel_file)
+    saved_storage.save()
+    load_and_check(saved_storage.path, {0: excel_file, 1: tiny_eplusout, 2: excel_file})
+
+
+def test_save_deleted_file(saved_storage, tiny_eplusout):
+    saved_storage.delete_file(0)
+    saved_storage.save()
+    load_and_check(saved_storage.path, {1: tiny_eplusout})
+    lazy = ParquetStorage.load_storage(saved_storage.path, lazy=True)
+    try:
+        assert list(lazy.files.keys()) == [1]
+        assert lazy.files[1].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(lazy.workdir)
+
+
+def test_save_full_rewrite_when_garbage(saved_storage, excel_file):
+    saved_storage.delete_file(1)
+    saved_storage.MAX_GARBAGE_RATIO = 0
+    saved_storage.save()
+    archive = ParquetArchive(saved_storage.path)
+    assert archive.garbage_size == 0
+    assert not any(name.startswith("file-1/") for name in archive.namelist())
+    load_and_check(saved_storage.path, {0: excel_file})
+
+
+def test_save_changes_lazy_storage(saved_storage, tiny_eplusout):
+    lazy = ParquetStorage.load_storage(saved_storage.path, lazy=True)
+    try:
+        tables = lazy.files[0].tables
+        table = tables.get_table_names()[0]
+        id_ = tables.get_variable_ids(table)[0]
+        array = [1] * len(tables.get_table(table).index)
+        tables.update_variable_values(table, id_, array)
+        lazy.save()
+        assert lazy.files[1].tables == tiny_eplusout.tables
+        assert tables.get_table(table).iloc[:, 0].tolist() == array
+        load_and_check(saved_storage.path, {0: lazy.files[0], 1: tiny_eplusout})
+    finally:
+        shutil.rmtree(lazy.workdir)
+
+
+def test_save_changes_keeps_references_deferred(saved_storage, excel_file, tiny_eplusout):
+    lazy = ParquetStorage.load_storage(saved_storage.path, lazy=True)
+    try:
+        tables = lazy.files[0].tables
+        table = tables.get_table_names()[0]
+        id_ = tables.get_variable_ids(table)[0]
+        tables.update_variable_name(table, id_, "new key", "new type")
+        lazy.save()
+        for file in lazy.files.values():
+            for name, pqf in file.tables.items():
+                assert pqf.deferred is (file.id_ != 0 or name != table)
+        load_and_check(saved_storage.path, {0: lazy.files[0], 1: tiny_eplusout})
+    finally:
+        shutil.rmtree(lazy.workdir)
+
+
+def test_lazy_save_closes_archive(saved_storage, tiny_eplusout, monkeypatch):
+    lazy = ParquetStorage.load_storage(saved_storage.path, lazy=True)
+    archives = []
+
+    def check_closed(func, path_index):
+        def wrapper(*args, **kwargs):
+            if Path(args[path_index]) == saved_storage.path:
+                assert all(archive._buffer is None for archive in archives)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(os, "replace", check_closed(os.replace, 1))
+    monkeypatch.setattr(parquet_storage, "ZipFile", check_closed(ZipFile, 0))
+    try:
+        tables = lazy.files[0].tables
+        save_as = partial(lazy.save_as, saved_storage.path.parent, "incremental")
+        for table, save in zip(tables.get_table_names(), [lazy.save_changes, save_as]):
+            id_ = tables.get_variable_ids(table)[0]
+            array = [1] * len(tables.get_table(table).index)
+            archives[:] = [pqf.archive for pqf in tables.values()]
+            assert archives[0]._buffer is not None
+            tables.update_variable_values(table, id_, array)
+            save()
+            assert tables.get_results_df(table, [id_]).iloc[:, 0].tolist() == array
+        load_and_check(saved_storage.path, {0: lazy.files[0], 1: tiny_eplusout})
+    finally:
+        shutil.rmtree(lazy.workdir)
+
+
+def test_storage_profile(excel_file):
+    storage = ParquetStorage(profile="archive")
+    try:
+        id_ = storage.store_file(excel_file)
+        assert all(
+            pqf.profile.compression == "zstd" for pqf in storage.files[id_].tables.values()
+        )
+        id_ = storage.store_file(excel_file, profile="speed")
+        assert all(
+            pqf.profile.compression == "lz4" for pqf in storage.files[id_].tables.values()
+        )
+        assert storage.files[id_].tables == excel_file.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_merge_multiple_storages(saved_storage, excel_file, tiny_eplusout, tmpdir):
+    other = ParquetStorage()
+    try:
+        other.store_file(tiny_eplusout)
+        other_path = other.save_as(tmpdir, "other")
+    finally:
+        shutil.rmtree(other.workdir)
+    storage = ParquetStorage()
+    try:
+        storage.store_file(excel_file)
+        storage.merge_with([saved_storage.path, other_path])
+        assert storage.get_all_file_names() == [
+            "test_excel_results",
+            "test_excel_results (1)",
+            "tiny_eplusout",
+            "tiny_eplusout (1)",
+        ]
+        assert list(storage.files.keys()) == [0, 1, 2, 3]
+        assert [f.name for f in storage.files.values()] == [f"file-{i}" for i in range(4)]
+        assert storage.files[1].tables == excel_file.tables
+        assert storage.files[3].tables == tiny_eplusout.tables
+        path = storage.save_as(tmpdir, "merged")
+        load_and_check(path, storage.files)
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_merge_does_not_extract_deleted_files(saved_storage, tiny_eplusout):
+    saved_storage.delete_file(0)
+    saved_storage.save()
+    storage = ParquetStorage()
+    try:
+        storage.merge_with(saved_storage.path)
+        assert list(storage.files.keys()) == [1]
+        assert [p.name for p in storage.workdir.iterdir()] == ["file-1"]
+        assert storage.files[1].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_storage_column_cache(excel_file, tiny_eplusout):
+    storage = ParquetStorage(cache_size=1 << 20)
+    try:
+        id_ = storage.store_file(excel_file)
+        storage.store_file(tiny_eplusout)
+        assert storage.files[id_].tables == excel_file.tables
+        assert storage.files[id_].tables == excel_file.tables
+        assert storage.column_cache.stats["hits"] > 0
+        storage.delete_file(id_)
+        assert len(storage.column_cache) == 0
+        storage.set_cache_size(0)
+        assert storage.column_cache is None
+        assert storage.files[1].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_concurrent_reads_while_storing(excel_file, tiny_eplusout):
+    storage = ParquetStorage()
+    try:
+        id_ = storage.store_file(excel_file)
+        files = storage.files
+        variables = list(excel_file.get_header_dictionary("daily").values())
+        expected = excel_file.get_results(variables)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            writer = executor.submit(storage.store_file, tiny_eplusout)
+            readers = [
+                executor.submit(storage.files[id_].get_results, variables) for _ in range(6)
+            ]
+            for reader in readers:
+                assert_frame_equal(expected, reader.result(), check_dtype=False)
+            new_id = writer.result()
+        # files are published as a new dictionary
+        assert list(files.keys()) == [id_]
+        assert storage.files[new_id].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_vacuum(excel_file):
+    storage = ParquetStorage()
+    try:
+        id_ = storage.store_file(excel_file)
+        file = storage.files[id_]
+        table = file.table_names[0]
+        ids = file.tables.get_variable_ids(table)
+        file.remove_variables([file.get_header_dictionary(table)[ids[0]]])
+        assert storage.vacuum() > 0
+        assert not file.tables[table].is_fragmented()
+        assert storage.vacuum() == 0
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_stage_and_commit(excel_file, tiny_eplusout):
+    storage = ParquetStorage()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            paths = list(executor.map(storage.stage_file, [excel_file, tiny_eplusout]))
+        assert storage.files == {}
+        assert all(p.parent.name.startswith(ParquetStorage.STAGE_PREFIX) for p in paths)
+        assert storage.commit(paths) == [0, 1]
+        assert sorted(p.name for p in storage.workdir.iterdir()) == ["file-0", "file-1"]
+        assert storage.files[0].tables == excel_file.tables
+        assert storage.files[1].tables == tiny_eplusout.tables
+        assert storage.files[1].get_info()["id"] == 1
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_commit_keeps_references_deferred(tiny_eplusout):
+    storage = ParquetStorage()
+    try:
+        id_ = storage.commit(storage.stage_file(tiny_eplusout))[0]
+        assert all(pqf.deferred for pqf in storage.files[id_].tables.values())
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_failed_commit_restores_staged_files(excel_file, tiny_eplusout, monkeypatch):
+    storage = ParquetStorage()
+    try:
+        paths = [storage.stage_file(excel_file), storage.stage_file(tiny_eplusout)]
+        from_file_system = ParquetFile.from_file_system
+        calls = []
+
+        def failing_from_file_system(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("failed")
+            return from_file_system(*args, **kwargs)
+
+        monkeypatch.setattr(ParquetFile, "from_file_system", failing_from_file_system)
+        with pytest.raises(RuntimeError):
+            storage.commit(paths)
+        assert storage.files == {}
+        assert all(path.exists() for path in paths)
+        assert not any(p.name.startswith("file-") for p in storage.workdir.iterdir())
+
+        monkeypatch.undo()
+        assert storage.commit(paths) == [0, 1]
+        assert storage.files[1].tables == tiny_eplusout.tables
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_discard_staged_file(excel_file):
+    storage = ParquetStorage()
+    try:
+        path = storage.stage_file(excel_file)
+        storage.discard(path)
+        assert storage.files == {}
+        assert list(storage.workdir.iterdir()) == []
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+class FailingLogger(BaseLogger):
+    def increment_progress(self, i=1) -> None:
+        raise RuntimeError("failed")
+
+
+def test_failed_store_leaves_no_files(excel_file):
+    storage = ParquetStorage()
+    try:
+        with pytest.raises(RuntimeError):
+            storage.store_file(excel_file, logger=FailingLogger("test"))
+        assert storage.files == {}
+        assert list(storage.workdir.iterdir()) == []
+    finally:
+        shutil.rmtree(storage.workdir)
+
+
+def test_concurrent_results_while_changing_columns(tiny_eplusout):
+    storage = ParquetStorage()
+    try:
+        id_ = storage.store_file(tiny_eplusout)
+        tables = storage.files[id_].tables
+        table = tiny_eplusout.table_names[0]
+        ids = tables.get_variable_ids(table)[:3]
+        variable = tables.get_variables_dct(table)[ids[0]]
+        expected = tiny_eplusout.tables.get_results_df(table, ids)
+        n_rows = len(tables[table].index)
+
+        def write():
+            for i in range(100):
+                new_variable = variable._replace(key=f"new key {i}")
+                id_ = tables.insert_column(new_variable, list(range(n_rows)))
+                tables.delete_variables(table, [id_])
+
+        def read():
+            for _ in range(100):
+                df = tables.get_results_df(table, ids)
+                assert_frame_equal(expected, df, check_dtype=False)
+                tables.get_global_max_results_df(table, ids)
+                tables.get_numeric_table(table)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(write)] + [executor.submit(read) for _ in range(3)]
+            for future in futures:
+                future.result()
+    finally:
+        shutil.rmtree(storage.workdir)
@@ -151,6 +151,43 @@ def test_update_multiindex():
     assert_index_equal(updated_mi, expected)
 
 
+def test_update_multiindex_duplicate_units():
+    mi = pd.MultiIndex.from_tuples([(1, "m"), (2, "ft")], names=["id", "units"])
+    updated_mi = update_units_level(mi, {"m": "ft"})
+    expected = pd.MultiIndex.from_tuples([(1, "ft"), (2, "ft")], names=["id", "units"])
+    assert_index_equal(updated_mi, expected)
+
+
+def test_group_columns_by_units():
+    columns = pd.MultiIndex.from_tuples(
+        [(1, "C", "value"), (1, "C", "ts"), (2, "W", "value"), (3, "C", "value")],
+        names=["id", "units", "data"],
+    )
+    groups = group_columns_by_units(columns, ["C", "J"])
+    assert list(groups.keys()) == ["C"]
+    assert groups["C"].tolist() == [0, 3]
+
+
+def test_apply_conversion_si_to_ip_callable():
+    columns = pd.MultiIndex.from_tuples(
+        [(1, "C"), (2, "J/kg"), (3, "C")], names=["id", "units"]
+    )
+    df = pd.DataFrame([[0.0, 0.0, 10.0], [100.0, 1000.0, -40.0]], columns=columns)
+    out = apply_conversion(df, {"C": SI_TO_IP["C"], "J/kg": SI_TO_IP["J/kg"]})
+
+    test_mi = pd.MultiIndex.from_tuples(
+        [(1, "F"), (2, "Btu/lb"), (3, "F")], names=["id", "units"]
+    )
+    test_df = pd.DataFrame([[32.0, 7.686, 50.0], [212.0, 8.11586, -40.0]], columns=test_mi)
+    assert_frame_equal(out, test_df)
+
+
+def test_convert_array_non_vectorized_callable():
+    arr = np.array([[1.0, 2.0], [3.0, 4.0]])
+    out = convert_array(arr, lambda x: float(x) * 2)
+    assert out.tolist() == [[2.0, 4.0], [6.0, 8.0]]
+
+
 def test_rate_and_energy_units():
     assert all_rate_or_energy(["W", "J", "J"])
 
@@ -304,3 +341,13 @@ def test_can_convert_rate_to_energy(df, can_convert):
     rf = mock.Mock()
     rf.get_special_table.return_value = df
     assert can_convert == can_convert_rate_to_energy(rf, "foo")
+
+
+def test_apply_conversion_upcast_single_precision():
+    columns = pd.MultiIndex.from_tuples([(1, "bar"), (2, "baz")], names=["id", "units"])
+    df = pd.DataFrame([[1, 1], [2, 2]], columns=columns, dtype="float32")
+    out = apply_conversion(df, {"bar": ("foo", 0.1)})
+
+    test_mi = pd.MultiIndex.from_tuples([(1, "foo"), (2, "baz")], names=["id", "units"])
+    test_df = pd.DataFrame([[0.1, 1.0], [0.2, 2.0]], columns=test_mi)
+    assert_frame_equal(out, test_df)
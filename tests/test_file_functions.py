@@ -1,6 +1,7 @@
 from copy import copy
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal
 from pytest import lazy_fixture
@@ -520,6 +521,56 @@ def test_add_output_test_tree(copied_file, table, new_key, new_type, new_units,
     assert [id_] == tree_id
 
 
+@pytest.mark.parametrize("copied_file", [pytest.lazy_fixture("simple_file")], indirect=True)
+def test_insert_variables(copied_file):
+    variables = [
+        SimpleVariable("monthly-simple", "new", "C"),
+        SimpleVariable("monthly-simple", "new", "C"),
+        SimpleVariable("monthly-simple", "other", "W"),
+    ]
+    array = np.arange(36).reshape(12, 3)
+    out = copied_file.insert_variables(variables, array)
+    assert out == [
+        (100, SimpleVariable("monthly-simple", "new", "C")),
+        (101, SimpleVariable("monthly-simple", "new (1)", "C")),
+        (102, SimpleVariable("monthly-simple", "other", "W")),
+    ]
+    assert copied_file.search_tree.find_ids(out[1][1]) == [101]
+    df = copied_file.tables.get_results_df("monthly-simple", [100, 101, 102])
+    assert df.to_numpy().tolist() == array.tolist()
+
+
+@pytest.mark.parametrize("copied_file", [pytest.lazy_fixture("simple_file")], indirect=True)
+def test_insert_variables_invalid_array(copied_file):
+    variables = [SimpleVariable("monthly-simple", "new", "C")]
+    assert copied_file.insert_variables(variables, np.ones((2, 1))) is None
+    assert not copied_file.search_tree.variable_exists(variables[0])
+
+
+@pytest.mark.parametrize("copied_file", [pytest.lazy_fixture("simple_file")], indirect=True)
+def test_insert_variables_multiple_tables(copied_file):
+    variables = [
+        SimpleVariable("monthly-simple", "new", "C"),
+        SimpleVariable("simple-no-template-no-index", "new", "C"),
+    ]
+    assert copied_file.insert_variables(variables, np.ones((12, 2))) is None
+    assert not copied_file.search_tree.variable_exists(variables[0])
+
+
+@pytest.mark.parametrize("copied_file", [pytest.lazy_fixture("simple_file")], indirect=True)
+def test_insert_variables_invalid_shape(copied_file):
+    variables = [SimpleVariable("monthly-simple", "new", "C")]
+    assert copied_file.insert_variables(variables, np.ones((12, 2))) is None
+    assert not copied_file.search_tree.variable_exists(variables[0])
+
+
+@pytest.mark.parametrize("copied_file", [pytest.lazy_fixture("simple_file")], indirect=True)
+def test_insert_variables_invalid_table(copied_file):
+    variables = [SimpleVariable("foo", "new", "C")]
+    with pytest.raises(KeyError):
+        copied_file.insert_variables(variables, np.ones((12, 1)))
+
+
 def test_add_output_invalid_array(eso_file):
     out = eso_file.insert_variable("timestep", "new", "type", "C", [1])
     assert out is None
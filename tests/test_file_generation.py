@@ -15,6 +15,23 @@ def test_from_csv():
     assert rf.file_type == GenericFile.CSV
 
 
+def test_from_excel_single_precision():
+    rf = GenericFile.from_excel(
+        Path(TEST_FILES_PATH, "test_excel_results.xlsx"), value_dtype="float32"
+    )
+    for table in rf.table_names:
+        dtypes = rf.get_numeric_table(table).dtypes
+        assert not (dtypes == "float64").any()
+
+
+def test_from_eso_file_single_precision():
+    rf = GenericFile.from_eplus_file(
+        Path(EPLUS_TEST_FILES_PATH, "tiny_eplusout.eso"), value_dtype="float32"
+    )
+    for table in rf.table_names:
+        assert (rf.get_numeric_table(table).dtypes == "float32").all()
+
+
 def test_from_eso_file():
     rf = GenericFile.from_eplus_file(Path(EPLUS_TEST_FILES_PATH, "eplusout1.eso"))
     assert rf.file_type == GenericFile.ESO
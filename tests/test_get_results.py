@@ -485,6 +485,49 @@ def test_get_results_units_system_invalid(simple_file):
         _ = get_results(simple_file, TEST_SIMPLE_VARIABLE, units_system="FOO")
 
 
+@pytest.mark.parametrize(
+    "output_type", ["standard", "global_max", "global_min"],
+)
+def test_get_batch_results(simple_file, output_type):
+    results = simple_file.get_batch_results(
+        TEST_SIMPLE_VARIABLES, ["standard", "global_max", "global_min"]
+    )
+    expected_df = get_results(simple_file, TEST_SIMPLE_VARIABLES, output_type=output_type)
+    assert_frame_equal(results[output_type], expected_df)
+
+
+def test_get_batch_results_units_systems(simple_file):
+    results = simple_file.get_batch_results(
+        TEST_SIMPLE_VARIABLES, ["standard", "global_max"], units_system=["SI", "IP"]
+    )
+    assert list(results.keys()) == [
+        ("standard", "SI"),
+        ("standard", "IP"),
+        ("global_max", "SI"),
+        ("global_max", "IP"),
+    ]
+    for (output_type, units_system), df in results.items():
+        expected_df = get_results(
+            simple_file,
+            TEST_SIMPLE_VARIABLES,
+            output_type=output_type,
+            units_system=units_system,
+        )
+        assert_frame_equal(df, expected_df)
+
+
+def test_get_batch_results_invalid_output_type(simple_file):
+    with pytest.raises(InvalidOutputType):
+        _ = simple_file.get_batch_results(TEST_SIMPLE_VARIABLES, ["standard", "foo"])
+
+
+def test_get_batch_results_invalid_variables(simple_file):
+    results = simple_file.get_batch_results(
+        SimpleVariable("foo", "bar", "baz"), ["standard", "global_max"]
+    )
+    assert results == {}
+
+
 RATE_VARIABLES = [
     Variable("monthly", "Environment", "Site Diffuse Solar Radiation Rate per Area", "W/m2"),
     Variable("runperiod", "BLOCK1:ZONEB", "Zone People Sensible Heating Rate", "W"),
@@ -672,3 +715,19 @@ def test_get_peak_results_wrong_interval(eplusout1_peaks):
             Variable("hourly", "BLOCK1:ZONEA", "Zone Mean Air Temperature", "C"),
             output_type="local_max",
         )
+
+
+def test_get_batch_results_rate_to_energy_with_day(leap_year_file):
+    key = "BLOCK1:ZONE1 IDEAL LOADS AIR"
+    type_ = "Zone Ideal Loads Supply Air Total Cooling Rate"
+    variables = [Variable(table, key, type_, "W") for table in ["hourly", "daily"]]
+    table_formatter = TableFormatter(include_day=True)
+    results = leap_year_file.get_batch_results(
+        variables, ["standard"], rate_to_energy=True, table_formatter=table_formatter
+    )
+    expected_df = get_results(
+        leap_year_file, variables, rate_to_energy=True, table_formatter=table_formatter
+    )
+    assert expected_df.index.names == ["file", "timestamp", "day"]
+    assert expected_df.columns.get_level_values("units").tolist() == ["J", "J"]
+    assert_frame_equal(results["standard"], expected_df)
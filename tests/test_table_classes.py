@@ -7,6 +7,7 @@ from pandas.testing import assert_index_equal, assert_frame_equal, assert_series
 from pytest import lazy_fixture
 
 from esofile_reader.df.df_functions import (
+    create_global_peak_outputs,
     slice_series_by_datetime_index,
     slice_df_by_datetime_index,
     sort_by_ids,
@@ -247,6 +248,54 @@ def test_insert_variable(copied_tables, new_variable, new_id):
     assert df.squeeze().tolist() == list(range(12))
 
 
+@pytest.mark.parametrize(
+    "copied_tables", [lazy_fixture("simple_tables")], indirect=["copied_tables"],
+)
+def test_insert_columns(copied_tables):
+    variables = [
+        SimpleVariable("monthly-simple", "FOO", "C"),
+        SimpleVariable("monthly-simple", "BAR", "C"),
+    ]
+    ids = copied_tables.insert_columns(variables, np.arange(24).reshape(12, 2))
+    df = copied_tables.get_results_df("monthly-simple", ids)
+    assert ids == [100, 101]
+    assert df.columns.get_level_values("key").tolist() == ["FOO", "BAR"]
+    assert df.iloc[:, 1].tolist() == list(range(1, 24, 2))
+
+
+@pytest.mark.parametrize(
+    "copied_tables", [lazy_fixture("simple_tables")], indirect=["copied_tables"],
+)
+def test_insert_columns_invalid_shape(copied_tables):
+    variables = [SimpleVariable("monthly-simple", "FOO", "C")]
+    n_columns = len(copied_tables["monthly-simple"].columns)
+    assert copied_tables.insert_columns(variables, np.arange(24).reshape(12, 2)) is None
+    assert len(copied_tables["monthly-simple"].columns) == n_columns
+
+
+@pytest.mark.parametrize(
+    "copied_tables", [lazy_fixture("simple_tables")], indirect=["copied_tables"],
+)
+def test_insert_columns_invalid_length(copied_tables):
+    variables = [SimpleVariable("monthly-simple", "FOO", "C")]
+    n_columns = len(copied_tables["monthly-simple"].columns)
+    assert copied_tables.insert_columns(variables, np.ones((2, 1))) is None
+    assert len(copied_tables["monthly-simple"].columns) == n_columns
+
+
+@pytest.mark.parametrize(
+    "copied_tables", [lazy_fixture("simple_tables")], indirect=["copied_tables"],
+)
+def test_insert_columns_multiple_tables(copied_tables):
+    variables = [
+        SimpleVariable("monthly-simple", "FOO", "C"),
+        SimpleVariable("simple-no-template-no-index", "FOO", "C"),
+    ]
+    n_columns = len(copied_tables["monthly-simple"].columns)
+    assert copied_tables.insert_columns(variables, np.ones((12, 2))) is None
+    assert len(copied_tables["monthly-simple"].columns) == n_columns
+
+
 @pytest.mark.parametrize(
     "copied_tables, table, ids",
     [
@@ -663,3 +712,33 @@ def test_set_table_invalid(df_tables):
 
 def test_file_not_equal(eplusout1, eplusout2):
     assert not eplusout1 == eplusout2
+
+
+def test_create_global_peak_outputs():
+    index = pd.DatetimeIndex(pd.date_range("2002-1-1", periods=4, freq="MS"), name="timestamp")
+    columns = pd.MultiIndex.from_tuples(
+        [(1, "monthly", "A", "C"), (2, "monthly", "B", "C"), (3, "monthly", "C", "C")],
+        names=SIMPLE_COLUMN_LEVELS,
+    )
+    df = pd.DataFrame(
+        [[1, 5, np.nan], [3, 2, np.nan], [3, 9, np.nan], [0, 1, np.nan]],
+        index=index,
+        columns=columns,
+    )
+    test_df = pd.DataFrame(
+        [[3.0, datetime(2002, 2, 1), 9.0, datetime(2002, 3, 1), np.nan, pd.NaT]],
+        columns=pd.MultiIndex.from_tuples(
+            [
+                (1, "monthly", "A", "C", "value"),
+                (1, "monthly", "A", "C", "timestamp"),
+                (2, "monthly", "B", "C", "value"),
+                (2, "monthly", "B", "C", "timestamp"),
+                (3, "monthly", "C", "C", "value"),
+                (3, "monthly", "C", "C", "timestamp"),
+            ],
+            names=[*SIMPLE_COLUMN_LEVELS, "data"],
+        ),
+    )
+    assert_frame_equal(create_global_peak_outputs(df), test_df)
+    min_df = create_global_peak_outputs(df, max_=False)
+    assert min_df.iloc[0, :4].tolist() == [0, datetime(2002, 4, 1), 1, datetime(2002, 4, 1)]